@@ -4,4 +4,8 @@
 __version__ = '1.0'
 
 #run/debug mode settings
-plotEn = True #faster init if false
\ No newline at end of file
+plotEn = True #False to disable plotting (seaborn/matplotlib are only imported on the first plot)
+# plotHeadless = True #optional, save plots to plotDir (Agg backend) instead of displaying them
+# plotDir = 'C:\\path\\to\\plots' #optional, default ../datalogs/plots
+# fastPath = True #optional, validate gates/transistors once when built instead of on every step (sweep workers too)
+# eventDelta = 0.01 #optional, event-driven netlists: gates only step when an input moved more than this (V)
\ No newline at end of file
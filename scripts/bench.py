@@ -0,0 +1,277 @@
+'''bench.py: benchmarks of the transistor, gate, test bench and sweep hot paths
+
+usage:
+    python bench.py -o base.json                       #run every benchmark, save results
+    python bench.py -o new.json --compare base.json    #run again, flag regressions against base.json
+    python bench.py --quick -k fullAdder               #skip the slow sweeps, only names containing "fullAdder"
+    python bench.py --compare base.json new.json       #compare two saved results without running'''
+
+# Author: Luke Henderson
+__version__ = '1.1'
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import numpy as np
+
+import colors as cl
+import dataSimulator as ds
+import transistor as tr
+import gate
+import testSupport as ts
+import sweep
+
+SEED = 0 #wafer store seed, fixed so every run simulates the same transistors
+NUM_WAFERS = 1000 #wafers of the sweep benchmarks
+VDD = 1.0 #Vdd (V) of the single evaluation benchmarks
+FREQ = 4e9 #Frequency (Hz)
+REPEAT = 5 #repeats of the fast benchmarks
+THRESHOLD = 0.10 #default regression threshold (fractional slowdown of the best time)
+
+
+def benchFetRds(storePath):
+    '''FET.rds of one process varied nmos'''
+    wc = ds.WaferConsumer(storePath)
+    fet = tr.FET('n', wc.consume(1)[0])
+    return lambda: fet.rds(VDD)
+
+def gateStepper(dut):
+    '''Step a gate through every input combination, one per call\n
+    Args:
+        dut [gate class]: INV, NAND, NOR or XOR with cld set
+    Return:
+        [callable]: applies the next input combination and steps the gate'''
+    combos = itertools.cycle(itertools.product((0.0, VDD), repeat=len(dut.INPUTS)))
+    def stepNext():
+        dut.chgInputs(*next(combos))
+        dut.step()
+    return stepNext
+
+def benchInvStep(storePath):
+    '''Single INV step'''
+    wc = ds.WaferConsumer(storePath)
+    dut = gate.INV(vdd=VDD, procVarArr=wc.consume(2))
+    dut.cld = 1e-15
+    return gateStepper(dut)
+
+def benchXorStep(storePath):
+    '''Single XOR step'''
+    wc = ds.WaferConsumer(storePath)
+    dut = gate.XOR(vdd=VDD, procVarArr=wc.consume(12))
+    dut.cld = 1e-15
+    return gateStepper(dut)
+
+def benchMultiDutStep(storePath, eventDelta=None):
+    '''MultiDutManager.step of a full adder, cycling through the 9-step pattern'''
+    wc = ds.WaferConsumer(storePath)
+    tb = ts.TestBench(vdd=VDD, freq=FREQ)
+    nl = sweep.buildFullAdder(VDD, wc)
+    nl.eventDelta = eventDelta
+    nl.compile()
+    dm = ts.MultiDutManager(tb, netlist=nl)
+    tb.setMultiStim(sweep.FA_STIM, expRes=sweep.FA_EXP_RES)
+    steps = itertools.cycle(range(tb.ptrnLen))
+    return lambda: dm.step(next(steps), True)
+
+def benchMultiDutStepEvent(storePath):
+    '''MultiDutManager.step of an event-driven full adder (Netlist.eventDelta 10 mV), 9-step pattern'''
+    return benchMultiDutStep(storePath, eventDelta=0.01)
+
+def benchCheckRes(storePath):
+    '''TestBench.checkRes of the exhaustive 129-step pattern'''
+    wc = ds.WaferConsumer(storePath)
+    res, tb = sweep.valFullAdder(VDD, FREQ, quiet=True, wc=wc, ptrn=sweep.fullAdderExhaustive())
+    return tb.checkRes
+
+def valFullAdderRunner(wc, ptrn=None):
+    '''Full valFullAdder call on wafer 0, transistors re-consumed from the start every call'''
+    def run():
+        wc.resetIter()
+        sweep.valFullAdder(VDD, FREQ, quiet=True, wc=wc, ptrn=ptrn)
+    return run
+
+def benchFullAdder9(storePath):
+    '''valFullAdder, 9-step pattern'''
+    wc = ds.WaferConsumer(storePath)
+    return valFullAdderRunner(wc)
+
+def benchFullAdder129(storePath):
+    '''valFullAdder, exhaustive 129-step pattern'''
+    wc = ds.WaferConsumer(storePath)
+    return valFullAdderRunner(wc, sweep.fullAdderExhaustive())
+
+def benchFullAdderBatch1k(storePath):
+    '''valFullAdder in batch mode, 9-step pattern on NUM_WAFERS wafers at once'''
+    wc = ds.WaferConsumer(storePath)
+    def run():
+        wc.waferNums = range(NUM_WAFERS)
+        wc.resetIter()
+        sweep.valFullAdder(VDD, FREQ, quiet=True, wc=wc)
+        wc.waferNums = None
+    return run
+
+def benchVddMinSweep1k(storePath):
+    '''runSweep Vdd-min bisection of NUM_WAFERS wafers in this process'''
+    return lambda: sweep.runSweep(storePath, NUM_WAFERS, workers=1, freq=FREQ)
+
+def benchBatchVddMin1k(storePath):
+    '''batchFindVddMin of NUM_WAFERS wafers'''
+    wc = ds.WaferConsumer(storePath)
+    return lambda: sweep.batchFindVddMin(wc, range(NUM_WAFERS), freq=FREQ)
+
+#name → (setup function, slow), setup(storePath) returns the callable to time (wafer 0 unless batch mode)
+#slow benchmarks run once per repeat and are skipped with --quick
+BENCHMARKS = {'fetRds':            (benchFetRds, False),
+              'invStep':           (benchInvStep, False),
+              'xorStep':           (benchXorStep, False),
+              'multiDutStep':      (benchMultiDutStep, False),
+              'multiDutStepEvent': (benchMultiDutStepEvent, False),
+              'checkRes129':       (benchCheckRes, False),
+              'fullAdder9':        (benchFullAdder9, False),
+              'fullAdder129':      (benchFullAdder129, False),
+              'fullAdderBatch1k':  (benchFullAdderBatch1k, False),
+              'batchVddMin1k':     (benchBatchVddMin1k, True),
+              'vddMinSweep1k':     (benchVddMinSweep1k, True)}
+
+
+def timeFunc(func, repeat=REPEAT, number=None):
+    '''Time a callable\n
+    Args:
+        func [callable]: function to time, no arguments\n
+        repeat [int]: number of timed repeats\n
+        number [int]: calls per repeat, None to scale up until a repeat takes at least 0.2 s
+    Return:
+        [dict]: per call time (s) 'min', 'median', 'mean' over the repeats, 'number', 'repeat' '''
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    times = [t/number for t in timer.repeat(repeat, number)]
+    return {'min': min(times), 'median': statistics.median(times), 'mean': statistics.fmean(times),
+            'number': number, 'repeat': repeat}
+
+def gitCommit():
+    '''Return:
+        [str]: current git commit of the repo, None if unavailable'''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def runBenchmarks(names=None, quick=False, repeat=REPEAT, slowRepeat=1):
+    '''Run benchmarks on a fixed seed wafer store\n
+    Args:
+        names [list of str]: benchmarks to run, None for all of BENCHMARKS\n
+        quick [bool]: skip slow benchmarks\n
+        repeat [int]: repeats of the fast benchmarks\n
+        slowRepeat [int]: repeats of the slow benchmarks (one call each)
+    Return:
+        [dict]: JSON-able results, 'meta' (commit, versions, platform) and 'results' (name → timeFunc dict)'''
+    if names is None:
+        names = list(BENCHMARKS)
+    ret = {'meta': {'commit': gitCommit(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'seed': SEED,
+                    'numWafers': NUM_WAFERS, 'python': platform.python_version(), 'numpy': np.__version__,
+                    'platform': platform.platform(), 'cpu': platform.processor(),
+                    'versions': {mod.__name__: mod.__version__ for mod in (ds, tr, gate, ts, sweep)}},
+           'results': {}}
+    with tempfile.TemporaryDirectory() as storePath:
+        ds.genLotStore(storePath, NUM_WAFERS, seed=SEED)
+        for name in names:
+            setup, slow = BENCHMARKS[name]
+            if slow and quick:
+                continue
+            func = setup(storePath)
+            if slow:
+                res = timeFunc(func, repeat=slowRepeat, number=1)
+            else:
+                res = timeFunc(func, repeat=repeat)
+            ret['results'][name] = res
+            print(f'{name:<18}{fmtTime(res["min"]):>12} min {fmtTime(res["median"]):>12} median'
+                  f'   ({res["repeat"]} x {res["number"]} calls)')
+    return ret
+
+def fmtTime(sec):
+    '''Args:
+        sec [float]: time (s)
+    Return:
+        [str]: time with an engineering unit'''
+    for scale, unit in ((1, 's'), (1e-3, 'ms'), (1e-6, 'us')):
+        if sec >= scale:
+            return f'{sec/scale:.3f} {unit}'
+    return f'{sec/1e-9:.1f} ns'
+
+def compare(new, base, threshold=THRESHOLD):
+    '''Compare benchmark results against a baseline\n
+    Args:
+        new [dict]: results of runBenchmarks (or its JSON)\n
+        base [dict]: baseline results\n
+        threshold [float]: flag benchmarks whose best time is slower by more than this fraction
+    Return:
+        [list of str]: names of the regressed benchmarks
+    Notes:
+        the best (min) time is compared, it is the least sensitive to other load on the machine'''
+    regressions = []
+    print(f'baseline {base["meta"].get("commit")} → {new["meta"].get("commit")}, threshold {threshold:+.0%}')
+    for name, res in new['results'].items():
+        if name not in base['results']:
+            cl.blue(f'{name:<18}{fmtTime(res["min"]):>12}   (not in baseline)')
+            continue
+        ratio = res['min']/base['results'][name]['min']
+        line = f'{name:<18}{fmtTime(base["results"][name]["min"]):>12} →{fmtTime(res["min"]):>12}   {ratio-1:+.1%}'
+        if ratio > 1+threshold:
+            regressions.append(name)
+            cl.red(line + '   REGRESSION')
+        elif ratio < 1-threshold:
+            cl.green(line)
+        else:
+            print(line)
+    return regressions
+
+def loadResults(path):
+    '''Args:
+        path [str]: JSON file written by this script
+    Return:
+        [dict]: benchmark results'''
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    '''Command line entry point, see the module docstring\n
+    Return:
+        [int]: exit status, 1 if any benchmark regressed'''
+    parser = argparse.ArgumentParser(description='cmosSim hot path benchmarks')
+    parser.add_argument('results', nargs='?', help='saved results to compare instead of running the benchmarks')
+    parser.add_argument('-o', '--output', help='write results to this JSON file')
+    parser.add_argument('--compare', metavar='BASE', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='regression threshold (fraction)')
+    parser.add_argument('-k', dest='keyword', help='only run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='skip the slow sweep benchmarks')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='repeats of the fast benchmarks')
+    args = parser.parse_args(argv)
+
+    if args.results:
+        if not args.compare:
+            cl.red('Error: comparing saved results needs --compare BASE')
+            exit()
+        new = loadResults(args.results)
+    else:
+        names = [name for name in BENCHMARKS if not args.keyword or args.keyword in name]
+        new = runBenchmarks(names, quick=args.quick, repeat=args.repeat)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(new, f, indent=2)
+    if args.compare:
+        return 1 if compare(new, loadResults(args.compare), args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,6 +19,9 @@ import dataSimulator as ds
 import transistor as tr
 import gate
 import testSupport as ts
+import sweep
+import stats
+import instrument
 
 cl.green('Program Start')
 
@@ -27,11 +30,14 @@ cl.green('Program Start')
 modV = {cfg:  '1.0',
         cl:   '0.8',
         lg:   '1.3',
-        plot: '1.2',
-        ds:   '2.0',
-        tr:   '1.0',
-        gate: '1.1',
-        ts:   '1.3'}
+        plot: '1.7',
+        ds:   '2.7',
+        tr:   '1.8',
+        gate: '1.12',
+        ts:   '2.3',
+        sweep: '1.14',
+        stats: '1.1',
+        instrument: '1.3'}
 for module in modV:
     errMsg = f'Expecting version {modV[module]} of "{os.path.basename(module.__file__)}". Imported {module.__version__}'
     assert module.__version__ == modV[module], errMsg
@@ -98,6 +104,10 @@ for module in modV:
 
 ######################################Generate wafer#####################################
 # print('Generating...')
+# #vectorized, seeded per block of lots, written straight into a wafer store
+# ds.genLotStore('pickle\\1M lots 100 tr', 1_000_000, trCount=100, seed=0)
+# #stratified lot offsets (Latin hypercube or Sobol), same accuracy from far fewer lots, see ds.lotDesign
+# ds.genLotStore('pickle\\4096 lots 100 tr lhs', 4096, trCount=100, seed=0, method='lhs')
 # wafer = ds.genWafer(100000)
 # waferArr = []
 # for i in range(1_000_000):
@@ -117,6 +127,9 @@ for module in modV:
 # print('Saving...')
 # with open('pickle\\1M lots 100 tr.pkl', 'wb') as f:
 #     pickle.dump(waferArr, f)
+# #columnar wafer store, opens memory-mapped in milliseconds with ds.WaferConsumer('pickle\\1M lots 100 tr')
+# ds.saveWaferStore(ds.waferListToCols(waferArr), 'pickle\\1M lots 100 tr')
+# # ds.convertWaferPickle('pickle\\1M lots 100 tr.pkl', 'pickle\\1M lots 100 tr') #convert existing pickle
 
 # print('Plotting...')
 # # plotData = ut.listConv(wafer)
@@ -275,93 +288,8 @@ for module in modV:
 
 
 # ######################################Full Adder Full Validation#####################################
-# def valFullAdder(vdd, freq, quiet=False, wc=ds.DummyWaferConsumer()):
-#     # cl.blue(f'Validate Full Adder \n')
-#     #set system variables
-#     # vdd = 1.8
-#     # freq = 4e9 
-#     tb = ts.TestBench(vdd=vdd, freq=freq)
-#     dm = ts.MultiDutManager(tb)
-
-#     #map logic gates
-#     invNor = gate.INV(vdd, procVarArr=wc.consume(2))
-#     invNor.cld = 0
-#     nor = gate.NOR(vdd, procVarArr=wc.consume(4))
-#     nor.cld = invNor.cin
-#     invNand1 = gate.INV(vdd, procVarArr=wc.consume(2))
-#     invNand1.cld = nor.cinA
-#     nand1 = gate.NAND(vdd, procVarArr=wc.consume(4))
-#     nand1.cld = invNand1.cin
-#     invNand2 = gate.INV(vdd, procVarArr=wc.consume(4))
-#     invNand2.cld = nor.cinB
-#     nand2 = gate.NAND(vdd, procVarArr=wc.consume(4))
-#     nand2.cld = invNand2.cin
-#     xor2 = gate.XOR(vdd, procVarArr=wc.consume(12))
-#     xor2.cld = 0
-#     xor1 = gate.XOR(vdd, procVarArr=wc.consume(12))
-#     xor1.cld = xor2.cinA + nand1.cinB
-#     #setup dut manager
-#     dm.dut = [xor1, nand2, xor2, nand1, invNand1, invNand2, nor, invNor]
-#     dm.input = {'a':[[xor1, 'inA'],[nand2, 'inB']], 
-#                 'b':[[xor1, 'inB'],[nand2, 'inA']], 
-#                 'cin':[[xor2, 'inB'],[nand1, 'inA']]}
-#     dm.output = {'s':xor2, 'cout':invNor}
-
-#     #begin test
-#     #print run details
-#     # print('                  A + B + Cin   →  Cout Sum')
-#     #      Running step # 0: 1 + 1 + 1     →     1 1
-
-#     #set simple test pattern
-#     stimPtrnA = '000011110'
-#     stimPtrnB = '001100110'
-#     stimPtrnC = '010101010'
-#     resPtrnS  = '011010010'
-#     resPrtnC  = '000101110'
-
-#     # #set exhaustive test pattern
-#     # stimPtrnA = ''
-#     # stimPtrnB = ''
-#     # stimPtrnC = ''
-#     # for start in range(8):
-#     #     for finish in range(8):
-#     #         startBin = format(start, '03b')
-#     #         finishBin = format(finish, '03b')
-#     #         stimPtrnA += startBin[0]
-#     #         stimPtrnB += startBin[1]
-#     #         stimPtrnC += startBin[2]
-#     #         stimPtrnA += finishBin[0]
-#     #         stimPtrnB += finishBin[1]
-#     #         stimPtrnC += finishBin[2]
-#     # stimPtrnA += '0'
-#     # stimPtrnB += '0'
-#     # stimPtrnC += '0'
-#     # # print(len(stimPtrnA))
-#     # # print(f'a: {stimPtrnA}')
-#     # # print(f'b: {stimPtrnB}')
-#     # # print(f'c: {stimPtrnC}')
-#     # resPtrnS = ''
-#     # resPrtnC = ''
-#     # for i in range(len(stimPtrnA)):
-#     #     inputIntA = int(stimPtrnA[i])
-#     #     inputIntB = int(stimPtrnB[i])
-#     #     inputIntC = int(stimPtrnC[i])
-#     #     sum = format(inputIntA+inputIntB+inputIntC, '02b')
-#     #     resPtrnS += sum[1]
-#     #     resPrtnC += sum[0]
-#     # # print(f'S: {resPtrnS}')
-#     # # print(f'C: {resPrtnC}')
-
-#     #load stim pattern into simulation
-#     tb.setMultiStim({'a':stimPtrnA, 'b':stimPtrnB, 'cin':stimPtrnC}, 
-#             expRes={'s':resPtrnS, 'cout':resPrtnC})
-
-#     #step simulation over time for each pattern
-#     for i in range(tb.ptrnLen):
-#         dm.step(i, quiet)
-
-#     # cl.blue('\nAnalyzing results \n')
-#     return tb.checkRes(), tb
+# #valFullAdder() lives in sweep.py (importable by sweep workers)
+# valFullAdder = sweep.valFullAdder
 
 
 # #validate one at a time
@@ -418,6 +346,51 @@ for module in modV:
 # #         powerList.append(False)
 # #     pb.update(i)
 
+# #loop over Vdd and proc var, all wafers at once (batch mode)
+# vddList = 0.67 + 0.002*np.arange(1, 201)
+# vddMinList, powerList, propTimeList = sweep.batchVddSweep(wc, range(NUM_WAFERS), vddList, freq=4e9)
+# vddMinList, powerList, propTimeList = list(vddMinList), list(powerList), list(propTimeList)
+
+# #loop over proc var, sharded over all cores (same results as serial)
+# if __name__ == '__main__':
+#     vddMinList, powerList, propTimeList = sweep.runSweep('pickle\\10k lots 100 tr.pkl', NUM_WAFERS, 
+#                                                          workers=None, search={'method': 'linear'},
+#                                                          checkpoint='pickle\\Vdd min tests 10k - checkpoint.pkl')
+#     #rerun after a crash/Ctrl-C to resume from the checkpoint, finished wafers are skipped
+
+# #loop over proc var, sharded, streaming histograms only (constant memory for any number of wafers)
+# if __name__ == '__main__':
+#     hists = stats.sweepHists()
+#     sweep.runSweep('pickle\\10k lots 100 tr.pkl', NUM_WAFERS, hists=hists, keepLists=False)
+#     for key in hists:
+#         cl.purple(key)
+#         print('\t' + str(hists[key].summary()))
+#     with open('pickle\\FILE NAME HERE - Vdd min tests 10k - hists.pkl', 'wb') as f:
+#         pickle.dump(hists, f)
+#     plotter = plot.PLOTTER()
+#     plotter.binPlot(x=hists['vddMin'], title='Binned Plot of Minimum Passing Vdd', xlabel='Vdd (V)', ylabel='Count')
+#     plotter.binPlot(x=hists['power'], title='Binned Plot of Average Power', xlabel='Power (mW)', ylabel='Count')
+#     plotter.binPlot(x=hists['propTime'], title='Binned Plot of Propagation Time', xlabel='Time (s)', ylabel='Count', xLogPlot=True)
+
+# #where does the sweep time go: call counts and wall time per gate class, FET method and TestBench phase
+# instrument.enable() #opt-in, no overhead until enabled
+# sweep.runSweep('pickle\\10k lots 100 tr.pkl', 100, workers=1) #only this process is instrumented
+# instrument.disable()
+# instrument.prTable()
+# instrument.dump('pickle\\FILE NAME HERE - sweep profile.json')
+
+# #loop over proc var, bisection over Vdd (about 11 evaluations per wafer instead of dozens)
+# faFactory = sweep.FullAdderFactory(wc, freq=4e9)
+# evalCount = 0
+# for i in range(NUM_WAFERS):
+#     vddMin, tb, evals = sweep.findVddMin(faFactory, i, lo=0.67, hi=1.8, tol=0.002)
+#     evalCount += evals
+#     vddMinList.append(vddMin)
+#     powerList.append(tb.avgPwr*1e3)
+#     propTimeList.append(max(tb.propTimeList))
+#     pb.update(i)
+# cl.blue(f'Average evaluations per wafer: {evalCount/NUM_WAFERS}')
+
 # #loop over Vdd and proc var
 # for i in range(NUM_WAFERS):
 #     wc.waferNum = i
@@ -488,29 +461,17 @@ with open('pickle\\Vdd min + 0.01 tests 10k - powerList.pkl', 'rb') as f:
 with open('pickle\\Vdd min + 0.01 tests 10k - propTimeList.pkl', 'rb') as f:
     propTimeList = pickle.load(f)
 
-popIdxs = []
-for i in range(len(propTimeList)):
-    if propTimeList[i] > 30e-12:
-        popIdxs.append(i)
-for i in reversed(popIdxs):
-    vddMinList.pop(i)
-    powerList.pop(i)
-    propTimeList.pop(i)
-
-assert len(vddMinList)==len(powerList) and len(powerList)==len(propTimeList)
-cl.yellow(f'Yield = {len(propTimeList)/100}%')
-cl.purple('Vdd min')
-print('\t' + f'Min = {min(vddMinList)}')
-print('\t' + f'Avg = {np.mean(vddMinList)}')
-print('\t' + f'Max = {max(vddMinList)}')
-cl.purple('Avg Pwr')
-print('\t' + f'Min = {min(powerList)}')
-print('\t' + f'Avg = {np.mean(powerList)}')
-print('\t' + f'Max = {max(powerList)}')
-cl.purple('Prop time')
-print('\t' + f'Min = {min(propTimeList)}')
-print('\t' + f'Avg = {np.mean(propTimeList)}')
-print('\t' + f'Max = {max(propTimeList)}')
+results = {'vddMin': vddMinList, 'power': powerList, 'propTime': propTimeList}
+passMask, yieldPct, summary = stats.yieldAnalysis(results, limits={'propTime': (None, 30e-12)})
+cl.yellow(f'Yield = {yieldPct}%')
+for key, name in (('vddMin', 'Vdd min'), ('power', 'Avg Pwr'), ('propTime', 'Prop time')):
+    cl.purple(name)
+    print('\t' + f'Min = {summary[key]["min"]}')
+    print('\t' + f'Avg = {summary[key]["mean"]}')
+    print('\t' + f'Max = {summary[key]["max"]}')
+vddMinList = np.asarray(vddMinList, dtype=float)[passMask]
+powerList = np.asarray(powerList, dtype=float)[passMask]
+propTimeList = np.asarray(propTimeList, dtype=float)[passMask]
 
 print('Plotting...')
 plotter = plot.PLOTTER()
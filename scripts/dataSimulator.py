@@ -1,8 +1,10 @@
 '''dataSimulator.py: Simulates process variation data across 5 parameters'''
 
 # Author: Luke Henderson
-__version__ = '2.0'
+__version__ = '2.7'
 
+import os
+import itertools
 import numpy as np
 import pickle
 
@@ -56,6 +58,241 @@ def genWafer(trCount=1):
                     'na': naWaferOffset + genGaussianSingle(3)})
     return ret
 
+#sigmas of genWafer, [lot offset, transistor delta]
+#   w and l lot offsets share a geometry offset, 'geom' sigma + own sigma
+LOT_SIGMA = {'epox': 0.5, 'tox': 0.5, 'geom': 5, 'w': 0.2, 'l': 0.2, 'na': 10}
+TR_SIGMA  = {'epox': 0.05, 'tox': 0.05, 'w': 2, 'l': 2, 'na': 3}
+LOTS_PER_STREAM = 1000 #lots generated from each random stream (see genLots)
+#standard normal lot offsets of genLotBlock, the dimensions of a lot design (see lotDesign)
+LOT_DIMS = ('epox', 'tox', 'geom', 'w', 'l', 'na')
+DESIGN_SPAWN_KEY = (0, 0) #SeedSequence spawn key of lot designs, apart from the lot streams (streamNum,)
+
+def genLotBlock(rng, numLots, trCount, design=None):
+    '''Generate lots with the genWafer distribution using a few array calls\n
+    Args:
+        rng [np.random.Generator]: random stream\n
+        numLots [int]: number of lots (wafers)\n
+        trCount [int]: transistors per lot\n
+        design [np.array]: optional [LOT_DIMS, numLots] standard normal lot offsets (see lotDesign)
+            replacing the random ones, the transistor deltas stay the same
+    Return:
+        [dict of np.array]: one [lot, transistor] float64 array per procVar key'''
+    offsets = rng.standard_normal((len(LOT_DIMS), numLots, 1))
+    if design is not None:
+        offsets = design[:, :, None]
+    lotOffset = {'epox': offsets[0]*LOT_SIGMA['epox'],
+                 'tox': offsets[1]*LOT_SIGMA['tox'],
+                 'w': offsets[2]*LOT_SIGMA['geom'] + offsets[3]*LOT_SIGMA['w'],
+                 'l': offsets[2]*LOT_SIGMA['geom'] + offsets[4]*LOT_SIGMA['l'],
+                 'na': offsets[5]*LOT_SIGMA['na']}
+    deltas = rng.standard_normal((len(noVar), numLots, trCount))
+    return {key: lotOffset[key] + delta*TR_SIGMA[key] for key, delta in zip(noVar, deltas)}
+
+def lotStream(seed, streamNum):
+    '''Random stream of one block of LOTS_PER_STREAM lots\n
+    Args:
+        seed [int]: root seed of the lot population\n
+        streamNum [int]: block number, lots streamNum*LOTS_PER_STREAM and up
+    Return:
+        [np.random.Generator]: same stream as np.random.SeedSequence(seed).spawn(n)[streamNum]'''
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(streamNum,)))
+
+def genLots(numLots, trCount=100, seed=0, firstLot=0, dtype=np.float64, out=None, design=None):
+    '''Generate lots (wafers) in the columnar layout, reproducible per lot\n
+    Args:
+        numLots [int]: number of lots (wafers)\n
+        trCount [int]: transistors per lot\n
+        seed [int]: root seed, lot i is the same for every numLots/firstLot\n
+        firstLot [int]: first lot number, for generating a population in parallel pieces\n
+        dtype [np.dtype]: column data type\n
+        out [dict of np.array]: optional [numLots, trCount] arrays to fill (e.g. openWaferStore writable)\n
+        design [np.array]: optional [LOT_DIMS, numLots] lot offsets of lots firstLot and up, see lotDesign
+    Return:
+        [dict of np.array]: one [lot, transistor] array per procVar key
+    Notes:
+        each block of LOTS_PER_STREAM lots has its own SeedSequence.spawn stream
+        every block a call touches is generated whole, normal draws cannot skip ahead in a stream and keep
+            lot i the same: a few lots cost as much as LOTS_PER_STREAM lots (about 20 ms at trCount=100),
+            generate populations in large ranges aligned to LOTS_PER_STREAM (genLotStore chunks are)'''
+    if out is None:
+        out = {key: np.empty((numLots, trCount), dtype=dtype) for key in noVar}
+    lastLot = firstLot + numLots
+    for streamNum in range(firstLot//LOTS_PER_STREAM, -(-lastLot//LOTS_PER_STREAM)):
+        streamFirst = streamNum*LOTS_PER_STREAM
+        start = max(firstLot, streamFirst)
+        stop = min(lastLot, streamFirst+LOTS_PER_STREAM)
+        blockDesign = None
+        if design is not None:
+            blockDesign = np.zeros((len(LOT_DIMS), LOTS_PER_STREAM))
+            blockDesign[:, start-streamFirst:stop-streamFirst] = design[:, start-firstLot:stop-firstLot]
+        block = genLotBlock(lotStream(seed, streamNum), LOTS_PER_STREAM, trCount, blockDesign)
+        for key in noVar:
+            out[key][start-firstLot:stop-firstLot] = block[key][start-streamFirst:stop-streamFirst]
+    return out
+
+def genLotStore(path, numLots, trCount=100, seed=0, dtype=np.float64, chunkLots=100*LOTS_PER_STREAM, method='mc'):
+    '''Generate lots directly into a wafer store, chunk by chunk (bounded memory)\n
+    Args:
+        path [str]: wafer store directory, created if needed\n
+        numLots, trCount, seed, dtype: see genLots\n
+        chunkLots [int]: lots generated per chunk\n
+        method [str]: lot offsets, 'mc' random (genLots), 'lhs' or 'sobol' stratified over the numLots lots (lotDesign)'''
+    design = None if method == 'mc' else lotDesign(numLots, method, seed)
+    os.makedirs(path, exist_ok=True)
+    cols = {key: np.lib.format.open_memmap(os.path.join(path, f'{key}.npy'), mode='w+', dtype=dtype, 
+                                           shape=(numLots, trCount)) for key in noVar}
+    for start in range(0, numLots, chunkLots):
+        stop = min(numLots, start+chunkLots)
+        genLots(stop-start, trCount, seed, firstLot=start, out={key: cols[key][start:stop] for key in noVar},
+                design=None if design is None else design[:, start:stop])
+    for col in cols.values():
+        col.flush()
+
+#Sobol direction numbers (Joe & Kuo, new-joe-kuo-6.21201) of dimensions 2 and up: (s, a, (m_1..m_s))
+SOBOL_DIRS = ((1, 0, (1,)), 
+              (2, 1, (1, 3)), 
+              (3, 1, (1, 3, 1)), 
+              (3, 2, (1, 1, 1)), 
+              (4, 1, (1, 1, 3, 3)), 
+              (4, 4, (1, 3, 5, 13)))
+SOBOL_BITS = 32 #bits per coordinate, up to 2**32 points
+
+def sobol(n, dims, rng=None):
+    '''Sobol low-discrepancy sequence in the unit hypercube\n
+    Args:
+        n [int]: number of points, powers of 2 are balanced best\n
+        dims [int]: dimensions, up to len(SOBOL_DIRS)+1\n
+        rng [np.random.Generator]: random digital shift (randomized QMC), None for the plain sequence
+    Return:
+        [np.array]: [n, dims] points, strictly inside (0, 1)'''
+    if dims > len(SOBOL_DIRS)+1:
+        cl.red(f'Error: Sobol direction numbers only cover {len(SOBOL_DIRS)+1} dimensions')
+        exit()
+    bits = np.arange(1, SOBOL_BITS+1, dtype=np.uint64)
+    dirs = [np.uint64(1) << (np.uint64(SOBOL_BITS) - bits)] #dimension 1, van der Corput
+    for s, a, m in SOBOL_DIRS[:dims-1]:
+        v = [int(m[k]) << (SOBOL_BITS-1-k) for k in range(s)]
+        for k in range(s, SOBOL_BITS):
+            vk = v[k-s] ^ (v[k-s] >> s)
+            for j in range(1, s):
+                vk ^= ((a >> (s-1-j)) & 1) * v[k-j]
+            v.append(vk)
+        dirs.append(np.array(v, dtype=np.uint64))
+    gray = np.arange(n, dtype=np.uint64)
+    gray ^= gray >> np.uint64(1)
+    points = np.zeros((n, dims), dtype=np.uint64)
+    for bit in range(SOBOL_BITS):
+        isSet = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        if not isSet.any():
+            break
+        for dim in range(dims):
+            points[isSet, dim] ^= dirs[dim][bit]
+    if rng is not None:
+        points ^= rng.integers(0, 2**SOBOL_BITS, size=dims, dtype=np.uint64)
+    return (points + 0.5) / 2**SOBOL_BITS
+
+def latinHypercube(n, dims, rng):
+    '''Latin hypercube sample in the unit hypercube, every dimension has one point in each of its n strata\n
+    Args:
+        n [int]: number of points\n
+        dims [int]: dimensions\n
+        rng [np.random.Generator]: random stream
+    Return:
+        [np.array]: [n, dims] points, strictly inside (0, 1) (rng.random() can draw 0.0, rounding can give 1.0)'''
+    strata = np.argsort(rng.random((dims, n)), axis=1).T
+    return np.clip((strata + rng.random((n, dims))) / n, np.nextafter(0, 1), np.nextafter(1, 0))
+
+#rational approximations (numerator, denominator) of normInv, highest power first
+#   Wichura, Algorithm AS241 (1988), the one statistics.NormalDist.inv_cdf uses
+NORM_INV_CENTRAL = ((2.5090809287301226727e+3, 3.3430575583588128105e+4, 6.7265770927008700853e+4, 
+                     4.5921953931549871457e+4, 1.3731693765509461125e+4, 1.9715909503065514427e+3, 
+                     1.3314166789178437745e+2, 3.3871328727963666080e+0),
+                    (5.2264952788528545610e+3, 2.8729085735721942674e+4, 3.9307895800092710610e+4, 
+                     2.1213794301586595867e+4, 5.3941960214247511077e+3, 6.8718700749205790830e+2, 
+                     4.2313330701600911252e+1, 1.0))
+NORM_INV_TAIL = ((7.7454501427834140764e-4, 2.2723844989269184583e-2, 2.4178072517745061177e-1, 
+                  1.2704582524523683826e+0, 3.6478483247632046050e+0, 5.7694972214606914055e+0, 
+                  4.6303378461565452959e+0, 1.4234371107496835773e+0),
+                 (1.0507500716444168432e-9, 5.4759380849953449460e-4, 1.5198666563616457197e-2, 
+                  1.4810397642748007459e-1, 6.8976733498510000455e-1, 1.6763848301838038494e+0, 
+                  2.0531916266377588219e+0, 1.0))
+NORM_INV_FAR_TAIL = ((2.0103343992922881327e-7, 2.7115555687434875782e-5, 1.2426609473880784386e-3, 
+                      2.6532189526576123093e-2, 2.9656057182850489123e-1, 1.7848265399172913358e+0, 
+                      5.4637849111641143699e+0, 6.6579046435011037772e+0),
+                     (2.0442631033899397856e-15, 1.4215117583164458887e-7, 1.8463183175100546818e-5, 
+                      7.8686913114561325910e-4, 1.4875361290850614853e-2, 1.3692988092273580531e-1, 
+                      5.9983220655588793769e-1, 1.0))
+
+def normInv(u):
+    '''Inverse standard normal CDF, vectorized AS241 (matches statistics.NormalDist().inv_cdf)\n
+    Args:
+        u [np.array]: probabilities, strictly inside (0, 1)
+    Return:
+        [np.array]: standard normal values, same shape'''
+    u = np.asarray(u, dtype=np.float64)
+    q = u - 0.5
+    x = np.empty_like(q)
+    central = np.abs(q) <= 0.425
+    qc = q[central]
+    r = 0.180625 - qc*qc
+    x[central] = np.polyval(NORM_INV_CENTRAL[0], r)*qc / np.polyval(NORM_INV_CENTRAL[1], r)
+    tail = ~central
+    qt = q[tail]
+    r = np.sqrt(-np.log(np.where(qt <= 0, u[tail], 1-u[tail])))
+    near = np.polyval(NORM_INV_TAIL[0], r-1.6) / np.polyval(NORM_INV_TAIL[1], r-1.6)
+    far = np.polyval(NORM_INV_FAR_TAIL[0], r-5) / np.polyval(NORM_INV_FAR_TAIL[1], r-5)
+    xt = np.where(r <= 5, near, far)
+    x[tail] = np.where(qt < 0, -xt, xt)
+    return x
+
+def lotDesign(numLots, method='lhs', seed=0):
+    '''Stratified lot offsets, estimates over the lots converge faster than with random (genLots) lots\n
+    Args:
+        numLots [int]: number of lots of the design\n
+        method [str]: 'lhs' Latin hypercube, 'sobol' digitally shifted Sobol (numLots a power of 2 is best)\n
+        seed [int]: root seed, see genLots
+    Return:
+        [np.array]: [LOT_DIMS, numLots] standard normal lot offsets, for genLots/genLotStore
+    Notes:
+        only the lot offsets (the large variation) are stratified, transistors keep their random deltas
+            within each lot, so the wafer/lot hierarchy is the same as genWafer
+        every lot carries equal weight, yields and means are plain averages over the lots (stats.yieldAnalysis)'''
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=DESIGN_SPAWN_KEY))
+    if method == 'lhs':
+        unit = latinHypercube(numLots, len(LOT_DIMS), rng)
+    elif method == 'sobol':
+        unit = sobol(numLots, len(LOT_DIMS), rng)
+    else:
+        cl.red(f'Error: unknown lot design method "{method}"')
+        exit()
+    return normInv(unit).T
+
+def genCornerGrid(levels=(-3, 0, 3)):
+    '''Full-factorial process corners over the five procVar keys\n
+    Args:
+        levels [tuple of float]: sigma levels of every key, procVar1s is 1 sigma
+    Return:
+        [list of procVar dicts]: len(levels)**5 corners, the first key (epox) varies slowest
+    Notes:
+        corners bound the process (e.g. worst case Vdd-min), they are not weighted by probability, use
+            lotDesign for yield'''
+    return [{key: level*procVar1s[key] for key, level in zip(noVar, combo)} 
+            for combo in itertools.product(levels, repeat=len(noVar))]
+
+def genCornerLots(levels=(-3, 0, 3), trCount=100, seed=0):
+    '''One lot per genCornerGrid corner, transistors vary around the corner like within a lot (TR_SIGMA)\n
+    Args:
+        levels [tuple of float]: see genCornerGrid\n
+        trCount [int]: transistors per lot\n
+        seed [int]: root seed of the transistor deltas
+    Return:
+        [dict of np.array]: one [lot, transistor] array per procVar key, see saveWaferStore'''
+    corners = genCornerGrid(levels)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=DESIGN_SPAWN_KEY))
+    deltas = rng.standard_normal((len(noVar), len(corners), trCount))
+    return {key: np.array([[corner[key]] for corner in corners]) + delta*TR_SIGMA[key] 
+            for key, delta in zip(noVar, deltas)}
+
 #usage: ds.noVar.copy()
 noVar = \
     {'epox': 0,
@@ -71,27 +308,99 @@ procVar1s = \
      'na': 10}
 
 
+def waferListToCols(waferArr, dtype=np.float64):
+    '''Convert wafers of procVar dicts to the columnar wafer layout\n
+    Args:
+        waferArr [list of list of dict (procVar type)]: [wafer][transistor], e.g. list of genWafer()\n
+        dtype [np.dtype]: column data type
+    Return:
+        [dict of np.array]: one [wafer, transistor] array per procVar key'''
+    numWafers = len(waferArr)
+    trCount = len(waferArr[0])
+    cols = {key: np.empty((numWafers, trCount), dtype=dtype) for key in noVar}
+    for waferNum, wafer in enumerate(waferArr):
+        for key in noVar:
+            cols[key][waferNum] = [procVar[key] for procVar in wafer]
+    return cols
+
+def saveWaferStore(cols, path, dtype=np.float64):
+    '''Save columnar wafers as a wafer store (one .npy file per procVar key)\n
+    Args:
+        cols [dict of np.array]: one [wafer, transistor] array per procVar key\n
+        path [str]: wafer store directory, created if needed\n
+        dtype [np.dtype]: stored data type (np.float32 halves the size)'''
+    os.makedirs(path, exist_ok=True)
+    for key in noVar:
+        np.save(os.path.join(path, f'{key}.npy'), np.asarray(cols[key], dtype=dtype))
+
+def openWaferStore(path):
+    '''Open a wafer store memory-mapped (read only, only touched pages are loaded)\n
+    Args:
+        path [str]: wafer store directory
+    Return:
+        [dict of np.memmap]: one [wafer, transistor] array per procVar key'''
+    cols = {key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode='r') for key in noVar}
+    assert len(set(col.shape for col in cols.values())) == 1
+    return cols
+
+def convertWaferPickle(pklPath, storePath, dtype=np.float64):
+    '''Convert a pickled wafer list (list of list of procVar dicts) into a wafer store\n
+    Args:
+        pklPath [str]: path of wafer pickle file\n
+        storePath [str]: wafer store directory, created if needed\n
+        dtype [np.dtype]: stored data type'''
+    with open(pklPath, 'rb') as f:
+        waferArr = pickle.load(f)
+    os.makedirs(storePath, exist_ok=True)
+    shape = (len(waferArr), len(waferArr[0]))
+    for key in noVar:
+        col = np.lib.format.open_memmap(os.path.join(storePath, f'{key}.npy'), mode='w+', dtype=dtype, shape=shape)
+        for waferNum, wafer in enumerate(waferArr):
+            col[waferNum] = [procVar[key] for procVar in wafer]
+        col.flush()
+        del col
+
+
 class WaferConsumer:
     '''Wafer Consumer class'''
 
     def __init__(self, path=None):
         '''Wafer Consumer\n
         Args:
-            path [str]: path of wafer pickle file
+            path [str]: path of wafer pickle file (list of list of procVar dicts)\n
+                or wafer store directory (see saveWaferStore), opened memory-mapped
         Notes:
             self.waferIter [list of int]: the iterator for used transistor for each wafer\n
-            self.waferNum [int]: wafer currently being used for testing/consuming'''
-        with open(path, 'rb') as f:
-            self.waferArr = pickle.load(f)
-        self.waferIter = [0]*len(self.waferArr)
+            self.waferNum [int]: wafer currently being used for testing/consuming\n
+            self.waferNums [list of int]: wafers consumed together in batch mode (see consume)
+                None for single wafer mode'''
+        if os.path.isdir(path):
+            self.waferArr = None
+            self.waferCols = openWaferStore(path)
+            self.numWafers, self.trCount = self.waferCols['epox'].shape
+            self.waferIter = np.zeros(self.numWafers, dtype=np.int64)
+        else:
+            with open(path, 'rb') as f:
+                self.waferArr = pickle.load(f)
+            self.waferCols = None
+            self.numWafers = len(self.waferArr)
+            self.waferIter = [0]*self.numWafers
         self.waferNum = 0
+        self.waferNums = None
 
     def consume(self, num):
         '''Consume x number of wafers. \n
         Args:
             num [int]: how many wafers to consume
         Return:
-            [list of dict (procVar type)]: subarray of X wafers deterministically given in order'''
+            [list of dict (procVar type)]: subarray of X wafers deterministically given in order
+            [list of dict of np.array]: batch mode (self.waferNums set), one columnar procVar 
+                per transistor with one element per wafer in self.waferNums'''
+        if self.waferNums is not None:
+            return self.consumeBatch(num)
+        if self.waferCols is not None:
+            cols = self.consumeCols(num)
+            return [{key: float(cols[key][trNum]) for key in noVar} for trNum in range(num)]
         # cl.blue(f'consuming from wafer #{waferNum}, returning {num} trs')
         # cl.yellow(f'this wafers iter is currenly {self.waferIter[waferNum]}')
         ret = []
@@ -107,6 +416,58 @@ class WaferConsumer:
         self.waferIter[self.waferNum] += num
         # cl.purple(f'this wafers iter increased   {self.waferIter[waferNum]}')
         return ret
+
+    def consumeBatch(self, num):
+        '''Consume x number of transistors from every wafer in self.waferNums (batch mode)\n
+        Args:
+            num [int]: how many transistors to consume per wafer
+        Return:
+            [list of dict of np.array]: columnar procVar per transistor, indexed like self.waferNums'''
+        ret = []
+        if self.waferCols is not None:
+            waferIdx = self.batchIndex()
+            trIter = self.waferIter[self.waferNums[0]]
+            assert np.all(self.waferIter[waferIdx] == trIter)
+            for trNum in range(num):
+                ret.append({key: self.waferCols[key][waferIdx, trIter+trNum] for key in noVar})
+            self.waferIter[waferIdx] += num
+        else:
+            for trNum in range(num):
+                trs = [self.waferArr[waferNum][self.waferIter[waferNum]+trNum] for waferNum in self.waferNums]
+                ret.append({key: np.array([procVar[key] for procVar in trs]) for key in noVar})
+            for waferNum in self.waferNums:
+                self.waferIter[waferNum] += num
+        return ret
+
+    def batchIndex(self):
+        '''Index of self.waferNums into the wafer store arrays\n
+        Return:
+            [slice or list of int]: a slice (zero-copy view) for a contiguous range, else the wafer numbers'''
+        if isinstance(self.waferNums, range) and self.waferNums.step == 1:
+            return slice(self.waferNums.start, self.waferNums.stop)
+        return self.waferNums
+
+    def consumeCols(self, num):
+        '''Consume x number of transistors from the current wafer as columns (wafer store only)\n
+        Args:
+            num [int]: how many transistors to consume
+        Return:
+            [dict of np.array]: zero-copy views of the wafer store, one per procVar key'''
+        assert self.waferCols is not None
+        trIter = self.waferIter[self.waferNum]
+        ret = {key: self.waferCols[key][self.waferNum, trIter:trIter+num] for key in noVar}
+        self.waferIter[self.waferNum] += num
+        return ret
+
+    def resetIter(self):
+        '''Reset the transistor iterator of the current wafer(s)'''
+        if self.waferNums is not None and self.waferCols is not None:
+            self.waferIter[self.batchIndex()] = 0
+        elif self.waferNums is not None:
+            for waferNum in self.waferNums:
+                self.waferIter[waferNum] = 0
+        else:
+            self.waferIter[self.waferNum] = 0
         
 
 class DummyWaferConsumer:
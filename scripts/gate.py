@@ -1,9 +1,11 @@
 '''gate.py generates logic gates'''
 
 # Author: Luke Henderson
-__version__ = '1.1'
+__version__ = '1.12'
 
 import math
+from collections import OrderedDict
+import numpy as np
 
 import colors as cl
 import debugTools as dt
@@ -12,17 +14,274 @@ import transistor as tr
 
 TAUS_PER_OPERATION = 5
 noVar = ds.noVar.copy()
+#instance attributes every gate class has, its __slots__ add INPUTS, CINS, FETS and sub-gates
+GATE_SLOTS = ('cld', 'vout', 'vdd', 'ssVfinal', 'ssCurr', 'ssPwr', 'voutFinal', 'tau', 'stepTime', 'stepChg', 
+              'stepEnergy', 'initVout', 'cache', 'cacheKey', 'trusted', 'batched', 'procKey')
+
+def isBatch(procVarArr):
+    '''Check whether procVarArr describes a batch of dies\n
+    Args:
+        procVarArr [List of procVar dicts]: scalar procVar per transistor, or
+            [List of dict of np.array]: columnar procVar per transistor, one element per die
+    Return:
+        [bool]: True for a batch (columnar) procVarArr'''
+    return bool(procVarArr) and isinstance(procVarArr[0]['epox'], np.ndarray)
+
+
+class ValueKey:
+    '''Value key class'''
+
+    __slots__ = ('vals', 'hashVal')
+
+    def __init__(self, vals):
+        '''Hashable tuple of values that keeps its hash (tuples recompute it on every dict lookup)\n
+        Args:
+            vals [tuple]: values compared on equality, a hash collision only costs this compare'''
+        self.vals = vals
+        self.hashVal = hash(vals)
+
+    def __hash__(self):
+        return self.hashVal
+
+    def __eq__(self, other):
+        return isinstance(other, ValueKey) and self.hashVal == other.hashVal and self.vals == other.vals
+
+
+def procKey(procVarArr):
+    '''Hashable identity of a gate's process variation\n
+    Args:
+        procVarArr [List of procVar dicts]: see gate classes
+    Return:
+        [ValueKey class]: the procVar values in order, None for noVar gates and batch mode'''
+    if not procVarArr or isBatch(procVarArr):
+        return None
+    return ValueKey(tuple(procVar[key] for procVar in procVarArr for key in noVar))
+
+def setTrusted(g, trusted=True):
+    '''Select the validated-once fast path of a gate, its transistors and sub-gates\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: gate, with cld set when trusted\n
+        trusted [bool]: True to validate now and skip validation in step() from now on
+            False to validate on every step
+    Notes:
+        transistors are validated when the gate is built, see tr.setFastPath for the global default'''
+    for sub in g.subGates():
+        setTrusted(sub, trusted)
+    if trusted:
+        g.validateModel()
+    g.trusted = trusted
+    for attr in g.FETS:
+        getattr(g, attr).trusted = trusted
+
+def numProcVar(g):
+    '''Args:
+        g [INV, NAND, NOR or XOR class]: gate
+    Return:
+        [int]: number of procVars the gate uses (its transistors and sub-gates), see reseed'''
+    return len(g.FETS) + sum(numProcVar(sub) for sub in g.subGates())
+
+def reseed(g, procVarArr):
+    '''Replace the process variation of a gate in place, as if it was rebuilt with procVarArr\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: gate\n
+        procVarArr [List of procVar dicts]: in constructor order, see the gate classes (extra entries are ignored)
+            [List of dict of np.array]: batch mode, the gate must have been built in batch mode
+            None for noVar
+    Notes:
+        only derived quantities change (transistor cgate/vth/ronCoef, cin, sub-gate cld),
+            the cld of the gate itself depends on its fan-out, see ts.Netlist.reseed'''
+    if isBatch(procVarArr) != g.batched:
+        cl.red('Error: reseed cannot switch a gate between batch and single die mode')
+        exit()
+    g.procKey = procKey(procVarArr)
+    for idx, attr in enumerate(g.FETS):
+        fet = getattr(g, attr)
+        fet.reseed(procVarArr[idx] if procVarArr else noVar)
+        fet.validateModel()
+    start = len(g.FETS)
+    for sub in g.subGates():
+        stop = start + numProcVar(sub)
+        reseed(sub, procVarArr[start:stop] if procVarArr else None)
+        start = stop
+    g.calcCaps()
+
+def setProcVar(g, fet, **procVar):
+    '''Change single procVar keys of one transistor in place, only their dependents are recomputed\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: gate, built in batch mode or with fet=tr.FET\n
+        fet [str]: transistor attribute, see FETS, sub-gate transistors as e.g. 'invA.nTr'\n
+        procVar [float or np.array]: new values by key, e.g. na=5 (see tr.FET)
+    Return:
+        [bool]: True if an input capacitance of g changed, the cld of the gates driving g is then stale
+            (ts.Netlist.setProcVar updates it lazily)
+    Notes:
+        a fraction of reseed(), e.g. na only changes vth/un/ronCoef and leaves cin as it is (see tr.PARAM_DEPS)'''
+    path = fet.split('.')
+    gates = [g]
+    for attr in path[:-1]:
+        gates.append(getattr(gates[-1], attr))
+    fet = getattr(gates[-1], path[-1])
+    stale = fet.setProcVar(**procVar)
+    fet.validateModel()
+    for dut in reversed(gates):
+        if not dut.batched:
+            dut.procKey = paramKey(dut)
+        if 'cgate' in stale:
+            dut.calcCaps()
+    return 'cgate' in stale
+
+def paramKey(g):
+    '''Hashable identity of a gate's transistor parameters, the procKey of a gate changed by setProcVar\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: single die gate
+    Return:
+        [ValueKey class]: the transistor parameters rds() and cin depend on, sub-gates included'''
+    return ValueKey(tuple((fet.cgate, fet.vth, fet.ronCoef) for fet in (getattr(g, attr) for attr in g.FETS)) 
+                    + tuple(paramKey(sub) for sub in g.subGates()))
+
+def setVdd(g, vdd):
+    '''Change the Vdd of a gate, its sub-gates and pmos rails in place\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: gate\n
+        vdd [float]: Vdd (V)
+            [np.array]: per die Vdd in batch mode'''
+    for sub in g.subGates():
+        setVdd(sub, vdd)
+    g.vdd = vdd
+    for attr in g.FETS:
+        fet = getattr(g, attr)
+        if fet.chanType == 'p':
+            fet.vrail = vdd
+            fet.validateModel()
+
+def reset(g):
+    '''Return a gate and its sub-gates to the state after construction (inputs and vout 0, no step results)\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: gate'''
+    for sub in g.subGates():
+        reset(sub)
+    for attr in g.INPUTS:
+        setattr(g, attr, 0)
+    g.vout = 0
+    for attr in StepCache.STEP_ATTRS:
+        setattr(g, attr, None)
+    g.cacheKey = None
+
+
+def stepTransient(g, nRds, pRds, subStepTime=0):
+    '''Transient parameters of a gate step, from its steady state (ssVfinal, ssCurr, ssPwr)\n
+    Args:
+        g [INV, NAND, NOR or XOR class]: gate, sets tau, stepTime, voutFinal, stepChg and stepEnergy\n
+        nRds [float]: pull-down resistance (Ohms)\n
+        pRds [float]: pull-up resistance (Ohms)
+            [np.array]: per die resistances in batch mode\n
+        subStepTime [float]: time (s) of sub-gates switching before the gate, e.g. the XOR inverters'''
+    if g.batched:
+        g.tau = g.cld*np.minimum(nRds, pRds)
+    else:
+        g.tau = g.cld*min(nRds, pRds)
+    g.stepTime = g.tau*TAUS_PER_OPERATION + subStepTime
+    deltaVpercentage = 1-math.exp(-TAUS_PER_OPERATION)
+    deltaV = (g.ssVfinal-g.vout) * deltaVpercentage 
+    g.voutFinal = g.vout + deltaV #actual final output voltage
+    g.stepChg = g.cld * deltaV
+    g.stepEnergy = (1/2)*g.cld*(deltaV**2)
+    #discharging draws the steady state current for the whole step
+    if g.batched:
+        discharging = g.stepChg < 0
+        g.stepChg = np.where(discharging, g.ssCurr * g.stepTime, g.stepChg)
+        g.stepEnergy = np.where(discharging, g.ssPwr * g.stepTime, g.stepEnergy)
+    elif g.stepChg < 0:
+        g.stepChg = g.ssCurr * g.stepTime
+        g.stepEnergy = g.ssPwr * g.stepTime
+
+
+class StepCache:
+    '''Step cache class'''
+
+    STEP_ATTRS = ('ssVfinal', 'ssCurr', 'ssPwr', 'voutFinal', 'tau', 'stepTime', 'stepChg', 'stepEnergy')
+
+    def __init__(self, maxSize=4096, vRes=1e-3):
+        '''LRU memo of gate steps, opt-in per gate with gate.cache = StepCache()\n
+        Args:
+            maxSize [int]: max number of cached steps\n
+            vRes [float]: resolution (V) that vdd, vout and inputs are quantized to for the key
+        Notes:
+            key: gate class, procKey, cld, and quantized vdd/vout/inputs (gate.cacheInputs())
+            can be shared between gates, gates with the same key share results
+            hits [int]: number of steps served from the cache
+            misses [int]: number of steps evaluated'''
+        self.maxSize = maxSize
+        self.vRes = vRes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, g):
+        '''Cache key of the gate's next step'''
+        vScale = 1/self.vRes
+        floor = math.floor
+        #float() first, rounding np.float64 directly is about 10x slower
+        return (type(g), g.procKey, g.cld, floor(float(g.vdd)*vScale+0.5), floor(float(g.vout)*vScale+0.5), 
+                tuple([floor(float(vin)*vScale+0.5) for vin in g.cacheInputs()]))
+
+    def load(self, g):
+        '''Restore the gate's step from the cache\n
+        Args:
+            g [INV, NAND, NOR or XOR class]: gate about to step
+        Return:
+            [bool]: True on a hit (step is complete), False if the gate needs to step (always for batch mode gates,
+                they are not cached)'''
+        if g.batched:
+            return False
+        g.cacheKey = self.key(g)
+        entry = self.entries.get(g.cacheKey)
+        if entry is None:
+            self.misses += 1
+            return False
+        self.entries.move_to_end(g.cacheKey)
+        self.hits += 1
+        for gate, vals in zip((g,) + g.subGates(), entry):
+            gate.initVout = gate.vout
+            for attr, val in vals.items():
+                setattr(gate, attr, val)
+        return True
+
+    def save(self, g):
+        '''Store the step the gate just completed'''
+        if g.batched:
+            return
+        self.entries[g.cacheKey] = tuple({attr: getattr(gate, attr) for attr in self.STEP_ATTRS + ('vout',)} 
+                                         for gate in (g,) + g.subGates())
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def hitRate(self):
+        '''Fraction of steps served from the cache'''
+        total = self.hits + self.misses
+        return self.hits/total if total else 0
 
 class INV:
     '''INV class'''
 
-    def __init__(self, vdd, vin=0, vout=0, procVarArr=None):
+    INPUTS = ('vin',) #input voltage attributes, in chgInputs() order
+    CINS = ('cin',) #input capacitance attributes, matching INPUTS
+    FETS = ('nTr', 'pTr') #transistor attributes
+    __slots__ = INPUTS + CINS + FETS + GATE_SLOTS
+
+    def __init__(self, vdd, vin=0, vout=0, procVarArr=None, fet=tr.GateFET):
         '''Inverter gate\n
         Args:
             procVarArr [List of procVar dicts]: given in order [nmos, pmos]\n
+                [List of dict of np.array]: batch mode, N dies evaluated at once (see isBatch)
             vdd [float]: Vdd upon initialization\n
             vin [float]: Vin upon initialization\n
-            Vout [float]: Vout upon initialization'''
+            Vout [float]: Vout upon initialization\n
+            fet [class]: transistor model of a single die gate, tr.FET also keeps the device parameters 
+                setProcVar needs (batch mode always uses tr.FETArray)
+        Notes:
+            in batch mode vdd/vin/vout/cld may be floats or np.arrays (one per die), 
+                and all calculated variables are np.arrays'''
         #simulation variables, to be loaded in during mapping
         self.vin = vin #voltage at gate [float]
         self.cld = None #load capacitance [F] (gate capacitance of next transistor(s))
@@ -37,14 +296,22 @@ class INV:
         self.stepTime = None #time [s] to complete last operation
         self.stepChg = None #charge [A-s, or coulombs] transferred during last operation
         self.stepEnergy = None #energy [W-s, or joules] consumed during last operation
+        self.cache = None #optional step memo [StepCache class]
+        self.cacheKey = None #cache key of the last step
+        self.trusted = tr.fastPath #skip validateModel() in step(), see setTrusted [bool]
         #generate transistors
-        if procVarArr:
-            self.nTr = tr.FET('n', procVarArr[0])
-            self.pTr = tr.FET('p', procVarArr[1])
+        self.batched = isBatch(procVarArr)
+        self.procKey = procKey(procVarArr)
+        if self.batched:
+            self.nTr = tr.FETArray('n', procVarArr[0])
+            self.pTr = tr.FETArray('p', procVarArr[1])
+        elif procVarArr:
+            self.nTr = fet('n', procVarArr[0])
+            self.pTr = fet('p', procVarArr[1])
         else:
-            self.nTr = tr.FET('n', noVar)
-            self.pTr = tr.FET('p', noVar)
-        self.cin = self.nTr.cgate + self.pTr.cgate
+            self.nTr = fet('n', noVar)
+            self.pTr = fet('p', noVar)
+        self.calcCaps()
         #map transistors
         #nTr
         self.nTr.inGate = True
@@ -57,14 +324,38 @@ class INV:
     def validateModel(self):
         '''Validates whether model is set up correctly'''
         #simulation variables
+        if self.batched:
+            assert np.all(np.asarray(self.vin)>=0)
+            assert np.all(np.asarray(self.cld)>=0)
+            assert np.all(np.asarray(self.vout)>=0)
+            assert np.all(np.asarray(self.vdd)>0)
+            return
         assert self.vin>=0
         assert self.cld>=0
         assert self.vout>=0
         assert self.vdd>0
 
+    def calcCaps(self):
+        '''Input capacitance from the transistors (on build and reseed)'''
+        self.cin = self.nTr.cgate + self.pTr.cgate
+
+    def chgInputs(self, vin):
+        self.vin = vin
+
+    def cacheInputs(self):
+        '''Inputs that determine the next step, see StepCache'''
+        return (self.vin,)
+
+    def subGates(self):
+        '''Gates stepped inside this gate, see StepCache'''
+        return ()
+
     def step(self):
         '''Step the model forward one time chunk'''
-        self.validateModel()
+        if self.cache is not None and self.cache.load(self):
+            return
+        if not self.trusted:
+            self.validateModel()
         #calculate steady state parameters
         nRds = self.nTr.rds(self.vin)
         pRds = self.pTr.rds(self.vin)
@@ -73,16 +364,7 @@ class INV:
         self.ssPwr = self.vdd**2/sumRds #steady-state power
         self.ssVfinal = self.vdd*(nRds/sumRds) #steady state final output voltage (theoretical, not reached)
         #calculate transient parameters
-        self.tau = self.cld*min(nRds, pRds)
-        self.stepTime = self.tau*TAUS_PER_OPERATION
-        deltaVpercentage = 1-math.exp(-TAUS_PER_OPERATION)
-        deltaV = (self.ssVfinal-self.vout) * deltaVpercentage 
-        self.voutFinal = self.vout + deltaV #actual final output voltage
-        self.stepChg = self.cld * deltaV
-        self.stepEnergy = (1/2)*self.cld*(deltaV**2)
-        if self.stepChg < 0:
-            self.stepChg = self.ssCurr * self.stepTime
-            self.stepEnergy = self.ssPwr * self.stepTime
+        stepTransient(self, nRds, pRds)
         # print(f'pRds is {pRds}')
         # print(f'nRds is {nRds}')
         # print(f'sumRds is {sumRds}')
@@ -94,18 +376,28 @@ class INV:
         #prepare for next step
         self.initVout = self.vout
         self.vout = self.voutFinal
+        if self.cache is not None:
+            self.cache.save(self)
         
 class NAND:
     '''NAND class'''
 
-    def __init__(self, vdd, vinA=0, vinB=0, vout=0, procVarArr=None):
+    INPUTS = ('vinA', 'vinB') #input voltage attributes, in chgInputs() order
+    CINS = ('cinA', 'cinB') #input capacitance attributes, matching INPUTS
+    FETS = ('nTrA', 'nTrB', 'pTrA', 'pTrB') #transistor attributes
+    __slots__ = INPUTS + CINS + FETS + GATE_SLOTS
+
+    def __init__(self, vdd, vinA=0, vinB=0, vout=0, procVarArr=None, fet=tr.GateFET):
         '''NAND gate \n
         Args:
             procVarArr [List of procVar dicts]: given in order [nmos A, nmos B, pmos A, pmos B]\n
+                [List of dict of np.array]: batch mode, N dies evaluated at once (see INV)
             vdd [float]: Vdd upon initialization\n
             vinA [float]: Vin A upon initialization\n
             vinB [float]: Vin B upon initialization\n
-            Vout [float]: Vout upon initialization'''
+            Vout [float]: Vout upon initialization\n
+            fet [class]: transistor model of a single die gate, tr.FET also keeps the device parameters 
+                setProcVar needs (batch mode always uses tr.FETArray)'''
         #simulation variables, to be loaded in during mapping
         self.vinA = vinA #voltage A at gate [float]
         self.vinB = vinB #voltage B at gate [float]
@@ -121,19 +413,24 @@ class NAND:
         self.stepTime = None #time [s] to complete last operation
         self.stepChg = None #charge [A-s, or coulombs] transferred during last operation
         self.stepEnergy = None #energy [W-s, or joules] consumed during last operation
+        self.cache = None #optional step memo [StepCache class]
+        self.cacheKey = None #cache key of the last step
+        self.trusted = tr.fastPath #skip validateModel() in step(), see setTrusted [bool]
         #generate transistors
+        self.batched = isBatch(procVarArr)
+        self.procKey = procKey(procVarArr)
         if procVarArr:
-            self.nTrA = tr.FET('n', procVarArr[0])
-            self.nTrB = tr.FET('n', procVarArr[1])
-            self.pTrA = tr.FET('p', procVarArr[2])
-            self.pTrB = tr.FET('p', procVarArr[3])
+            fetClass = tr.FETArray if self.batched else fet
+            self.nTrA = fetClass('n', procVarArr[0])
+            self.nTrB = fetClass('n', procVarArr[1])
+            self.pTrA = fetClass('p', procVarArr[2])
+            self.pTrB = fetClass('p', procVarArr[3])
         else:
-            self.nTrA = tr.FET('n', noVar)
-            self.nTrB = tr.FET('n', noVar)
-            self.pTrA = tr.FET('p', noVar)
-            self.pTrB = tr.FET('p', noVar)
-        self.cinA = self.nTrA.cgate + self.pTrA.cgate
-        self.cinB = self.nTrB.cgate + self.pTrB.cgate
+            self.nTrA = fet('n', noVar)
+            self.nTrB = fet('n', noVar)
+            self.pTrA = fet('p', noVar)
+            self.pTrB = fet('p', noVar)
+        self.calcCaps()
         #map transistors
         #nTr
         self.nTrA.inGate = True
@@ -151,15 +448,42 @@ class NAND:
     def validateModel(self):
         '''Validates whether model is set up correctly'''
         #simulation variables
+        if self.batched:
+            assert np.all(np.asarray(self.vinA)>=0)
+            assert np.all(np.asarray(self.vinB)>=0)
+            assert np.all(np.asarray(self.cld)>=0)
+            assert np.all(np.asarray(self.vout)>=0)
+            assert np.all(np.asarray(self.vdd)>0)
+            return
         assert self.vinA>=0
         assert self.vinB>=0
         assert self.cld>=0
         assert self.vout>=0
         assert self.vdd>0
 
+    def calcCaps(self):
+        '''Input capacitances from the transistors (on build and reseed)'''
+        self.cinA = self.nTrA.cgate + self.pTrA.cgate
+        self.cinB = self.nTrB.cgate + self.pTrB.cgate
+
+    def chgInputs(self, vinA, vinB):
+        self.vinA = vinA
+        self.vinB = vinB
+
+    def cacheInputs(self):
+        '''Inputs that determine the next step, see StepCache'''
+        return (self.vinA, self.vinB)
+
+    def subGates(self):
+        '''Gates stepped inside this gate, see StepCache'''
+        return ()
+
     def step(self):
         '''Step the model forward one time chunk'''
-        self.validateModel()
+        if self.cache is not None and self.cache.load(self):
+            return
+        if not self.trusted:
+            self.validateModel()
         #calculate steady state parameters
         nRdsA = self.nTrA.rds(self.vinA)
         nRdsB = self.nTrB.rds(self.vinB)
@@ -172,16 +496,7 @@ class NAND:
         self.ssPwr = self.vdd**2/sumRds #steady-state power
         self.ssVfinal = self.vdd*(nRds/sumRds) #steady state final output voltage (theoretical, not reached)
         #calculate transient parameters
-        self.tau = self.cld*min(nRds, pRds)
-        self.stepTime = self.tau*TAUS_PER_OPERATION
-        deltaVpercentage = 1-math.exp(-TAUS_PER_OPERATION)
-        deltaV = (self.ssVfinal-self.vout) * deltaVpercentage 
-        self.voutFinal = self.vout + deltaV #actual final output voltage
-        self.stepChg = self.cld * deltaV
-        self.stepEnergy = (1/2)*self.cld*(deltaV**2)
-        if self.stepChg < 0:
-            self.stepChg = self.ssCurr * self.stepTime
-            self.stepEnergy = self.ssPwr * self.stepTime
+        stepTransient(self, nRds, pRds)
         # print(f'pRds is {pRds}')
         # print(f'nRds is {nRds}')
         # print(f'sumRds is {sumRds}')
@@ -193,18 +508,28 @@ class NAND:
         #prepare for next step
         self.initVout = self.vout
         self.vout = self.voutFinal
+        if self.cache is not None:
+            self.cache.save(self)
 
 class NOR:
     '''NOR class'''
 
-    def __init__(self, vdd, vinA=0, vinB=0, vout=0, procVarArr=None):
+    INPUTS = ('vinA', 'vinB') #input voltage attributes, in chgInputs() order
+    CINS = ('cinA', 'cinB') #input capacitance attributes, matching INPUTS
+    FETS = ('nTrA', 'nTrB', 'pTrA', 'pTrB') #transistor attributes
+    __slots__ = INPUTS + CINS + FETS + GATE_SLOTS
+
+    def __init__(self, vdd, vinA=0, vinB=0, vout=0, procVarArr=None, fet=tr.GateFET):
         '''NOR gate \n
         Args:
             procVarArr [List of procVar dicts]: given in order [nmos A, nmos B, pmos A, pmos B]\n
+                [List of dict of np.array]: batch mode, N dies evaluated at once (see INV)
             vdd [float]: Vdd upon initialization\n
             vinA [float]: Vin A upon initialization\n
             vinB [float]: Vin B upon initialization\n
-            Vout [float]: Vout upon initialization'''
+            Vout [float]: Vout upon initialization\n
+            fet [class]: transistor model of a single die gate, tr.FET also keeps the device parameters 
+                setProcVar needs (batch mode always uses tr.FETArray)'''
         #simulation variables, to be loaded in during mapping
         self.vinA = vinA #voltage A at gate [float]
         self.vinB = vinB #voltage B at gate [float]
@@ -220,19 +545,24 @@ class NOR:
         self.stepTime = None #time [s] to complete last operation
         self.stepChg = None #charge [A-s, or coulombs] transferred during last operation
         self.stepEnergy = None #energy [W-s, or joules] consumed during last operation
+        self.cache = None #optional step memo [StepCache class]
+        self.cacheKey = None #cache key of the last step
+        self.trusted = tr.fastPath #skip validateModel() in step(), see setTrusted [bool]
         #generate transistors
+        self.batched = isBatch(procVarArr)
+        self.procKey = procKey(procVarArr)
         if procVarArr:
-            self.nTrA = tr.FET('n', procVarArr[0])
-            self.nTrB = tr.FET('n', procVarArr[1])
-            self.pTrA = tr.FET('p', procVarArr[2])
-            self.pTrB = tr.FET('p', procVarArr[3])
+            fetClass = tr.FETArray if self.batched else fet
+            self.nTrA = fetClass('n', procVarArr[0])
+            self.nTrB = fetClass('n', procVarArr[1])
+            self.pTrA = fetClass('p', procVarArr[2])
+            self.pTrB = fetClass('p', procVarArr[3])
         else:
-            self.nTrA = tr.FET('n', noVar)
-            self.nTrB = tr.FET('n', noVar)
-            self.pTrA = tr.FET('p', noVar)
-            self.pTrB = tr.FET('p', noVar)
-        self.cinA = self.nTrA.cgate + self.pTrA.cgate
-        self.cinB = self.nTrB.cgate + self.pTrB.cgate
+            self.nTrA = fet('n', noVar)
+            self.nTrB = fet('n', noVar)
+            self.pTrA = fet('p', noVar)
+            self.pTrB = fet('p', noVar)
+        self.calcCaps()
         #map transistors
         #nTr
         self.nTrA.inGate = True
@@ -250,15 +580,42 @@ class NOR:
     def validateModel(self):
         '''Validates whether model is set up correctly'''
         #simulation variables
+        if self.batched:
+            assert np.all(np.asarray(self.vinA)>=0)
+            assert np.all(np.asarray(self.vinB)>=0)
+            assert np.all(np.asarray(self.cld)>=0)
+            assert np.all(np.asarray(self.vout)>=0)
+            assert np.all(np.asarray(self.vdd)>0)
+            return
         assert self.vinA>=0
         assert self.vinB>=0
         assert self.cld>=0
         assert self.vout>=0
         assert self.vdd>0
 
+    def calcCaps(self):
+        '''Input capacitances from the transistors (on build and reseed)'''
+        self.cinA = self.nTrA.cgate + self.pTrA.cgate
+        self.cinB = self.nTrB.cgate + self.pTrB.cgate
+
+    def chgInputs(self, vinA, vinB):
+        self.vinA = vinA
+        self.vinB = vinB
+
+    def cacheInputs(self):
+        '''Inputs that determine the next step, see StepCache'''
+        return (self.vinA, self.vinB)
+
+    def subGates(self):
+        '''Gates stepped inside this gate, see StepCache'''
+        return ()
+
     def step(self):
         '''Step the model forward one time chunk'''
-        self.validateModel()
+        if self.cache is not None and self.cache.load(self):
+            return
+        if not self.trusted:
+            self.validateModel()
         #calculate steady state parameters
         nRdsA = self.nTrA.rds(self.vinA)
         nRdsB = self.nTrB.rds(self.vinB)
@@ -271,16 +628,7 @@ class NOR:
         self.ssPwr = self.vdd**2/sumRds #steady-state power
         self.ssVfinal = self.vdd*(nRds/sumRds) #steady state final output voltage (theoretical, not reached)
         #calculate transient parameters
-        self.tau = self.cld*min(nRds, pRds)
-        self.stepTime = self.tau*TAUS_PER_OPERATION
-        deltaVpercentage = 1-math.exp(-TAUS_PER_OPERATION)
-        deltaV = (self.ssVfinal-self.vout) * deltaVpercentage 
-        self.voutFinal = self.vout + deltaV #actual final output voltage
-        self.stepChg = self.cld * deltaV
-        self.stepEnergy = (1/2)*self.cld*(deltaV**2)
-        if self.stepChg < 0:
-            self.stepChg = self.ssCurr * self.stepTime
-            self.stepEnergy = self.ssPwr * self.stepTime
+        stepTransient(self, nRds, pRds)
         # print(f'pRds is {pRds}')
         # print(f'nRds is {nRds}')
         # print(f'sumRds is {sumRds}')
@@ -292,20 +640,30 @@ class NOR:
         #prepare for next step
         self.initVout = self.vout
         self.vout = self.voutFinal
+        if self.cache is not None:
+            self.cache.save(self)
 
 class XOR:
     '''XOR class'''
 
-    def __init__(self, vdd, vinA=0, vinB=0, vout=0, procVarArr=None):
+    INPUTS = ('vinA', 'vinB') #input voltage attributes, in chgInputs() order
+    CINS = ('cinA', 'cinB') #input capacitance attributes, matching INPUTS
+    FETS = ('nTra', 'nTrb', 'nTrA', 'nTrB', 'pTra', 'pTrb', 'pTrA', 'pTrB') #transistor attributes (not in invA/invB)
+    __slots__ = INPUTS + CINS + FETS + GATE_SLOTS + ('invA', 'invB')
+
+    def __init__(self, vdd, vinA=0, vinB=0, vout=0, procVarArr=None, fet=tr.GateFET):
         '''XOR gate \n
         Args:
             procVarArr [List of procVar dicts, n=12]: given in order 
                 [nmos abAB, pmos abAB, invA-np, invB-np]
                     (for abAB the capitals are compliment)
+                [List of dict of np.array]: batch mode, N dies evaluated at once (see INV)
             vdd [float]: Vdd upon initialization\n
             vinA [float]: Vin A upon initialization\n
             vinB [float]: Vin B upon initialization\n
-            Vout [float]: Vout upon initialization'''
+            Vout [float]: Vout upon initialization\n
+            fet [class]: transistor model of a single die gate, tr.FET also keeps the device parameters 
+                setProcVar needs (batch mode always uses tr.FETArray)'''
         #simulation variables, to be loaded in during mapping
         self.vinA = vinA #voltage A at gate [float]
         self.vinB = vinB #voltage B at gate [float]
@@ -321,39 +679,40 @@ class XOR:
         self.stepTime = None #time [s] to complete last operation
         self.stepChg = None #charge [A-s, or coulombs] transferred during last operation
         self.stepEnergy = None #energy [W-s, or joules] consumed during last operation
+        self.cache = None #optional step memo [StepCache class]
+        self.cacheKey = None #cache key of the last step
+        self.trusted = tr.fastPath #skip validateModel() in step(), see setTrusted [bool]
         #generate transistors
+        self.batched = isBatch(procVarArr)
+        self.procKey = procKey(procVarArr)
         if procVarArr:
-            self.nTra = tr.FET('n', procVarArr[0])
-            self.nTrb = tr.FET('n', procVarArr[1])
-            self.nTrA = tr.FET('n', procVarArr[2])
-            self.nTrB = tr.FET('n', procVarArr[3])
-
-            self.pTra = tr.FET('p', procVarArr[4])
-            self.pTrb = tr.FET('p', procVarArr[5])
-            self.pTrA = tr.FET('p', procVarArr[6])
-            self.pTrB = tr.FET('p', procVarArr[7])
-
-            self.invA = INV(vdd=self.vdd, vout=0, vin=self.vinA, procVarArr=procVarArr[8:10])
-            self.invA.cld = self.nTrA.cgate + self.pTrA.cgate
-            self.invB = INV(vdd=self.vdd, vout=0, vin=self.vinB, procVarArr=procVarArr[10:12])
-            self.invB.cld = self.nTrB.cgate + self.pTrB.cgate
+            fetClass = tr.FETArray if self.batched else fet
+            self.nTra = fetClass('n', procVarArr[0])
+            self.nTrb = fetClass('n', procVarArr[1])
+            self.nTrA = fetClass('n', procVarArr[2])
+            self.nTrB = fetClass('n', procVarArr[3])
+
+            self.pTra = fetClass('p', procVarArr[4])
+            self.pTrb = fetClass('p', procVarArr[5])
+            self.pTrA = fetClass('p', procVarArr[6])
+            self.pTrB = fetClass('p', procVarArr[7])
+
+            self.invA = INV(vdd=self.vdd, vout=0, vin=self.vinA, procVarArr=procVarArr[8:10], fet=fet)
+            self.invB = INV(vdd=self.vdd, vout=0, vin=self.vinB, procVarArr=procVarArr[10:12], fet=fet)
         else:
-            self.nTra = tr.FET('n', noVar)
-            self.nTrb = tr.FET('n', noVar)
-            self.nTrA = tr.FET('n', noVar)
-            self.nTrB = tr.FET('n', noVar)
-
-            self.pTra = tr.FET('p', noVar)
-            self.pTrb = tr.FET('p', noVar)
-            self.pTrA = tr.FET('p', noVar)
-            self.pTrB = tr.FET('p', noVar)
-
-            self.invA = INV(vdd=self.vdd, vout=0, vin=self.vinA)
-            self.invA.cld = self.nTrA.cgate + self.pTrA.cgate
-            self.invB = INV(vdd=self.vdd, vout=0, vin=self.vinB)
-            self.invB.cld = self.nTrB.cgate + self.pTrB.cgate
-        self.cinA = self.nTrA.cgate + self.pTrA.cgate + self.invA.cin
-        self.cinB = self.nTrB.cgate + self.pTrB.cgate + self.invB.cin
+            self.nTra = fet('n', noVar)
+            self.nTrb = fet('n', noVar)
+            self.nTrA = fet('n', noVar)
+            self.nTrB = fet('n', noVar)
+
+            self.pTra = fet('p', noVar)
+            self.pTrb = fet('p', noVar)
+            self.pTrA = fet('p', noVar)
+            self.pTrB = fet('p', noVar)
+
+            self.invA = INV(vdd=self.vdd, vout=0, vin=self.vinA, fet=fet)
+            self.invB = INV(vdd=self.vdd, vout=0, vin=self.vinB, fet=fet)
+        self.calcCaps()
         #map transistors
         #nTr
         self.nTra.inGate = True
@@ -381,21 +740,46 @@ class XOR:
     def validateModel(self):
         '''Validates whether model is set up correctly'''
         #simulation variables
+        if self.batched:
+            assert np.all(np.asarray(self.vinA)>=0)
+            assert np.all(np.asarray(self.vinB)>=0)
+            assert np.all(np.asarray(self.cld)>=0)
+            assert np.all(np.asarray(self.vout)>=0)
+            assert np.all(np.asarray(self.vdd)>0)
+            return
         assert self.vinA>=0
         assert self.vinB>=0
         assert self.cld>=0
         assert self.vout>=0
         assert self.vdd>0
 
+    def calcCaps(self):
+        '''Input capacitances and inverter loads from the transistors (on build and reseed)'''
+        self.invA.cld = self.nTrA.cgate + self.pTrA.cgate
+        self.invB.cld = self.nTrB.cgate + self.pTrB.cgate
+        self.cinA = self.nTrA.cgate + self.pTrA.cgate + self.invA.cin
+        self.cinB = self.nTrB.cgate + self.pTrB.cgate + self.invB.cin
+
     def chgInputs(self, vinA, vinB):
         self.vinA = vinA
         self.vinB = vinB
         self.invA.vin = vinA
         self.invB.vin = vinB
 
+    def cacheInputs(self):
+        '''Inputs that determine the next step, see StepCache'''
+        return (self.vinA, self.vinB, self.invA.vout, self.invB.vout)
+
+    def subGates(self):
+        '''Gates stepped inside this gate, see StepCache'''
+        return (self.invA, self.invB)
+
     def step(self):
         '''Step the model forward one time chunk'''
-        self.validateModel()
+        if self.cache is not None and self.cache.load(self):
+            return
+        if not self.trusted:
+            self.validateModel()
         #calculate steady state parameters
         self.invA.step()
         self.invB.step()
@@ -423,19 +807,14 @@ class XOR:
         self.ssCurr = self.vdd/sumRds + self.invA.ssCurr + self.invB.ssCurr #steady-state current
         self.ssPwr = self.vdd**2/sumRds + self.invA.ssPwr + self.invB.ssPwr #steady-state power
         self.ssVfinal = self.vdd*(nRds/sumRds) #steady state final output voltage (theoretical, not reached)
-        #calculate transient parameters
-        self.tau = self.cld*min(nRds, pRds)
-        self.stepTime = self.tau*TAUS_PER_OPERATION + max(self.invA.stepTime, self.invB.stepTime)
-        deltaVpercentage = 1-math.exp(-TAUS_PER_OPERATION)
-        deltaV = (self.ssVfinal-self.vout) * deltaVpercentage 
-        self.voutFinal = self.vout + deltaV #actual final output voltage
+        #calculate transient parameters, the inverters switch first
+        if self.batched:
+            invStepTime = np.maximum(self.invA.stepTime, self.invB.stepTime)
+        else:
+            invStepTime = max(self.invA.stepTime, self.invB.stepTime)
+        stepTransient(self, nRds, pRds, invStepTime)
         # self.stepChg = self.cld * deltaV + self.invA.stepChg + self.invB.stepChg
         # self.stepEnergy = (1/2)*self.cld*(deltaV**2) + self.invA.stepEnergy + self.invB.stepEnergy
-        self.stepChg = self.cld * deltaV
-        self.stepEnergy = (1/2)*self.cld*(deltaV**2)
-        if self.stepChg < 0:
-            self.stepChg = self.ssCurr * self.stepTime
-            self.stepEnergy = self.ssPwr * self.stepTime
         self.stepChg += self.invA.stepChg + self.invB.stepChg
         self.stepEnergy += self.invA.stepEnergy + self.invB.stepEnergy
         # print(f'pRds is {pRds}')
@@ -449,6 +828,8 @@ class XOR:
         #prepare for next step
         self.initVout = self.vout
         self.vout = self.voutFinal
+        if self.cache is not None:
+            self.cache.save(self)
 
 if __name__ == '__main__':
     import numpy as np
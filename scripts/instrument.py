@@ -0,0 +1,129 @@
+'''instrument.py: opt-in call counters and wall time of the simulation hot paths'''
+
+# Author: Luke Henderson
+__version__ = '1.3'
+
+import functools
+import json
+import time
+
+import colors as cl
+import transistor as tr
+import gate
+import testSupport as ts
+import sweep
+
+#owner (class or module) → attributes wrapped by enable()
+TARGETS = {tr.GateFET:         ('__init__', 'validateModel', 'rds'),
+           tr.FET:             ('__init__', 'validateModel', 'step'),
+           tr.FETArray:        ('__init__', 'validateModel', 'rds'),
+           tr.RdsTable:        ('__init__', 'rds'),
+           gate.INV:           ('__init__', 'validateModel', 'step'),
+           gate.NAND:          ('__init__', 'validateModel', 'step'),
+           gate.NOR:           ('__init__', 'validateModel', 'step'),
+           gate.XOR:           ('__init__', 'validateModel', 'step'),
+           gate.StepCache:     ('load', 'save'),
+           ts.TestBench:       ('__init__', 'reset', 'setStim', 'setMultiStim', 'prStep', 'prStepMulti', 
+                                'saveStep', 'saveStepMulti', 'resScopeData', 'resScopeDataMulti', 'checkRes'),
+           ts.DutManager:      ('step',),
+           ts.MultiDutManager: ('__init__', 'reset', 'step'),
+           ts.Netlist:         ('compile', 'step', 'stepEvents'),
+           sweep:              ('buildFullAdder', 'valFullAdder')}
+
+_orig = {} #(owner, attr) → original function, while enabled
+_stats = {} #name → [calls, total time (s), self time (s)]
+_stack = [] #time (s) spent in the instrumented callees of every open call
+
+
+def spanName(owner, attr):
+    '''Args:
+        owner [class or module]: see TARGETS\n
+        attr [str]: function name
+    Return:
+        [str]: e.g. 'gate.XOR.step', 'sweep.valFullAdder' '''
+    if isinstance(owner, type):
+        return f'{owner.__module__}.{owner.__qualname__}.{attr}'
+    return f'{owner.__name__}.{attr}'
+
+def wrap(name, func):
+    '''Args:
+        name [str]: key in the summary\n
+        func [function]: function to count and time
+    Return:
+        [function]: wrapper adding its calls and wall time to _stats[name]'''
+    stat = _stats.setdefault(name, [0, 0.0, 0.0])
+    perfCounter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _stack.append(0.0)
+        t0 = perfCounter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perfCounter() - t0
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] += elapsed - _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+    return wrapper
+
+def enable(targets=None):
+    '''Start counting calls and wall time (patches the targets, existing objects included)\n
+    Args:
+        targets [dict]: owner → attribute names, default TARGETS
+    Notes:
+        only this process is instrumented, run sweeps with workers=1 to include them
+        disabled (the default) the original functions are in place, there is no overhead'''
+    for owner, attrs in (targets or TARGETS).items():
+        for attr in attrs:
+            if (owner, attr) in _orig:
+                continue
+            func = vars(owner)[attr]
+            _orig[(owner, attr)] = func
+            setattr(owner, attr, wrap(spanName(owner, attr), func))
+
+def disable():
+    '''Stop counting, the original functions are restored (collected stats are kept)'''
+    for (owner, attr), func in _orig.items():
+        setattr(owner, attr, func)
+    _orig.clear()
+
+def isEnabled():
+    '''Return:
+        [bool]: True while instrumented'''
+    return bool(_orig)
+
+def reset():
+    '''Zero the collected stats'''
+    for stat in _stats.values():
+        stat[:] = [0, 0.0, 0.0]
+
+def summary():
+    '''Return:
+        [dict of dict]: name → 'calls', 'total' (s, callees included), 'self' (s, instrumented callees excluded),
+            'perCall' (s), sorted by self time, functions never called are left out'''
+    ret = {}
+    for name, (calls, total, selfTime) in sorted(_stats.items(), key=lambda item: -item[1][2]):
+        if calls:
+            ret[name] = {'calls': calls, 'total': total, 'self': selfTime, 'perCall': total/calls}
+    return ret
+
+def prTable(top=None):
+    '''Print the summary as a table\n
+    Args:
+        top [int]: only the top entries by self time, None for all'''
+    stats = list(summary().items())[:top]
+    selfSum = sum(stat['self'] for _, stat in stats) or 1
+    cl.blue(f'{"function":<40}{"calls":>12}{"total (s)":>12}{"self (s)":>12}{"self %":>8}{"per call (us)":>15}')
+    for name, stat in stats:
+        print(f'{name:<40}{stat["calls"]:>12}{stat["total"]:>12.4f}{stat["self"]:>12.4f}'
+              f'{100*stat["self"]/selfSum:>8.1f}{stat["perCall"]*1e6:>15.3f}')
+
+def dump(path):
+    '''Save the summary as JSON\n
+    Args:
+        path [str]: JSON file path'''
+    with open(path, 'w') as f:
+        json.dump(summary(), f, indent=2)
@@ -1,9 +1,10 @@
 '''plot.py: Plots data using seaborn and matplotlib'''
 
 # Author: Luke Henderson
-__version__ = '1.2'
+__version__ = '1.7'
 
 import math
+import os
 import time
 import numpy as np
 
@@ -11,6 +12,7 @@ import config as cfg
 import colors as cl
 import utils as ut
 import debugTools as dt
+import stats
 
 PLOT_COLORS = [
     "b",  # blue
@@ -63,16 +65,44 @@ PLOT_COLORS = [
     "#FF002A", "#FF0064", "#FF9900", "#FFE600", "#FDFD00", "#FBFF00", "#B0FF00", "#66FF00", "#00FFEB", "#0049FF",
     "#0000A9", "#8300FF", "#D900FF", "#FF00BF", "#FF003F", "#FF5800", "#FFB200", "#FFF400", "#F6FF00", "#9FFF00"]
 
-if cfg.plotEn:
-    # from seaborn import violinplot as sns_violinplot #this import takes about 1 second
+#plotting backend, imported by loadBackend() on the first plot (seaborn takes about 1 second)
+sns_scatterplot = sns_lineplot = sns_histplot = None
+plt = rcParams = EngFormatter = None
+#headless mode renders with Agg and saves every plot to plotDir instead of calling plt.show()
+headless = getattr(cfg, 'plotHeadless', False)
+plotDir = getattr(cfg, 'plotDir', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'datalogs', 'plots'))
+
+def loadBackend():
+    '''Import seaborn/matplotlib if not done already, selecting Agg in headless mode'''
+    global sns_scatterplot, sns_lineplot, sns_histplot, plt, rcParams, EngFormatter
+    if plt is not None:
+        return
+    if not cfg.plotEn:
+        cl.red('Error: plotting is disabled (config.plotEn)')
+        exit()
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')  # use the Agg backend (NON GUI)
+    # from seaborn import violinplot as sns_violinplot
     from seaborn import scatterplot as sns_scatterplot
     from seaborn import lineplot as sns_lineplot
     from seaborn import histplot as sns_histplot
     import matplotlib.pyplot as plt
     from matplotlib import rcParams
     from matplotlib.ticker import EngFormatter
-    import matplotlib
-    # matplotlib.use('Agg')  # use the Agg backend (NON GUI)
+
+def setHeadless(en=True, saveDir=None):
+    '''Select headless mode before the first plot\n
+    Args:
+        en [bool]: True to save plots to files instead of displaying them\n
+        saveDir [str, optional]: folder to save plots in, default plotDir'''
+    global headless, plotDir
+    if plt is not None and en != headless:
+        cl.red('Error: setHeadless must be called before the first plot')
+        exit()
+    headless = en
+    if saveDir is not None:
+        plotDir = saveDir
 
 class PLOTTER:
     '''Plotter class'''
@@ -84,6 +114,31 @@ class PLOTTER:
                 format: 'myfolder' '''
         self.dataList = []
         self.subFolder = subFolder
+        self.savedPaths = []
+        loadBackend()
+
+    def show(self, name, toFile=False):
+        '''Display the current figure (blocks main thread), or save it to file in headless mode, then close it\n
+        Args:
+            name [str]: plot name, used in the file name \n
+            toFile [bool]: save to file even when not headless
+        Return:
+            [str or None]: path of the saved plot'''
+        path = None
+        if headless or toFile:
+            #plot to file, nonblocking
+            saveDir = plotDir if self.subFolder is None else os.path.join(plotDir, self.subFolder)
+            os.makedirs(saveDir, exist_ok=True)
+            fileName = f"{time.strftime('%Y-%m-%d %H-%M-%S')} {len(self.savedPaths):03} {name}.png"
+            path = os.path.join(saveDir, fileName.replace(':', '-').replace('/', '-'))
+            plt.savefig(path)
+            self.savedPaths.append(path)
+        else:
+            plt.show()
+        figStillOpen = plt.gcf()
+        plt.clf()
+        plt.close(figStillOpen)
+        return path
 
     def genericPlot(self, x=None, y=None, multiY=None, multiLabels=None, title=None, xlabel=None, ylabel=None):
         '''Plots data\n
@@ -140,17 +195,15 @@ class PLOTTER:
         # plt.legend()
 
 
-        #plot on screen, blocks main thread
-        plt.show()
-        figStillOpen = plt.gcf()
-        plt.clf()
-        plt.close(figStillOpen)
+        #plot on screen, blocks main thread (or save to file if headless)
+        return self.show(title or 'plot')
 
     def binPlot(self, x=None, kde=False, multiX=None, multiLabels=None, title=None, xlabel=None, ylabel=None, xLogPlot=False):
         '''Plots statistically binned data\n
         Args:
             x [np.array]: \n
-            y [np.array]: '''
+                [stats.Histogram]: already binned (underflow/overflow not shown, log x axis for log bins) \n
+            multiX [list of np.array or stats.Histogram]: '''
  
         # x = np.array([2.1, 2.2, 2.3, 2.4, 2.5])
         # y = np.array([5.0, 5.0, 4.5, 2.5, 1.5])
@@ -165,12 +218,12 @@ class PLOTTER:
                 #orig
                 # fig2 = sns_histplot(x=item, kde=kde, label=label, color=color)
                 #new format
-                fig2 = sns_histplot(x=item, label=label, color=color, stat="count", element="step", fill=False)
+                fig2 = sns_histplot(**self.histData(item), label=label, color=color, stat="count", element="step", fill=False)
         else:
             #original
             # fig2 = sns_histplot(x=x, kde=kde) 
             #new format
-            fig2 = sns_histplot(x=x, kde=False) #stat="count", element="step", fill=False
+            fig2 = sns_histplot(**self.histData(x), kde=False) #stat="count", element="step", fill=False
 
             #extra attempts
             # fig2 = sns_histplot(x=x, stat='density', fill=False, kde=kde) #element='line',
@@ -178,6 +231,8 @@ class PLOTTER:
             # fig2 = sns_kdeplot(data=x, common_norm=True, common_grid=True)
 
         fig2.set_yscale('log')
+        if any(isinstance(item, stats.Histogram) and item.logBins for item in (multiX or [x])):
+            fig2.set_xscale('log')
         # fig2.grid('True')
         plt.gca().xaxis.grid(True, which='major', linewidth=0.8, color='#656565')
         plt.gca().yaxis.grid(True, which='major', linewidth=0.8, color='#656565')
@@ -197,11 +252,16 @@ class PLOTTER:
         if multiX:
             plt.legend() #ncol=5
 
-        #plot on screen, blocks main thread
-        plt.show()
-        figStillOpen = plt.gcf()
-        plt.clf()
-        plt.close(figStillOpen) 
+        #plot on screen, blocks main thread (or save to file if headless)
+        return self.show(title or 'plot')
+
+    @staticmethod
+    def histData(x):
+        '''Return:
+            [dict]: histplot data kwargs, x values or the bins and counts of a stats.Histogram'''
+        if isinstance(x, stats.Histogram):
+            return {'x': x.centers(), 'weights': x.binCounts(), 'bins': x.edges.tolist()}
+        return {'x': x}
 
     def vgsPlot(self, x=None, y=None, multiY=None, multiLabels=None, dispPlot=False):
         '''Plots Vgs\n
@@ -209,8 +269,8 @@ class PLOTTER:
             x [np.array]: \n
             y [np.array]: \n
             dispPlot [bool, optional]: 
-                True: display plot\n
-                False: (NOT IMPLEMENTED) save plot to file'''
+                True: display plot (saved to file anyway if headless)\n
+                False: save plot to file'''
  
         # vgs = np.array([2.1, 2.2, 2.3, 2.4, 2.5])
         # ron = np.array([5.0, 5.0, 4.5, 2.5, 1.5])
@@ -244,36 +304,8 @@ class PLOTTER:
         plt.legend()
 
 
-        if dispPlot:
-            #plot on screen, blocks main thread
-            
-            plt.show()
-
-            figStillOpen = plt.gcf()
-            plt.clf()
-            plt.close(figStillOpen) 
-        else:
-            pass
-            # #plot to file, nonblocking
-            # humReadDate, humReadTime, dateObj = ut.humTimeAndObj()
-            # # saveDir = ut.pth('', 'rel1')
-            # if self.livePlotter:
-            #     if zoom==None and self.subFolder==None:
-            #         # saveDir += f'/datalogs/plots/live/{plotTime}.png'
-            #         saveDir = ut.gpth(f'/datalogs/plots/live/{plotTime}.png', 'rel1')
-            #     else:
-            #         # saveDir += f'/datalogs/plots/live/{self.subFolder} {plotTime}.png'
-            #         saveDir = ut.gpth(f'/datalogs/plots/live/{self.subFolder} {plotTime}.png', 'rel1')
-            # elif self.subFolder is None:
-            #     # saveDir += f"/datalogs/plots/{humReadDate} {humReadTime.replace(':', '-')} violin_plot.png"
-            #     saveDir = ut.gpth(f"/datalogs/plots/{humReadDate} {humReadTime.replace(':', '-')} violin_plot.png", 'rel1')
-            # else:
-            #     # saveDir += f"/datalogs/plots/{self.subFolder}/{humReadDate} {humReadTime.replace(':', '-')} violin_plot.png"
-            #     saveDir = ut.gpth(f"/datalogs/plots/{self.subFolder}/{humReadDate} {humReadTime.replace(':', '-')} violin_plot.png", 'rel1')
-            # figSaved = plt.savefig(saveDir)
-
-            # plt.clf()
-            # plt.close()
+        #plot on screen, blocks main thread, or plot to file, nonblocking
+        return self.show('Ron vs Vgs', toFile=not dispPlot)
         
     def idPlot(self, vds, idVgsList, vgsLabels, dispPlot=False):
         '''Plots Id vs vds, one curve for each Vgs\n
@@ -282,8 +314,8 @@ class PLOTTER:
             idVgsList [list of np.array]: start with highest Vgs, then second highest...\n
             vgsLabels [list of str]: must match idVgsList \n
             dispPlot [bool, optional]: 
-                True: display plot\n
-                False: (NOT IMPLEMENTED) save plot to file'''
+                True: display plot (saved to file anyway if headless)\n
+                False: save plot to file'''
         assert len(idVgsList) == len(vgsLabels)
                 
         # vds = np.array([0.0, 2.0, 4.0, 6.0, 8.0, 10.0])
@@ -317,16 +349,8 @@ class PLOTTER:
         # plt.legend()
 
 
-        if dispPlot:
-            #plot on screen, blocks main thread
-            
-            plt.show()
-
-            figStillOpen = plt.gcf()
-            plt.clf()
-            plt.close(figStillOpen) 
-        else:
-            pass
+        #plot on screen, blocks main thread, or plot to file, nonblocking
+        return self.show('Id vs Vds', toFile=not dispPlot)
 
     def scopePlot(self, t=None, y=None, multiY=None, multiLabels=None, title=None, xlabel=None, ylabel=None, trellis=False):
         '''Plots voltage/timing data similar to an oscope \n
@@ -396,11 +420,8 @@ class PLOTTER:
         # plt.plot(x, line1, color='r', linestyle='-.', zorder=4, label='4 Ω')
         # plt.legend()
 
-        #plot on screen, blocks main thread
-        plt.show()
-        figStillOpen = plt.gcf()
-        plt.clf()
-        plt.close(figStillOpen)
+        #plot on screen, blocks main thread (or save to file if headless)
+        return self.show(title or 'plot')
 
     def scopeTrellisPlot(self, t=None, y=None, multiY=None, multiLabels=None, title=None, xlabel=None, ylabel=None):
         """Generates a trellis plot using numpy and matplotlib.
@@ -435,7 +456,54 @@ class PLOTTER:
             fig.suptitle(title)
         axs[-1].set_xlabel('Time')
         
-        plt.show()
+        return self.show(title or 'trellis')
+
+
+def holdStarts(t):
+    '''Start of each held data point of a trace whose times may step back (e.g. a ramp ending after the next 
+    step started on a timing failure), a later point overrides the earlier ones it overlaps\n
+    Args:
+        t [np.array]: data point times (or sample positions)
+    Return:
+        [np.array]: non-decreasing start times, point i is held from start i until start i+1
+            (a point that is overridden everywhere gets zero length), same as t when t is ascending'''
+    return np.minimum.accumulate(np.asarray(t)[::-1])[::-1]
+
+def minMaxEnvelope(t, v, edges, intp):
+    '''Minimum and maximum of a trace within each time bucket, every excursion is kept however short\n
+    Args:
+        t [np.array]: data point times, a held trace that steps back is resolved with holdStarts \n
+        v [np.array]: data point values \n
+        edges [np.array]: ascending bucket edges, one more than the number of buckets \n
+        intp [bool]: linear interpolation between data points (True), or hold each value until the next (False)
+    Return:
+        vMin [np.array]: minimum per bucket \n
+        vMax [np.array]: maximum per bucket'''
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    #values at the bucket edges (a held trace is 0 before its first point)
+    if intp:
+        edgeV = np.interp(edges, t, v)
+        vMin = np.minimum(edgeV[:-1], edgeV[1:])
+        vMax = np.maximum(edgeV[:-1], edgeV[1:])
+    else:
+        t = holdStarts(t)
+        if np.any(t[:-1] == t[1:]): #points overridden everywhere are never shown
+            shown = np.append(t[:-1] < t[1:], True)
+            t, v = t[shown], v[shown]
+        held = np.searchsorted(t, edges[:-1], side='right') - 1
+        vMin = np.where(held >= 0, v[np.maximum(held, 0)], 0.0)
+        vMax = vMin.copy()
+    #data points inside each bucket
+    bucket = np.clip(np.searchsorted(edges, t, side='right') - 1, 0, len(edges)-2)
+    if np.any(bucket[1:] < bucket[:-1]): #interpolated trace stepping back, group the points by bucket
+        order = np.argsort(bucket, kind='stable')
+        bucket, v = bucket[order], v[order]
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    used = bucket[starts]
+    vMin[used] = np.minimum(vMin[used], np.minimum.reduceat(v, starts))
+    vMax[used] = np.maximum(vMax[used], np.maximum.reduceat(v, starts))
+    return vMin, vMax
 
 
 class OSCOPE:
@@ -455,7 +523,12 @@ class OSCOPE:
         self.vSamplesList = []
         self.plotter = PLOTTER()
     
-    def plot(self, multiLabels=None, title=None, xlabel=None, ylabel=None, trellis=False):
+    def plot(self, multiLabels=None, title=None, xlabel=None, ylabel=None, trellis=False, envelope=None):
+        '''Resample dataList and plot \n
+        Args:
+            multiLabels, title, xlabel, ylabel, trellis: see PLOTTER.scopePlot \n
+            envelope [bool, optional]: plot the min/max envelope of NUM_SAMPLES/2 time buckets instead of sampling
+                NUM_SAMPLES points (which can miss short glitches), default when any data has more than NUM_SAMPLES points'''
         NUM_SAMPLES = 10_000
         if isinstance(self.dataList, list):
             for item in self.dataList:
@@ -470,8 +543,13 @@ class OSCOPE:
             dt.info(self.dataList, 'self.dataList')
             exit()
 
+        if envelope is None:
+            envelope = any(len(dataDict['t']) > NUM_SAMPLES for dataDict in self.dataList)
+        if envelope:
+            self.envelopeSamples(NUM_SAMPLES)
+
         #produce tSamples and vSamples list
-        for dataDict in self.dataList:
+        for dataDict in self.dataList[len(self.vSamplesList):]:
             t = dataDict['t']
             v = dataDict['v']
             intp = dataDict['intp']
@@ -485,14 +563,12 @@ class OSCOPE:
                 vSamples = np.interp(self.tSamples, t, v)
             else:
                 vSamples = np.zeros_like(self.tSamples)
-                tPositions = [np.argmax(self.tSamples >= timeVal) for timeVal in t]
-                tPositions.append(len(self.tSamples)) #will be an invalid index, but expecting later code to be [:endInd]
-                assert len(t)==len(v) and len(t)+1==len(tPositions)
-                #populate voltages
-                for i in range(len(tPositions)-1):
-                    startInd = tPositions[i]
-                    endInd   = tPositions[i+1]
-                    vSamples[startInd:endInd] = v[i]
+                #first sample at or after each data point
+                tPositions = holdStarts(np.searchsorted(self.tSamples, t, side='left'))
+                assert len(t)==len(v)
+                #populate voltages, hold each value until the next data point
+                holdLens = np.diff(tPositions, append=len(self.tSamples))
+                vSamples[tPositions[0]:] = np.repeat(v, holdLens)
             self.vSamplesList.append(vSamples)
         # dt.info(self.vSamplesList, 'self.vSamplesList')
 
@@ -501,9 +577,9 @@ class OSCOPE:
         if len(self.vSamplesList) == 1:
             self.plotter.scopePlot(t=self.tSamples, y=self.vSamplesList[0], title='Oscope', xlabel='Time (s)')
         else:
-            for i in range(len(self.vSamplesList)):
-                while len(self.vSamplesList[i]) < len(self.tSamples):
-                    self.vSamplesList[i] = np.append(self.vSamplesList[i], self.vSamplesList[i][-1])
+            #series sampled before tSamples grew are extended with their last value
+            self.vSamplesList = [np.pad(vSamples, (0, len(self.tSamples)-len(vSamples)), mode='edge') 
+                                 for vSamples in self.vSamplesList]
             self.plotter.scopePlot(t=self.tSamples, multiY=self.vSamplesList, multiLabels=multiLabels, 
                                    title=title, xlabel=xlabel, ylabel=ylabel, trellis=trellis)
         # dt.info(tSamples, 'tPoints')
@@ -511,4 +587,19 @@ class OSCOPE:
         # for i in range(len(vSamples)):
         #     print(vSamples[i])
         
-        
\ No newline at end of file
+        
+
+    def envelopeSamples(self, numSamples):
+        '''Decimate every dataList trace to its min/max envelope, a (min, max) sample pair per time bucket \n
+        Args:
+            numSamples [int]: number of samples (2 per bucket)'''
+        numBuckets = numSamples//2
+        tStart = min(dataDict['t'][0] for dataDict in self.dataList)
+        tEnd = max(dataDict['t'][-1] for dataDict in self.dataList)
+        edges = np.linspace(tStart, tStart + (tEnd-tStart)*1.10, numBuckets+1)
+        halfWidth = (edges[1]-edges[0])/2
+        self.tSamples = np.stack((edges[:-1], edges[:-1]+halfWidth), axis=1).ravel()
+        for dataDict in self.dataList:
+            assert len(dataDict['t'])==len(dataDict['v'])
+            vMin, vMax = minMaxEnvelope(dataDict['t'], dataDict['v'], edges, dataDict['intp'])
+            self.vSamplesList.append(np.stack((vMin, vMax), axis=1).ravel())
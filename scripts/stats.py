@@ -0,0 +1,184 @@
+'''stats.py: streaming, mergeable statistics of sweep results'''
+
+# Author: Luke Henderson
+__version__ = '1.1'
+
+import numpy as np
+
+import colors as cl
+
+
+class Histogram:
+    '''Histogram class'''
+
+    def __init__(self, lo, hi, numBins=100, logBins=False):
+        '''Fixed bin histogram with running count/min/mean/max, constant memory however many values are added\n
+        Args:
+            lo [float]: lower edge of the first bin \n
+            hi [float]: upper edge of the last bin (inclusive) \n
+            numBins [int]: number of bins \n
+            logBins [bool]: logarithmically spaced bins (lo must be > 0)
+        Notes:
+            edges [np.array]: numBins+1 bin edges
+            counts [np.array of int]: underflow, numBins bins, overflow (values outside [lo, hi])
+            count [int]: number of values added (NaN excluded)
+            numNan [int]: NaN/None values (e.g. failing wafers), counted but not binned
+            total, min, max [float]: running sum, minimum and maximum
+        Histograms with the same bins can be merged (e.g. one per sweep process), see merge()'''
+        assert lo < hi and numBins > 0
+        if logBins:
+            assert lo > 0
+            self.edges = np.geomspace(lo, hi, numBins+1)
+        else:
+            self.edges = np.linspace(lo, hi, numBins+1)
+        self.logBins = logBins
+        self.counts = np.zeros(numBins+2, dtype=np.int64)
+        self.count = 0
+        self.numNan = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def empty(self):
+        '''Return:
+            [Histogram]: new histogram with the same bins and nothing added'''
+        hist = Histogram.__new__(Histogram)
+        hist.edges = self.edges
+        hist.logBins = self.logBins
+        hist.counts = np.zeros_like(self.counts)
+        hist.count = 0
+        hist.numNan = 0
+        hist.total = 0.0
+        hist.min = np.inf
+        hist.max = -np.inf
+        return hist
+
+    def add(self, x):
+        '''Add values\n
+        Args:
+            x [float or list or np.array]: values, None/NaN are only counted in numNan'''
+        x = np.asarray(x, dtype=float).ravel()
+        isNan = np.isnan(x)
+        if isNan.any():
+            self.numNan += int(isNan.sum())
+            x = x[~isNan]
+        if not len(x):
+            return
+        binIdx = np.searchsorted(self.edges, x, side='right') #0 underflow, numBins+1 overflow
+        binIdx[x == self.edges[-1]] = len(self.edges)-1 #hi is inside the last bin
+        self.counts += np.bincount(binIdx, minlength=len(self.counts))
+        self.count += len(x)
+        self.total += float(x.sum())
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+
+    def merge(self, other):
+        '''Add the values of another histogram with the same bins\n
+        Args:
+            other [Histogram]: histogram to merge in
+        Return:
+            [Histogram]: self'''
+        if self.logBins != other.logBins or not np.array_equal(self.edges, other.edges):
+            cl.red('Error: only histograms with the same bins can be merged')
+            exit()
+        self.counts += other.counts
+        self.count += other.count
+        self.numNan += other.numNan
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def mean(self):
+        '''Return:
+            [float]: mean of the values added, np.nan if none'''
+        return self.total/self.count if self.count else np.nan
+
+    def quantile(self, q):
+        '''Quantile estimate, interpolated within the bin (error below one bin width) \n
+        Args:
+            q [float or np.array]: quantile(s), 0 to 1
+        Return:
+            [float or np.array]: estimate, clipped to [min, max]'''
+        q = np.asarray(q, dtype=float)
+        if not self.count:
+            return np.full(q.shape, np.nan)[()]
+        #underflow/overflow bins reach to the min/max seen
+        extEdges = np.concatenate(([min(self.min, self.edges[0])], self.edges, [max(self.max, self.edges[-1])]))
+        cum = np.cumsum(self.counts)
+        target = q*self.count
+        binIdx = np.minimum(np.searchsorted(cum, target, side='left'), len(self.counts)-1)
+        binCount = self.counts[binIdx]
+        frac = np.divide(target - (cum[binIdx] - binCount), binCount,
+                         out=np.zeros(np.shape(target)), where=binCount > 0)
+        lowEdge = extEdges[binIdx]
+        highEdge = extEdges[binIdx+1]
+        est = lowEdge + frac*(highEdge - lowEdge)
+        if self.logBins:
+            inner = (binIdx > 0) & (binIdx < len(self.counts)-1)
+            est = np.where(inner, lowEdge*(highEdge/lowEdge)**frac, est)
+        return np.clip(est, self.min, self.max)[()]
+
+    def centers(self):
+        '''Return:
+            [np.array]: bin centers (geometric for log bins)'''
+        if self.logBins:
+            return np.sqrt(self.edges[:-1]*self.edges[1:])
+        return (self.edges[:-1] + self.edges[1:])/2
+
+    def binCounts(self):
+        '''Return:
+            [np.array of int]: counts of the numBins bins (no underflow/overflow)'''
+        return self.counts[1:-1]
+
+    def summary(self):
+        '''Return:
+            [dict]: count, numNan, min, mean, max, p50, p99'''
+        p50, p99 = self.quantile([0.5, 0.99]) if self.count else (np.nan, np.nan)
+        return {'count': self.count, 'numNan': self.numNan, 'min': self.min, 'mean': self.mean(),
+                'max': self.max, 'p50': p50, 'p99': p99}
+
+
+def sweepHists(numBins=600):
+    '''Default histograms for Vdd-min sweep results\n
+    Args:
+        numBins [int]: bins per histogram
+    Return:
+        [dict of Histogram]: 'vddMin' (V, linear bins), 'power' (mW, log bins), 'propTime' (s, log bins)'''
+    return {'vddMin': Histogram(0.6, 1.8, numBins),
+            'power': Histogram(1e-4, 1e2, numBins, logBins=True),
+            'propTime': Histogram(1e-13, 1e-9, numBins, logBins=True)}
+
+def yieldAnalysis(results, limits=None):
+    '''Pass/fail and statistics of sweep results against spec limits, one vectorized pass\n
+    Args:
+        results [dict of list or np.array]: metric → one value per wafer, e.g. 'vddMin', 'power', 'propTime'
+            None/NaN marks a failing wafer \n
+        limits [dict of tuple]: metric → (lo, hi) inclusive spec limits, None for no limit on that side
+            e.g. {'propTime': (None, 30e-12)}
+    Return:
+        passMask [np.array of bool]: True for wafers within every limit with no NaN metric \n
+        yieldPct [float]: passing wafers (%) \n
+        summary [dict of dict]: metric → min, mean, max, std over the passing wafers (np.nan if none pass)'''
+    keys = list(results)
+    data = np.array([np.asarray(results[key], dtype=float) for key in keys]) #metrics x wafers
+    passMask = np.all(np.isfinite(data), axis=0)
+    for key, (lo, hi) in (limits or {}).items():
+        if key not in keys:
+            cl.red(f'Error: no results for spec limit "{key}"')
+            exit()
+        row = data[keys.index(key)]
+        if lo is not None:
+            passMask &= row >= lo
+        if hi is not None:
+            passMask &= row <= hi
+    numWafers = data.shape[1]
+    yieldPct = 100*np.count_nonzero(passMask)/numWafers if numWafers else np.nan
+    summary = {}
+    for key, row in zip(keys, data):
+        passing = row[passMask]
+        if len(passing):
+            summary[key] = {'min': passing.min(), 'mean': passing.mean(), 'max': passing.max(), 'std': passing.std()}
+        else:
+            summary[key] = {'min': np.nan, 'mean': np.nan, 'max': np.nan, 'std': np.nan}
+    return passMask, yieldPct, summary
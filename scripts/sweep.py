@@ -0,0 +1,510 @@
+'''sweep.py: full adder validation and sweeps over Vdd and process variation'''
+
+# Author: Luke Henderson
+__version__ = '1.14'
+
+import math
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import colors as cl
+import debugTools as dt
+import dataSimulator as ds
+import gate
+import testSupport as ts
+import transistor as tr
+
+_worker = {} #per process state of sweep workers, see initWorker
+
+#simple test pattern
+FA_STIM = {'a':  '000011110',
+           'b':  '001100110',
+           'cin':'010101010'}
+FA_EXP_RES = {'s':   '011010010',
+              'cout':'000101110'}
+#full adder gates in consume order (matches the original hand mapped adder): name, gate class, procVars consumed
+FA_GATES = (('invNor', gate.INV, 2), ('nor', gate.NOR, 4), ('invNand1', gate.INV, 2), ('nand1', gate.NAND, 4),
+            ('invNand2', gate.INV, 4), ('nand2', gate.NAND, 4), ('xor2', gate.XOR, 12), ('xor1', gate.XOR, 12))
+
+def fullAdderExhaustive():
+    '''Exhaustive full adder pattern, every input transition (8x8) followed by a final 000\n
+    Return:
+        stim [dict of ts.Pattern]: 129 step stimulus, 'a', 'b' and 'cin' keys\n
+        expRes [dict of ts.Pattern]: expected result, 's' and 'cout' keys'''
+    start, finish = np.divmod(np.arange(64), 8)
+    vals = np.append(np.stack((start, finish), axis=1).ravel(), 0) #(start, finish) pairs, then 000
+    a, b, cin = (vals >> 2) & 1, (vals >> 1) & 1, vals & 1
+    total = a + b + cin
+    stim = {'a':ts.Pattern(a), 'b':ts.Pattern(b), 'cin':ts.Pattern(cin)}
+    expRes = {'s':ts.Pattern(total & 1), 'cout':ts.Pattern(total >> 1)}
+    return stim, expRes
+
+def addFullAdder(nl, vdd, wc, a='a', b='b', cin='cin', s='s', cout='cout', prefix='', fet=tr.GateFET):
+    '''Add the gates of one full adder to a netlist\n
+    Args:
+        nl [ts.Netlist class]: netlist to add to\n
+        vdd [float]: Vdd (Volts)\n
+        wc [WaferConsumer class]: source of process variation\n
+        a, b, cin [str]: input nets\n
+        s, cout [str]: output nets\n
+        prefix [str]: prefix of gate and internal net names\n
+        fet [class]: transistor model of single die gates, tr.FET keeps the device parameters setProcVar needs'''
+    #map logic gates, recording the consume order for nl.reseed()
+    duts = {}
+    for name, gateClass, numProcVar in FA_GATES:
+        duts[name] = gateClass(vdd, procVarArr=wc.consume(numProcVar), fet=fet)
+        nl.seedOrder.append((prefix+name, numProcVar))
+    #connect
+    nl.addGate(prefix+'xor1', duts['xor1'], [a, b], prefix+'x1')
+    nl.addGate(prefix+'nand2', duts['nand2'], [a, b], prefix+'n2')
+    nl.addGate(prefix+'xor2', duts['xor2'], [prefix+'x1', cin], s)
+    nl.addGate(prefix+'nand1', duts['nand1'], [cin, prefix+'x1'], prefix+'n1')
+    nl.addGate(prefix+'invNand1', duts['invNand1'], [prefix+'n1'], prefix+'i1')
+    nl.addGate(prefix+'invNand2', duts['invNand2'], [prefix+'n2'], prefix+'i2')
+    nl.addGate(prefix+'nor', duts['nor'], [prefix+'i1', prefix+'i2'], prefix+'nr')
+    nl.addGate(prefix+'invNor', duts['invNor'], [prefix+'nr'], cout)
+
+def buildFullAdder(vdd, wc=ds.DummyWaferConsumer(), fet=tr.GateFET):
+    '''Full adder netlist\n
+    Args:
+        vdd [float]: Vdd (Volts)\n
+        wc [WaferConsumer class]: source of process variation\n
+        fet [class]: transistor model of single die gates, tr.FET keeps the device parameters setProcVar needs
+    Return:
+        nl [ts.Netlist class]: 'a', 'b', 'cin' inputs, 's', 'cout' outputs'''
+    nl = ts.Netlist(['a', 'b', 'cin'], {'s':'s', 'cout':'cout'})
+    addFullAdder(nl, vdd, wc, fet=fet)
+    return nl
+
+def buildRippleAdder(vdd, bits, wc=ds.DummyWaferConsumer(), fet=tr.GateFET):
+    '''Ripple carry adder netlist\n
+    Args:
+        vdd [float]: Vdd (Volts)\n
+        bits [int]: width\n
+        wc [WaferConsumer class]: source of process variation\n
+        fet [class]: transistor model of single die gates, tr.FET keeps the device parameters setProcVar needs
+    Return:
+        nl [ts.Netlist class]: 'a0'.., 'b0'.., 'cin' inputs, 's0'.., 'cout' outputs'''
+    inputs = [f'a{bit}' for bit in range(bits)] + [f'b{bit}' for bit in range(bits)] + ['cin']
+    outputs = {f's{bit}':f's{bit}' for bit in range(bits)}
+    outputs['cout'] = 'cout'
+    nl = ts.Netlist(inputs, outputs)
+    for bit in range(bits):
+        carryIn = 'cin' if bit == 0 else f'c{bit}'
+        carryOut = 'cout' if bit == bits-1 else f'c{bit+1}'
+        addFullAdder(nl, vdd, wc, f'a{bit}', f'b{bit}', carryIn, f's{bit}', carryOut, prefix=f'fa{bit}.', fet=fet)
+    return nl
+
+def valFullAdder(vdd, freq, quiet=False, wc=ds.DummyWaferConsumer(), ptrn=None, cache=None, fastPath=None, nl=None):
+    '''Validate a full adder built from process varied gates\n
+    Args:
+        vdd [float]: Vdd (Volts)\n
+            [np.array]: per-wafer Vdd in batch mode\n
+        freq [float]: Frequency (Hz)\n
+        quiet [bool]: False to print every step\n
+        wc [WaferConsumer class]: source of process variation
+            set wc.waferNums to evaluate every wafer in the list at once (batch mode)\n
+        ptrn [tuple of dict of str or ts.Pattern]: (stim, expRes), default FA_STIM/FA_EXP_RES, see fullAdderExhaustive\n
+        cache [gate.StepCache class]: optional step memo for every gate (single die only, ignored in batch mode)\n
+        fastPath [bool]: validate gates once instead of every step, None for the global default (tr.fastPath)\n
+        nl [ts.Netlist class]: compiled full adder to reuse instead of building one from wc (wc is not consumed),
+            set to vdd and reset here, see buildFullAdder and ts.Netlist.reseed
+    Return:
+        res [bool]: pass/fail \n
+            [np.array of bool]: per-wafer pass/fail in batch mode
+        tb [TestBench class]: test bench containing the results'''
+    tb = ts.TestBench(vdd=vdd, freq=freq, fastPath=fastPath)
+    if nl is None:
+        nl = buildFullAdder(vdd, wc)
+        nl.compile()
+    else:
+        nl.setVdd(vdd)
+        nl.reset()
+    dm = ts.MultiDutManager(tb, netlist=nl)
+    if cache is not None:
+        for dut in nl.dut:
+            if not dut.batched: #batch mode gates are not cached
+                dut.cache = cache
+
+    #load stim pattern into simulation
+    stim, expRes = ptrn if ptrn else (FA_STIM, FA_EXP_RES)
+    tb.setMultiStim(stim, expRes=expRes)
+
+    #step simulation over time for each pattern
+    for i in range(tb.ptrnLen):
+        dm.step(i, quiet)
+
+    return tb.checkRes(), tb
+
+def batchVddSweep(wc, waferNums, vddList, freq=4e9):
+    '''Find the minimum passing Vdd of many wafers at once (batch mode)\n
+    Args:
+        wc [WaferConsumer class]: source of process variation\n
+        waferNums [list of int or range]: wafers to evaluate together (range reads zero-copy from a wafer store)\n
+        vddList [list of float]: ascending Vdd values to try\n
+        freq [float]: Frequency (Hz)
+    Return:
+        vddMin [np.array]: first passing Vdd per wafer, np.nan if none passed\n
+        power [np.array]: average power (mW) at vddMin\n
+        propTime [np.array]: worst case propagation time (s) at vddMin'''
+    wc.waferNums = waferNums
+    vddMin = np.full(len(wc.waferNums), np.nan)
+    power = np.full(len(wc.waferNums), np.nan)
+    propTime = np.full(len(wc.waferNums), np.nan)
+    nl = None
+    for vdd in vddList:
+        if nl is None: #built once, every Vdd reuses it
+            wc.resetIter()
+            nl = buildFullAdder(vdd, wc)
+            nl.compile()
+        res, tb = valFullAdder(vdd=vdd, freq=freq, quiet=True, wc=wc, nl=nl)
+        newPass = res & np.isnan(vddMin)
+        vddMin[newPass] = vdd
+        power[newPass] = (tb.avgPwr*1e3)[newPass]
+        propTime[newPass] = np.max(tb.propTimeList, axis=0)[newPass]
+        if not np.any(np.isnan(vddMin)):
+            break
+    wc.waferNums = None
+    return vddMin, power, propTime
+
+class FullAdderFactory:
+    '''Full adder factory class'''
+
+    def __init__(self, wc, freq=4e9, reuse=True):
+        '''Builds and validates a full adder for one wafer at one Vdd (circuitFactory for findVddMin)\n
+        Args:
+            wc [WaferConsumer class]: source of process variation\n
+            freq [float]: Frequency (Hz)\n
+            reuse [bool]: build the full adder once, reseed it for a new wafer and only change Vdd for 
+                the same wafer (same results as rebuilding it every call)'''
+        self.wc = wc
+        self.freq = freq
+        self.reuse = reuse
+        self.nl = None #reused full adder
+        self.wafer = None #wafer of self.nl
+
+    def __call__(self, vdd, wafer):
+        '''Validate the full adder of one wafer\n
+        Args:
+            vdd [float]: Vdd (Volts)\n
+            wafer [int]: wafer number, its transistors are re-consumed from the start
+        Return:
+            res [bool]: pass/fail \n
+            tb [TestBench class]: test bench containing the results'''
+        self.wc.waferNum = wafer
+        if not self.reuse:
+            self.wc.resetIter()
+            return valFullAdder(vdd=vdd, freq=self.freq, quiet=True, wc=self.wc)
+        if self.nl is None:
+            self.wc.resetIter()
+            self.nl = buildFullAdder(vdd, self.wc)
+            self.nl.compile()
+        elif wafer != self.wafer:
+            self.wc.resetIter()
+            self.nl.reseed(self.wc)
+        self.wafer = wafer
+        return valFullAdder(vdd=vdd, freq=self.freq, quiet=True, wc=self.wc, nl=self.nl)
+
+def findVddMin(circuitFactory, wafer, lo=0.67, hi=1.8, tol=0.002, checkMono=False, monoPoints=3):
+    '''Find the minimum passing Vdd of one wafer with bracketed bisection\n
+    Args:
+        circuitFactory [callable]: circuitFactory(vdd, wafer) returns (res, tb), see FullAdderFactory\n
+        wafer [int]: wafer number passed through to circuitFactory\n
+        lo [float]: Vdd (V) expected to fail\n
+        hi [float]: Vdd (V) expected to pass\n
+        tol [float]: Vdd resolution (V) of the result\n
+        checkMono [bool]: also evaluate lo, and monoPoints Vdds between the result and hi, 
+            bisection is restarted above any failing Vdd found there (non-monotonic wafer)\n
+        monoPoints [int]: number of extra passing checks when checkMono
+    Return:
+        vddMin [float]: lowest passing Vdd found, within tol above the true minimum
+            None if hi fails\n
+        tb [TestBench class]: test bench of the run at vddMin\n
+        evalCount [int]: number of circuitFactory evaluations used
+            about log2((hi-lo)/tol)+1 without checkMono'''
+    assert lo < hi and tol > 0
+    evalCount = 1
+    res, tb = circuitFactory(hi, wafer)
+    if not res:
+        cl.red(f'Error: wafer #{wafer} fails at Vdd = {hi}')
+        return None, tb, evalCount
+    if checkMono:
+        evalCount += 1
+        resLo, tbLo = circuitFactory(lo, wafer)
+        if resLo:
+            cl.yellow(f'Warning: wafer #{wafer} passes at the lower bracket Vdd = {lo}')
+            return lo, tbLo, evalCount
+    vddMax = hi
+    while True:
+        #bisection, hi always passes and lo always fails
+        while hi - lo > tol:
+            mid = (lo+hi)/2
+            evalCount += 1
+            res, midTb = circuitFactory(mid, wafer)
+            if res:
+                hi, tb = mid, midTb
+            else:
+                lo = mid
+        if not checkMono:
+            return hi, tb, evalCount
+        #monotonicity check, every Vdd above the result should pass
+        monoFail = None
+        for vdd in np.linspace(hi, vddMax, monoPoints+2)[1:-1]:
+            evalCount += 1
+            res, _ = circuitFactory(vdd, wafer)
+            if not res:
+                monoFail = vdd
+        if monoFail is None:
+            return hi, tb, evalCount
+        cl.yellow(f'Warning: wafer #{wafer} is not monotonic in Vdd, fails at {monoFail}')
+        lo, hi = monoFail, vddMax
+        evalCount += 1
+        res, tb = circuitFactory(hi, wafer)
+
+def expectedEvals(lo, hi, tol):
+    '''Number of evaluations findVddMin needs without checkMono\n
+    Args:
+        lo, hi, tol [float]: see findVddMin
+    Return:
+        [int]: bisection steps + 1 (check at hi)'''
+    return max(0, math.ceil(math.log2((hi-lo)/tol))) + 1
+
+def batchFindVddMin(wc, waferNums, lo=0.67, hi=1.8, tol=0.002, freq=4e9):
+    '''Find the minimum passing Vdd of many wafers at once, bisection with per-wafer Vdd (batch mode)\n
+    Args:
+        wc [WaferConsumer class]: source of process variation\n
+        waferNums [list of int or range]: wafers to evaluate together (range reads zero-copy from a wafer store)\n
+        lo, hi, tol [float]: see findVddMin\n
+        freq [float]: Frequency (Hz)
+    Return:
+        vddMin [np.array]: lowest passing Vdd per wafer, np.nan if hi fails\n
+        evalCount [int]: number of batch evaluations used'''
+    wc.waferNums = waferNums
+    loArr = np.full(len(wc.waferNums), float(lo))
+    hiArr = np.full(len(wc.waferNums), float(hi))
+    wc.resetIter()
+    nl = buildFullAdder(hiArr, wc) #built once, every bisection step reuses it
+    nl.compile()
+    res, tb = valFullAdder(vdd=hiArr, freq=freq, quiet=True, wc=wc, nl=nl)
+    evalCount = 1
+    while np.any(hiArr - loArr > tol):
+        active = hiArr - loArr > tol
+        midArr = np.where(active, (loArr+hiArr)/2, hiArr)
+        midRes, tb = valFullAdder(vdd=midArr, freq=freq, quiet=True, wc=wc, nl=nl)
+        evalCount += 1
+        hiArr = np.where(active & midRes, midArr, hiArr)
+        loArr = np.where(active & ~midRes, midArr, loArr)
+    wc.waferNums = None
+    return np.where(res, hiArr, np.nan), evalCount
+
+def linearVddMin(circuitFactory, wafer, start=0.67, step=0.002, stop=1.8):
+    '''Find the minimum passing Vdd of one wafer by stepping Vdd up from start (original method)\n
+    Args:
+        circuitFactory [callable]: see findVddMin\n
+        wafer [int]: wafer number passed through to circuitFactory\n
+        start [float]: Vdd (V) below the first one tried, expected to fail\n
+        step [float]: Vdd (V) increment\n
+        stop [float]: give up above this Vdd (V)
+    Return:
+        vddMin, tb, evalCount: see findVddMin'''
+    assert start < stop and step > 0
+    vdd = start
+    evalCount = 0
+    while vdd < stop:
+        vdd += step
+        evalCount += 1
+        res, tb = circuitFactory(vdd, wafer)
+        if res:
+            return vdd, tb, evalCount
+    cl.red(f'Error: wafer #{wafer} fails up to Vdd = {vdd}')
+    return None, tb, evalCount
+
+def shardWafers(numWafers, shardSize, firstWafer=0):
+    '''Split wafer numbers into contiguous shards\n
+    Args:
+        numWafers [int]: number of wafers to sweep\n
+        shardSize [int]: wafers per shard\n
+        firstWafer [int]: first wafer number
+    Return:
+        [list of range]: shards in wafer order'''
+    lastWafer = firstWafer + numWafers
+    return [range(start, min(start+shardSize, lastWafer)) for start in range(firstWafer, lastWafer, shardSize)]
+
+def initWorker(waferPath, freq, search, hists=None, keepLists=True):
+    '''Load the wafer data once per sweep process\n
+    Args:
+        waferPath [str]: path of wafer data, see ds.WaferConsumer\n
+        freq [float]: Frequency (Hz)\n
+        search [dict]: Vdd search settings, see runSweep\n
+        hists [dict of stats.Histogram]: accumulator bins, see runSweep\n
+        keepLists [bool]: return per wafer results, see runSweep'''
+    _worker['factory'] = FullAdderFactory(ds.WaferConsumer(waferPath), freq=freq)
+    _worker['search'] = search
+    _worker['hists'] = {key: hists[key].empty() for key in hists} if hists else {}
+    _worker['keepLists'] = keepLists
+
+def runShard(waferNums):
+    '''Find Vdd-min, power and propagation time for every wafer of a shard (runs in a sweep worker)\n
+    Args:
+        waferNums [range]: wafers of the shard
+    Return:
+        [list of tuple]: (vddMin, avg power (mW), max propagation time (s)) per wafer, in order
+            None if not keepLists\n
+        [dict of stats.Histogram]: results of the shard, same keys as the hists of initWorker'''
+    factory = _worker['factory']
+    search = dict(_worker['search'])
+    findFunc = linearVddMin if search.pop('method', 'bisect') == 'linear' else findVddMin
+    ret = []
+    for waferNum in waferNums:
+        vddMin, tb, evalCount = findFunc(factory, waferNum, **search)
+        ret.append((vddMin, tb.avgPwr*1e3, max(tb.propTimeList)))
+    shardHists = {key: _worker['hists'][key].empty() for key in _worker['hists']}
+    if shardHists:
+        cols = dict(zip(('vddMin', 'power', 'propTime'), np.array(ret, dtype=float).T))
+        for key in shardHists:
+            shardHists[key].add(cols[key])
+    return (ret if _worker['keepLists'] else None), shardHists
+
+class Checkpoint:
+    '''Sweep checkpoint class'''
+
+    def __init__(self, path, meta, interval=60):
+        '''Periodically saved sweep progress, written to path+'.tmp' then atomically renamed over path\n
+        Args:
+            path [str]: checkpoint file \n
+            meta [dict]: sweep settings, a checkpoint only resumes a sweep with the same settings \n
+            interval [float]: minimum time (s) between writes, see save()
+        Notes:
+            done [set of int]: first wafer of every finished shard
+            results [dict of list]: first wafer of shard → per wafer results of the shard
+            hists [dict of stats.Histogram]: results of every finished shard
+            complete [bool]: every shard finished
+            no consumer state is kept, FullAdderFactory re-consumes every wafer from its first transistor'''
+        self.path = path
+        self.meta = meta
+        self.interval = interval
+        self.done = set()
+        self.results = {}
+        self.hists = None
+        self.complete = False
+        self.lastSave = time.time()
+
+    def resume(self):
+        '''Load the checkpoint file if there is one \n
+        Return:
+            [bool]: True if progress was loaded'''
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            state = pickle.load(f)
+        if state['meta'] != self.meta:
+            cl.red(f'Error: checkpoint "{self.path}" is from a sweep with different settings')
+            dt.info(state['meta'], 'checkpoint settings')
+            exit()
+        for key in ('done', 'results', 'hists', 'complete'):
+            setattr(self, key, state[key])
+        cl.blue(f'Resuming from checkpoint, {len(self.done)} shards done')
+        return True
+
+    def save(self, force=False):
+        '''Write the checkpoint if interval has passed since the last write \n
+        Args:
+            force [bool]: write regardless of interval'''
+        if not force and time.time() - self.lastSave < self.interval:
+            return
+        state = {'meta': self.meta, 'done': self.done, 'results': self.results, 'hists': self.hists, 
+                 'complete': self.complete}
+        tmpPath = self.path + '.tmp'
+        with open(tmpPath, 'wb') as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmpPath, self.path) #atomic, a crash leaves the previous checkpoint intact
+        self.lastSave = time.time()
+
+def runSweep(waferPath, numWafers, firstWafer=0, workers=None, shardSize=50, freq=4e9, search=None, 
+             hists=None, keepLists=True, checkpoint=None, checkpointInterval=60):
+    '''Vdd-min sweep over process variation, sharded over a process pool\n
+    Args:
+        waferPath [str]: path of wafer data, see ds.WaferConsumer\n
+        numWafers [int]: number of wafers to sweep\n
+        firstWafer [int]: first wafer number\n
+        workers [int]: number of processes, None for os.cpu_count(), 1 to run in this process\n
+        shardSize [int]: wafers per job\n
+        freq [float]: Frequency (Hz)\n
+        search [dict]: Vdd search, {'method': 'bisect'} (default, also if 'method' is left out) with findVddMin kwargs 
+            or {'method': 'linear'} with linearVddMin kwargs\n
+        hists [dict of stats.Histogram]: optional accumulators, 'vddMin', 'power' and/or 'propTime' keys (see stats.sweepHists)
+            every worker fills its own copy per shard, merged in here as shards finish\n
+        keepLists [bool]: False to only accumulate hists (constant memory in the number of wafers)\n
+        checkpoint [str]: optional checkpoint file, written every checkpointInterval (s), on Ctrl-C/errors
+            and at the end; rerunning the same sweep skips the shards it lists as finished
+    Return:
+        vddMinList [list of float]: in wafer order\n
+        powerList [list of float]: average power (mW), in wafer order\n
+        propTimeList [list of float]: max propagation time (s), in wafer order
+            lists are None if not keepLists
+    Notes:
+        results do not depend on workers or shardSize, every wafer is simulated on its own
+        on Windows, call from under if __name__ == '__main__': (workers re-import the main script)'''
+    if search is None:
+        search = {'method': 'bisect'}
+    shards = shardWafers(numWafers, shardSize, firstWafer)
+    if workers is None:
+        workers = os.cpu_count()
+    initArgs = (waferPath, freq, search, hists, keepLists)
+    ckpt = Checkpoint(checkpoint, {'waferPath': waferPath, 'numWafers': numWafers, 'firstWafer': firstWafer, 
+                                   'shardSize': shardSize, 'freq': freq, 'search': search, 'keepLists': keepLists,
+                                   'hists': {key: (hists[key].logBins, hists[key].edges.tolist()) for key in hists} if hists else None}, 
+                      interval=checkpointInterval) if checkpoint else None
+    results = {} #first wafer of shard → per wafer results
+    if ckpt and ckpt.resume():
+        results = ckpt.results
+        for key in ckpt.hists or {}:
+            hists[key].merge(ckpt.hists[key])
+        shards = [shard for shard in shards if shard.start not in ckpt.done]
+    if ckpt:
+        ckpt.results = results
+        ckpt.hists = hists
+
+    def merge(shard, shardRes):
+        res, shardHists = shardRes
+        for key in shardHists:
+            hists[key].merge(shardHists[key])
+        if keepLists:
+            results[shard.start] = res
+        if ckpt:
+            ckpt.done.add(shard.start)
+            ckpt.save()
+
+    try:
+        if workers == 1:
+            initWorker(*initArgs)
+            for shard in shards:
+                merge(shard, runShard(shard))
+        elif shards:
+            with ProcessPoolExecutor(max_workers=workers, initializer=initWorker, initargs=initArgs) as pool:
+                for shard, shardRes in zip(shards, pool.map(runShard, shards)):
+                    merge(shard, shardRes)
+    except BaseException:
+        if ckpt:
+            ckpt.save(force=True)
+            cl.yellow(f'Checkpoint saved to "{checkpoint}"')
+        raise
+    if ckpt:
+        ckpt.complete = True
+        ckpt.save(force=True)
+    #merge in wafer order
+    vddMinList = [] if keepLists else None
+    powerList = [] if keepLists else None
+    propTimeList = [] if keepLists else None
+    if keepLists:
+        for start in sorted(results):
+            for vddMin, power, propTime in results[start]:
+                vddMinList.append(vddMin)
+                powerList.append(power)
+                propTimeList.append(propTime)
+    return vddMinList, powerList, propTimeList
@@ -1,8 +1,9 @@
 '''testSupport.py manages test stimulus and interprets results'''
 
 # Author: Luke Henderson
-__version__ = '1.3'
+__version__ = '2.3'
 
+import heapq
 import math
 import numpy as np
 
@@ -11,48 +12,169 @@ import colors as cl
 import debugTools as dt
 import logger as lg
 import plot
+import gate
+
+#default Netlist.eventDelta, None steps every gate on every step
+defaultEventDelta = getattr(cfg, 'eventDelta', None)
+
+
+class Pattern:
+    '''Bit pattern class'''
+
+    def __init__(self, bits, name='ptrn'):
+        '''Stimulus or expected result bits, packed 64 steps per uint64 word\n
+        Args:
+            bits [str]: string of 1s and 0s \n
+                [np.array of bool]: one element per step
+            name [str]: name used in error messages
+        Notes:
+            length [int]: number of steps
+            words [np.array of uint64]: packed bits (np.packbits order), zero padded'''
+        if isinstance(bits, str):
+            chars = np.frombuffer(bits.encode('utf-8'), dtype=np.uint8) - np.uint8(ord('0'))
+            if np.any(chars > 1):
+                badPos = int(np.argmax(chars > 1))
+                badChar = bits.encode('utf-8')[badPos:badPos+1].decode('utf-8', 'replace')
+                cl.red(f'Error: Unexpected character "{badChar}" in {name} at position {badPos}')
+                exit()
+            bits = chars.view(bool)
+        bits = np.asarray(bits, dtype=bool)
+        if bits.ndim != 1:
+            cl.red(f'Error: {name} must be 1 dimensional')
+            exit()
+        self.length = len(bits)
+        self.words = self.pack(bits)
+
+    @staticmethod
+    def pack(bits):
+        '''Pack bools along the step axis \n
+        Args:
+            bits [np.array of bool]: steps on axis 0, optional trailing die axis
+        Return:
+            [np.array of uint64]: packed words on the last axis (die axis first in batch mode)'''
+        packed = np.packbits(bits, axis=0)
+        pad = [(0, -len(packed) % 8)] + [(0, 0)]*(packed.ndim-1)
+        packed = np.pad(packed, pad)
+        return np.ascontiguousarray(np.moveaxis(packed, 0, -1)).view(np.uint64)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        '''Step i as a "0"/"1" character (for printing)'''
+        if not -self.length <= i < self.length:
+            raise IndexError('Pattern index out of range')
+        i %= self.length
+        byte = int(self.words.view(np.uint8)[i//8])
+        return '1' if byte >> (7 - i%8) & 1 else '0'
+
+    def __str__(self):
+        return (self.bools().view(np.uint8) + np.uint8(ord('0'))).tobytes().decode('ascii')
+
+    def bools(self):
+        '''Return:
+            [np.array of bool]: one element per step'''
+        return np.unpackbits(self.words.view(np.uint8), count=self.length).view(bool)
+
+    def volts(self, vdd):
+        '''Stimulus voltages \n
+        Args:
+            vdd [float]: Vdd (Volts) \n
+                [np.array]: per-die Vdd in batch mode
+        Return:
+            [np.array of float]: voltage (V) per step, trailing die axis in batch mode'''
+        return np.multiply.outer(self.bools(), vdd)
+
+    def firstMismatch(self, res):
+        '''Compare results to the pattern, a word at a time \n
+        Args:
+            res [np.array of bool]: per step results, optional trailing die axis
+        Return:
+            [int]: first step which does not match (missing steps count as mismatches), -1 if all match \n
+                [np.array of int]: per die in batch mode'''
+        res = np.asarray(res, dtype=bool)
+        if not min(len(res), self.length):
+            return 0 if len(res) != self.length else -1
+        if len(res) == self.length:
+            words = self.words
+        else:
+            numSteps = min(len(res), self.length)
+            res = res[:numSteps]
+            words = self.pack(self.bools()[:numSteps])
+        diff = self.pack(res) ^ words
+        bad = diff != 0
+        wordIdx = np.argmax(bad, axis=-1)
+        word = np.take_along_axis(diff, wordIdx[..., np.newaxis], axis=-1)
+        wordBytes = word.view(np.uint8)
+        byteIdx = np.argmax(wordBytes != 0, axis=-1)
+        byte = np.take_along_axis(wordBytes, byteIdx[..., np.newaxis], axis=-1)
+        bitIdx = np.argmax(np.unpackbits(byte, axis=-1), axis=-1)
+        first = np.where(np.any(bad, axis=-1), 64*wordIdx + 8*byteIdx + bitIdx, -1)
+        if len(res) != self.length:
+            first = np.where(first < 0, len(res), first)
+        return first if first.ndim else int(first)
 
 
 class TestBench:
     '''Test bench class'''
 
-    def __init__(self, vdd=None, freq=None):
+    def __init__(self, vdd=None, freq=None, fastPath=None):
         '''Test bench and analysis tools\n
         Args:
             vdd [float]: Vdd (Volts) upon initialization \n
-            freq [float]: Frequency (Hz) upon initialization 
+                [np.array]: per-die Vdd for batch mode DUTs
+            freq [float]: Frequency (Hz) upon initialization \n
+            fastPath [bool]: True/False to make the DUT manager skip/run gate and transistor validation 
+                on every step (gate.setTrusted), None to keep the global default (tr.fastPath)
         Notes:
-            resArr [List of bool]: list of results to be populated later \n
-                [dict of list of float] for multi mode, str keys
-            stimList [list of bool]: stimulus bools \n
-            stimList [dict of list of bool]: stimulus bools for Multi DUTs
+            batched [bool]: DUTs are batch mode gates (gate.isBatch), set by the DUT manager
+                results, timing and power become np.arrays with one element per die
+            resArr [np.array of bool]: results, preallocated for ptrnLen steps on the first step \n
+                [dict of np.array of bool] for multi mode, str keys
+            resVoltArr [np.array of float]: output voltages (V), preallocated like resArr \n
+                [dict of np.array of float] for multi mode, str keys
+            stimPtrn [Pattern]: stimulus pattern \n
+                [dict of Pattern] for multi mode, str keys
+            expResList [Pattern]: expected result pattern \n
+                [dict of Pattern] for multi mode, str keys
+            stimList [np.array of bool]: stimulus bools \n
+            stimList [dict of np.array of bool]: stimulus bools for Multi DUTs
                 str keys
-            stimV [list of float]: stimulus voltages (V) \n
-            stimV [dict of list of float]: stimulus voltages (V) for Multi DUTs
+            stimV [np.array of float]: stimulus voltages (V) \n
+            stimV [dict of np.array of float]: stimulus voltages (V) for Multi DUTs
                 str keys
-            stimScopeV  [list of float]: stimulus voltages to display on oscope later
-                [dict of list of float] for multi mode, str keys
-            stimScopet [list of float]: time lengths of stimScopeV data points \n
-            resScopeV  [list of float]: result voltages to display on oscope later
-                [dict of list of float] for multi mode, str keys
-            resScopet [list of float]: time lengths of resScopeV data points \n
+            stimScopeV  [np.array of float]: stimulus voltages to display on oscope later
+                [dict of np.array of float] for multi mode, str keys
+            stimScopet [np.array of float]: time lengths of stimScopeV data points \n
+            resScopeV  [np.array of float]: result voltages to display on oscope later
+                [dict of np.array of float] for multi mode, str keys
+            resScopet [np.array of float]: time lengths of resScopeV data points \n
+            resScopeCurr, resScopePwr [np.array of float]: current (A) and power (W) for the oscope
+                resScope* hold 2 points per step, preallocated for ptrnLen steps on the first step
+                (trailing die axis in batch mode)
+            stepCount [int]: number of steps saved so far
             propTimeList [list of float]: list of propagation delays for every transistion in test pattern'''
         self.vdd = vdd
         self.freq = freq
         self.period = 1/freq #seconds
+        self.fastPath = fastPath
         self.ptrnLen = None
         self.stimPtrn = None
-        self.stimList = [] #bool
-        self.stimV = []
-        self.resArr = []
-        self.resVoltArr = []
-        self.stimScopeV = []
-        self.stimScopet = []
-        self.resScopet = []
-        self.resScopeV = []
-        self.resScopeCurr = []
-        self.resScopePwr = []
-        self.timingFailure = False
+        self.stimList = None
+        self.stimV = None
+        self.expResList = None
+        self.firstMismatch = None
+        self.resArr = None
+        self.resVoltArr = None
+        self.stimScopeV = None
+        self.stimScopet = None
+        self.resScopet = None
+        self.resScopeV = None
+        self.resScopeCurr = None
+        self.resScopePwr = None
+        self.stepCount = 0
+        self.batched = False
+        self.timingFailure = False #[bool], or [np.array of bool] in batch mode
         self.avgCurr = None
         self.avgPwr = None
         self.propTimeList = []
@@ -60,94 +182,56 @@ class TestBench:
     def setStim(self, ptrn, expRes=None):
         '''Initialize test stimulus and expected result (optional) \n
         Args: 
-            ptrn [str]: string of 1s and 0s to test with \n
-            expRes [str]: expected result, string of 1s and 0s '''
-        if not isinstance(ptrn, str):
+            ptrn [str or Pattern]: string of 1s and 0s to test with \n
+            expRes [str or Pattern]: expected result, string of 1s and 0s '''
+        if not isinstance(ptrn, (str, Pattern)):
             cl.red('Error: Test pattern must be str')
             exit()
         #setup stimulus variables
-        self.stimPtrn = ptrn
+        self.stimPtrn = self.toPattern(ptrn, 'ptrn')
         self.ptrnLen = len(self.stimPtrn)
-        for char in ptrn:
-            if char == '0':
-                self.stimList.append(False)
-            elif char == '1':
-                self.stimList.append(True)
-            else:
-                cl.red(f'Error: Unexpected character "{char}" in ptrn')
-                exit()
-        for stim in self.stimList:
-            self.stimV.append(self.vdd*stim)
+        self.resArr = None
+        self.resVoltArr = None
+        self.resScopeV = None
+        self.stimList = self.stimPtrn.bools()
+        self.stimV = self.stimPtrn.volts(self.vdd)
         #prepare stimulus oscope data
-        for i in range(self.ptrnLen):
-            self.stimScopeV.append(self.stimV[i])
-            if self.stimScopet:
-                self.stimScopet.append(self.stimScopet[-1] + self.period)
-            else:
-                self.stimScopet.append(0)
+        self.stimScopeV = self.stimV
+        self.stimScopet = self.stepTimes()
         # dt.info(self.stimScopeV, 'self.stimScopeV')
         # dt.info(self.stimScopet, 'self.stimScopet')
 
 
         #setup expected result variables
         if expRes:
-            if not isinstance(expRes, str):
+            if not isinstance(expRes, (str, Pattern)):
                 cl.red('Error: expRes must be str')
                 exit()
-            self.expResList = [] #bool
-            for char in expRes:
-                if char == '0':
-                    self.expResList.append(False)
-                elif char == '1':
-                    self.expResList.append(True)
-                else:
-                    cl.red(f'Error: Unexpected character "{char}" in expRes')
-                    exit()
+            self.expResList = self.toPattern(expRes, 'expRes')
 
     def setMultiStim(self, ptrn, expRes=None):
         '''Initialize test stimulus and expected result (optional) \n
         Args: 
-            ptrn [dict of str]: string of 1s and 0s to test with \n
+            ptrn [dict of str or Pattern]: string of 1s and 0s to test with \n
                 str keys
-            expRes [dict str]: expected result, string of 1s and 0s 
+            expRes [dict str or Pattern]: expected result, string of 1s and 0s 
                 str keys '''
         if not isinstance(ptrn, dict):
             cl.red('Error: Test pattern must be dict')
             exit()
         #setup stimulus variables
-        self.stimList = {}
-        self.stimV = {}
-        self.stimPtrn = ptrn
+        self.stimPtrn = {key:self.toPattern(ptrn[key], 'ptrn') for key in ptrn}
         ptrnKeys = list(self.stimPtrn.keys())
         self.ptrnLen = len(self.stimPtrn[ptrnKeys[0]])
-        for key in ptrnKeys:
-            self.stimList[key] = []
-            for char in self.stimPtrn[key]:
-                if char == '0':
-                    self.stimList[key].append(False)
-                elif char == '1':
-                    self.stimList[key].append(True)
-                else:
-                    cl.red(f'Error: Unexpected character "{char}" in ptrn')
-                    exit()
-            # dt.info(self.stimList, 'self.stimList')
-            # dt.info(key, 'key')
-        for key in ptrnKeys:
-            self.stimV[key] = []
-            for stim in self.stimList[key]:
-                self.stimV[key].append(self.vdd*stim)
+        self.resArr = {}
+        self.resVoltArr = {}
+        self.resScopeV = {}
+        self.stimList = {key:self.stimPtrn[key].bools() for key in ptrnKeys}
+        self.stimV = {key:self.stimPtrn[key].volts(self.vdd) for key in ptrnKeys}
         # dt.info(self.stimV, 'self.stimV')
         #prepare stimulus oscope data
-        for i in range(self.ptrnLen):
-            if self.stimScopet:
-                self.stimScopet.append(self.stimScopet[-1] + self.period)
-            else:
-                self.stimScopet.append(0)
-        self.stimScopeV = {}
-        for key in ptrnKeys:
-            self.stimScopeV[key] = []
-            for i in range(self.ptrnLen):
-                self.stimScopeV[key].append(self.stimV[key][i])  
+        self.stimScopet = self.stepTimes()
+        self.stimScopeV = self.stimV
         # dt.info(self.stimScopeV, 'self.stimScopeV')
         # dt.info(self.stimScopet, 'self.stimScopet')
         # exit()
@@ -157,19 +241,45 @@ class TestBench:
             if not isinstance(expRes, dict):
                 cl.red('Error: expRes must be dict')
                 exit()
-            expKeys = list(expRes.keys())
-            self.expResList = {} #dict of list of bool
-            for key in expKeys:
-                self.expResList[key] = []
-                for char in expRes[key]:
-                    if char == '0':
-                        self.expResList[key].append(False)
-                    elif char == '1':
-                        self.expResList[key].append(True)
-                    else:
-                        cl.red(f'Error: Unexpected character "{char}" in expRes')
-                        exit()
+            self.expResList = {key:self.toPattern(expRes[key], 'expRes') for key in expRes} #dict of Pattern
         # dt.info(self.expResList, 'self.expResList')
+
+    def reset(self, vdd=None):
+        '''Clear the results to run the stimulus again (buffers are reallocated on the next step) \n
+        Args: 
+            vdd [float or np.array]: new Vdd (stimulus voltages follow), None to keep it'''
+        if vdd is not None:
+            self.vdd = vdd
+            if isinstance(self.stimPtrn, dict):
+                self.stimV = {key:self.stimPtrn[key].volts(vdd) for key in self.stimPtrn}
+            elif self.stimPtrn is not None:
+                self.stimV = self.stimPtrn.volts(vdd)
+            self.stimScopeV = self.stimV
+        multi = isinstance(self.stimPtrn, dict)
+        self.resArr = {} if multi else None
+        self.resVoltArr = {} if multi else None
+        self.resScopeV = {} if multi else None
+        self.resScopet = None
+        self.resScopeCurr = None
+        self.resScopePwr = None
+        self.firstMismatch = None
+        self.stepCount = 0
+        self.batched = False
+        self.timingFailure = False
+        self.avgCurr = None
+        self.avgPwr = None
+        self.propTimeList = []
+
+    @staticmethod
+    def toPattern(ptrn, name):
+        '''Return:
+            [Pattern]: ptrn, parsed if given as a str'''
+        return ptrn if isinstance(ptrn, Pattern) else Pattern(ptrn, name=name)
+
+    def stepTimes(self):
+        '''Return:
+            [np.array of float]: start time (s) of every step, accumulated one period at a time'''
+        return np.concatenate(([0.0], np.cumsum(np.full(self.ptrnLen-1, self.period))))
         
     def prStep(self, i, vout):
         '''Print step\n
@@ -179,11 +289,9 @@ class TestBench:
         Return:
             res [bool]: true/false result based on vdd/2'''
         
-        res = vout > self.vdd/2 #bool
+        res = self.saveStep(i, vout)
         resChar  = str(int(res))
         print(f'Running step #{i}: {self.stimPtrn[i]} → {resChar}')
-        self.resArr.append(res)
-        self.resVoltArr.append(vout)
         return res
     
     def saveStep(self, i , vout):
@@ -194,8 +302,11 @@ class TestBench:
         Return:
             res [bool]: true/false result based on vdd/2'''
         res = vout > self.vdd/2 #bool
-        self.resArr.append(res)
-        self.resVoltArr.append(vout)
+        if self.resArr is None:
+            self.resArr = self.resBuf(res, bool)
+            self.resVoltArr = self.resBuf(res)
+        self.resArr[i] = res
+        self.resVoltArr[i] = vout
         return res
     
     def prStepMulti(self, i, vout):
@@ -205,29 +316,15 @@ class TestBench:
             vout [dict of float]: output voltages (V) for step
         Return:
             res [dict of bool]: true/false results based on vdd/2'''
-        
-        
-        
-        
-        voutKeys = list(vout.keys())
-        res = {}
-        for key in voutKeys:
-            res[key] = vout[key] > self.vdd/2 #bool
-            if not key in self.resArr:
-                self.resArr[key] = []
-            self.resArr[key].append(res[key])
-            if not key in self.resVoltArr:
-                self.resVoltArr[key] = []
-            self.resVoltArr[key].append(vout[key])
-        # dt.info(self.resArr, 'self.resArr')
-        # dt.info(self.resVoltArr, 'self.resVoltArr')
+        res = self.saveStepMulti(i, vout)
 
         resStr = ''
-        for key in reversed(voutKeys):
+        for key in reversed(list(vout)):
             resChar  = str(int(res[key]))
             # resStr += f'{key}: {resChar}   '
             resStr += f'{resChar} '
-        print(f'Running step #{i:2}: {self.stimPtrn["a"][i]} + {self.stimPtrn["b"][i]} + {self.stimPtrn["cin"][i]}     →     {resStr}')
+        stimStr = ' + '.join(self.stimPtrn[key][i] for key in self.stimPtrn)
+        print(f'Running step #{i:2}: {stimStr}     →     {resStr}')
         
         return res
     
@@ -239,38 +336,59 @@ class TestBench:
             vout [dict of float]: output voltages (V) for step
         Return:
             res [dict of bool]: true/false results based on vdd/2'''
-        voutKeys = list(vout.keys())
         res = {}
-        for key in voutKeys:
+        for key in vout:
             res[key] = vout[key] > self.vdd/2 #bool
             if not key in self.resArr:
-                self.resArr[key] = []
-            self.resArr[key].append(res[key])
-            if not key in self.resVoltArr:
-                self.resVoltArr[key] = []
-            self.resVoltArr[key].append(vout[key])
+                self.resArr[key] = self.resBuf(res[key], bool)
+                self.resVoltArr[key] = self.resBuf(res[key])
+            self.resArr[key][i] = res[key]
+            self.resVoltArr[key][i] = vout[key]
         # dt.info(self.resArr, 'self.resArr')
         # dt.info(self.resVoltArr, 'self.resVoltArr')
         return res
+
+    def resBuf(self, sample, dtype=float, pointsPerStep=1):
+        '''Preallocate a result buffer for every step of the pattern \n
+        Args:
+            sample [float or np.array]: a value to be stored, sets the shape of each row (per die in batch mode) \n
+            dtype [type]: element type \n
+            pointsPerStep [int]: rows per step
+        Return:
+            [np.array]: uninitialized buffer, ptrnLen*pointsPerStep rows'''
+        return np.empty((self.ptrnLen*pointsPerStep,) + np.shape(sample), dtype=dtype)
         
     def checkRes(self):
-        passing = True
-        if self.timingFailure:
-            passing = False
-        if self.resArr != self.expResList:
-            passing = False
-
-        #average current/power
-        timeWeights = []
-        for i in range(len(self.resScopet)-1):
-            timeWeights.append(self.resScopet[i+1]-self.resScopet[i])
-        sumCurr = 0
-        sumPwr  = 0
-        for i in range(len(timeWeights)):
-            sumCurr += timeWeights[i]*self.resScopeCurr[i]
-            sumPwr += timeWeights[i]*self.resScopePwr[i]
-        self.avgCurr = sumCurr/sum(timeWeights)
-        self.avgPwr = sumPwr/sum(timeWeights)
+        '''Check results against expected results and compute average current/power\n
+        Return:
+            passing [bool]: True if every step matched expRes without a timing failure
+                [np.array of bool]: per die in batch mode
+        Notes:
+            firstMismatch [int]: first step not matching expRes, -1 if none (see Pattern.firstMismatch)
+                [dict of int] for multi mode, str keys, per die np.array in batch mode'''
+        if isinstance(self.expResList, dict):
+            self.firstMismatch = {key:self.expResList[key].firstMismatch(self.resArr.get(key, [])[:self.stepCount]) 
+                                  for key in self.expResList}
+            matched = [self.firstMismatch[key] < 0 for key in self.firstMismatch]
+            if self.resArr.keys() != self.expResList.keys():
+                matched.append(False)
+        else:
+            res = self.resArr[:self.stepCount] if self.resArr is not None else []
+            self.firstMismatch = self.expResList.firstMismatch(res)
+            matched = [self.firstMismatch < 0]
+        if self.batched:
+            passing = np.logical_not(self.timingFailure)
+            for match in matched:
+                passing = passing & match
+        else:
+            passing = not self.timingFailure and all(matched)
+
+        #average current/power, time weighted over the oscope points
+        numPoints = 2*self.stepCount
+        timeWeights = np.diff(self.resScopet[:numPoints], axis=0)
+        sumTime = timeWeights.sum(axis=0)
+        self.avgCurr = np.einsum('i...,i...->...', timeWeights, self.resScopeCurr[:numPoints-1])/sumTime
+        self.avgPwr = np.einsum('i...,i...->...', timeWeights, self.resScopePwr[:numPoints-1])/sumTime
         #print run details
         # print(f'Average current consumption: {round(self.avgCurr*1000, 9)} mA')
         # print(f'Average power   consumption: {round(self.avgPwr*1000, 9)} mW')
@@ -295,62 +413,90 @@ class TestBench:
         #assume two steps, ramp voltage, and steady state
         #begin ramp voltage
         startTime = self.stimScopet[i] #begin ramp voltage at t=0 (relative to step)
-        self.resScopet.append(startTime)
-        self.resScopeV.append(output.initVout)
-        self.resScopeCurr.append(output.stepChg/output.stepTime)
-        self.resScopePwr.append(output.stepEnergy/output.stepTime)
+        if self.resScopeV is None:
+            self.allocScope(output.stepTime)
+            self.resScopeV = self.resBuf(output.stepTime, pointsPerStep=2)
+        self.resScopet[2*i] = startTime
+        self.resScopeV[2*i] = output.initVout
+        self.resScopeCurr[2*i] = output.stepChg/output.stepTime
+        self.resScopePwr[2*i] = output.stepEnergy/output.stepTime
         #end ramp voltage, begin steady state
-        self.resScopet.append(startTime+output.stepTime)
-        self.resScopeV.append(output.voutFinal)
-        self.resScopeCurr.append(output.ssCurr)
-        self.resScopePwr.append(output.ssPwr)
+        self.resScopet[2*i+1] = startTime+output.stepTime
+        self.resScopeV[2*i+1] = output.voutFinal
+        self.resScopeCurr[2*i+1] = output.ssCurr
+        self.resScopePwr[2*i+1] = output.ssPwr
         #end steady state will tack onto the next one automatically 
+        self.stepCount = i+1
 
         # dt.info(self.resScopet, 'self.resScopet')
         # dt.info(self.resScopeV, 'self.resScopeV')
 
-    def resScopeDataMulti(self, i, dut, propTime):
-        '''MULTI (only for full adder right now) - Save the step results to an oscope friendly format \n
+    def resScopeDataMulti(self, i, dut, propTime, output):
+        '''MULTI - Save the step results to an oscope friendly format \n
         Args:
-            output [gate.py class]: output object of DUT \n '''
-        xor1 = dut[0]
-        nand2 = dut[1]
-        xor2 = dut[2]
-        nand1 = dut[3]
-        invNand1 = dut[4]
-        invNand2 = dut[5]
-        nor = dut[6]
-        invNor = dut[7]
-        
+            i [int]: iterator \n
+            dut [list of gate.py class]: every gate of the device \n
+            propTime [float]: critical path propagation time (s) of the step \n
+            output [dict of gate.py class]: output gates, str keys'''
         #assume two steps, ramp voltage, and steady state
         #begin ramp voltage
         startTime = self.stimScopet[i] #begin ramp voltage at t=0 (relative to step)
-        self.resScopet.append(startTime)
-        if not isinstance(self.resScopeV, dict):
-            self.resScopeV = {'s':[], 'cout':[]}
-        self.resScopeV['s'].append(xor2.initVout)
-        self.resScopeV['cout'].append(invNor.initVout)
-        self.resScopeCurr.append((xor1.stepChg+nand2.stepChg+xor2.stepChg+nand1.stepChg+invNand1.stepChg+invNand2.stepChg+nor.stepChg+invNor.stepChg)/propTime)
-        self.resScopePwr.append((xor1.stepEnergy+nand2.stepEnergy+xor2.stepEnergy+nand1.stepEnergy+invNand1.stepEnergy+invNand2.stepEnergy+nor.stepEnergy+invNor.stepEnergy)/propTime)
+        if not self.resScopeV:
+            self.allocScope(propTime)
+            self.resScopeV = {key:self.resBuf(propTime, pointsPerStep=2) for key in output}
+        self.resScopet[2*i] = startTime
+        for key in output:
+            self.resScopeV[key][2*i] = output[key].initVout
+        if self.batched:
+            self.resScopeCurr[2*i] = np.divide(sum(gate.stepChg for gate in dut), propTime, 
+                                               out=np.zeros(np.shape(propTime)), where=propTime > 0)
+            self.resScopePwr[2*i] = np.divide(sum(gate.stepEnergy for gate in dut), propTime, 
+                                              out=np.zeros(np.shape(propTime)), where=propTime > 0)
+        elif propTime:
+            self.resScopeCurr[2*i] = sum(gate.stepChg for gate in dut)/propTime
+            self.resScopePwr[2*i] = sum(gate.stepEnergy for gate in dut)/propTime
+        else: #no output switched (Netlist.stepEvents), zero length ramp
+            self.resScopeCurr[2*i] = 0
+            self.resScopePwr[2*i] = 0
         #end ramp voltage, begin steady state
-        self.resScopet.append(startTime+propTime)
-        self.resScopeV['s'].append(xor2.voutFinal)
-        self.resScopeV['cout'].append(invNor.voutFinal)
-        self.resScopeCurr.append(xor1.ssCurr+nand2.ssCurr+xor2.ssCurr+nand1.ssCurr+invNand1.ssCurr+invNand2.ssCurr+nor.ssCurr+invNor.ssCurr)
-        self.resScopePwr.append(xor1.ssPwr+nand2.ssPwr+xor2.ssPwr+nand1.ssPwr+invNand1.ssPwr+invNand2.ssPwr+nor.ssPwr+invNor.ssPwr)
+        self.resScopet[2*i+1] = startTime+propTime
+        for key in output:
+            self.resScopeV[key][2*i+1] = output[key].voutFinal
+        self.resScopeCurr[2*i+1] = sum(gate.ssCurr for gate in dut)
+        self.resScopePwr[2*i+1] = sum(gate.ssPwr for gate in dut)
         #end steady state will tack onto the next one automatically 
+        self.stepCount = i+1
 
-        # dt.info(self.resScopet, 'self.resScopet')
-        # dt.info(self.resScopeV, 'self.resScopeV')
+    def allocScope(self, sample):
+        '''Preallocate the resScope time, current and power buffers, 2 points per step \n
+        Args:
+            sample [float or np.array]: step propagation time, per die in batch mode'''
+        self.resScopet = self.resBuf(sample, pointsPerStep=2)
+        self.resScopeCurr = self.resBuf(sample, pointsPerStep=2)
+        self.resScopePwr = self.resBuf(sample, pointsPerStep=2)
 
-    def dispScope(self):
+    def dispScope(self, envelope=None):
+        '''Plot stimulus, result, current and power over time on an oscope (one trace per key in multi mode) \n
+        Args:
+            envelope [bool, optional]: min/max envelope decimation, see plot.OSCOPE.plot'''
+        numPoints = 2*self.stepCount
+        traces = [] #(label, v, t, intp)
+        for name, scopeV, scopet, intp in (('Vin', self.stimScopeV, self.stimScopet, False), 
+                                           ('Vout', self.resScopeV, self.resScopet, True)):
+            if isinstance(scopeV, dict):
+                for key in scopeV:
+                    traces.append((f'{name} {key} (V)', scopeV[key], scopet, intp))
+            else:
+                traces.append((f'{name} (V)', scopeV, scopet, intp))
+        traces.append(('Current (A)', self.resScopeCurr, self.resScopet, False))
+        traces.append(('Power (W)', self.resScopePwr, self.resScopet, False))
         scope = plot.OSCOPE()
-        scope.dataList.append({'v': self.stimScopeV, 't': self.stimScopet, 'intp': False})
-        scope.dataList.append({'v': self.resScopeV, 't': self.resScopet, 'intp': True})
-        scope.dataList.append({'v': self.resScopeCurr, 't': self.resScopet, 'intp': False})
-        scope.dataList.append({'v': self.resScopePwr, 't': self.resScopet, 'intp': False})
-        scope.plot(multiLabels=['Vin (V)', 'Vout (V)', 'Current (A)', 'Power (W)'], 
-                   title='Oscope', xlabel='Time (s)', ylabel='Voltage (V)', trellis=True)
+        for label, v, t, intp in traces:
+            if t is self.resScopet:
+                v, t = v[:numPoints], t[:numPoints]
+            scope.dataList.append({'v': v, 't': t, 'intp': intp})
+        scope.plot(multiLabels=[trace[0] for trace in traces], 
+                   title='Oscope', xlabel='Time (s)', ylabel='Voltage (V)', trellis=True, envelope=envelope)
         
 
 class DutManager:
@@ -370,10 +516,16 @@ class DutManager:
         self.output = None
 
     def step(self, i, quiet=True):
-        self.input.vin = self.tb.stimV[i]
+        if self.tb.fastPath is not None and self.dut.trusted != self.tb.fastPath:
+            gate.setTrusted(self.dut, self.tb.fastPath)
+        vin = self.tb.stimV[i]
+        self.input.vin = vin if self.dut.batched else float(vin)
         self.dut.step()
 
-        if self.dut.stepTime >= self.tb.period:
+        if self.dut.batched:
+            self.tb.batched = True
+            self.tb.timingFailure = self.tb.timingFailure | (self.dut.stepTime >= self.tb.period)
+        elif self.dut.stepTime >= self.tb.period:
             self.tb.timingFailure = True
 
         if quiet:
@@ -383,73 +535,342 @@ class DutManager:
         self.tb.resScopeData(i, self.output)
         
 
+class Netlist:
+    '''Netlist class'''
+
+    def __init__(self, inputs, outputs, outLoad=0, eventDelta=None):
+        '''Gate level circuit description, compiled once into a levelized schedule\n
+        Args:
+            inputs [list of str]: primary input nets, stimulus keys of the test bench \n
+            outputs [dict of str]: result key → output net \n
+            outLoad [float]: external load capacitance (F) on each output net \n
+            eventDelta [float]: event-driven evaluation, a gate only steps when one of its input nets moved 
+                more than eventDelta (V) since it last stepped, see stepEvents()
+                None for the module default (cfg.eventDelta, else every gate steps every step)
+        Notes:
+            gates [dict of gate.py class]: str keys (gate names), in order added
+            schedule [list of tuple]: (gate, input net indices, output net index, driver gate indices)
+                in evaluation order, see compile()
+            netV [list of float]: voltage of every net, primary inputs first
+            seedOrder [list of tuple]: (gate name, number of procVars) in the order the builder consumed them 
+                from its WaferConsumer, see reseed()
+            staleCins [set of str]: gates whose input capacitance changed since the loads were calculated, 
+                the cld of their drivers is updated on the next step, see setProcVar()
+            evalCount, skipCount [int]: gate steps evaluated and skipped (quiet) by stepEvents()'''
+        self.inputs = list(inputs)
+        self.outputs = dict(outputs)
+        self.outLoad = outLoad
+        self.eventDelta = eventDelta if eventDelta is not None else defaultEventDelta
+        self.gates = {}
+        self.gateIns = {}
+        self.gateOut = {}
+        self.seedOrder = []
+        self.staleCins = set()
+        self.schedule = None
+        self.driver = None
+        self.fanout = None
+        self.order = None
+        self.dut = None
+        self.outIdx = None
+        self.outGates = None
+        self.sinkIdx = None
+        self.netIdx = None
+        self.netV = None
+        self.evalIn = None
+        self.evalCount = 0
+        self.skipCount = 0
+
+    def addGate(self, name, dut, inputs, output):
+        '''Add a gate \n
+        Args:
+            name [str]: unique gate name \n
+            dut [INV, NAND, NOR or XOR (from gate.py) class]: gate object \n
+            inputs [list of str]: input nets in dut.INPUTS order \n
+            output [str]: output net'''
+        assert name not in self.gates
+        assert len(inputs) == len(dut.INPUTS)
+        self.gates[name] = dut
+        self.gateIns[name] = list(inputs)
+        self.gateOut[name] = output
+        self.schedule = None
+
+    def compile(self):
+        '''Levelize gates, assign load capacitance from fan-out and build the schedule'''
+        driver = {}
+        inputs = set(self.inputs)
+        for name, net in self.gateOut.items():
+            if net in driver or net in inputs:
+                cl.red(f'Error: net "{net}" has more than one driver')
+                exit()
+            driver[net] = name
+        for name, nets in self.gateIns.items():
+            for net in nets:
+                if net not in driver and net not in inputs:
+                    cl.red(f'Error: net "{net}" of gate "{name}" is not driven')
+                    exit()
+        #topological order (Kahn), ties keep the order gates were added (ready heap by insertion index)
+        names = list(self.gates)
+        addIdx = {name: idx for idx, name in enumerate(names)}
+        numPending = {} #gate name → number of its input pins driven by gates not in order yet
+        loads = {} #driver gate name → gate names it drives, once per pin
+        for name in names:
+            drivers = [driver[net] for net in self.gateIns[name] if net in driver]
+            numPending[name] = len(drivers)
+            for drvName in drivers:
+                loads.setdefault(drvName, []).append(name)
+        ready = [addIdx[name] for name in names if not numPending[name]]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            name = names[heapq.heappop(ready)]
+            order.append(name)
+            for loadName in loads.get(name, ()):
+                numPending[loadName] -= 1
+                if not numPending[loadName]:
+                    heapq.heappush(ready, addIdx[loadName])
+        if len(order) < len(names):
+            ordered = set(order)
+            cl.red(f'Error: combinational loop through {[name for name in names if name not in ordered]}')
+            exit()
+        self.order = order
+        self.driver = driver
+        #fan-out (load gate, cin attribute) of every net, in evaluation order
+        self.fanout = {}
+        for name in order:
+            dut = self.gates[name]
+            for pin, net in enumerate(self.gateIns[name]):
+                self.fanout.setdefault(net, []).append((dut, dut.CINS[pin]))
+        self.calcLoads()
+        #schedule, nets and gates referenced by index
+        self.netIdx = {net: idx for idx, net in enumerate(self.inputs)}
+        for name in order:
+            self.netIdx[self.gateOut[name]] = len(self.netIdx)
+        gateIdx = {name: idx for idx, name in enumerate(order)}
+        self.schedule = []
+        for name in order:
+            self.schedule.append((self.gates[name], 
+                                  tuple(self.netIdx[net] for net in self.gateIns[name]),
+                                  self.netIdx[self.gateOut[name]],
+                                  tuple(sorted({gateIdx[driver[net]] for net in self.gateIns[name] if net in driver}))))
+        self.dut = [self.gates[name] for name in order]
+        self.outIdx = {key: self.netIdx[net] for key, net in self.outputs.items()}
+        self.outGates = {key: self.gates[driver[net]] for key, net in self.outputs.items()}
+        self.sinkIdx = tuple(gateIdx[driver[net]] for net in self.outputs.values())
+        self.netV = [0]*len(self.netIdx)
+
+    def calcLoads(self, names=None):
+        '''Load capacitance of gates, fan-out cin sum (+ outLoad on outputs), in evaluation order\n
+        Args:
+            names [set of str]: only these gates, None for every gate'''
+        if names is None:
+            self.staleCins.clear()
+        self.evalIn = None #reconfigured, every gate steps next (stepEvents)
+        outNets = set(self.outputs.values())
+        for name in self.order:
+            if names is not None and name not in names:
+                continue
+            net = self.gateOut[name]
+            cld = 0
+            for dut, cinAttr in self.fanout.get(net, ()):
+                cld = cld + getattr(dut, cinAttr)
+            if net in outNets:
+                cld = cld + self.outLoad
+            self.gates[name].cld = cld
+            self.gates[name].validateModel() #reconfigured, validated here for trusted gates (gate.setTrusted)
+
+    def reseed(self, wc):
+        '''Replace the process variation of every gate in place (same circuit as rebuilding it from wc)\n
+        Args:
+            wc [WaferConsumer class]: source of process variation, consumed in seedOrder
+        Notes:
+            gate transistors, cin and the load capacitance of every gate are recomputed'''
+        if not self.seedOrder:
+            cl.red('Error: netlist has no seedOrder, see sweep.addFullAdder')
+            exit()
+        for name, numProcVar in self.seedOrder:
+            gate.reseed(self.gates[name], wc.consume(numProcVar))
+        if self.schedule is not None:
+            self.calcLoads()
+
+    def setProcVar(self, name, fet, **procVar):
+        '''Change single procVar keys of one transistor in place, for sensitivity sweeps\n
+        Args:
+            name [str]: gate name\n
+            fet [str]: transistor of the gate, e.g. 'nTrA' or 'invA.nTr', see gate.setProcVar\n
+            procVar [float or np.array]: new values by key, e.g. w=3
+        Notes:
+            only the dependent transistor parameters and the cin of the gate are recomputed now,
+                the cld of the gates driving it is recomputed on the next step (only if cgate changed)'''
+        if gate.setProcVar(self.gates[name], fet, **procVar):
+            self.staleCins.add(name)
+        self.evalIn = None
+
+    def updateLoads(self):
+        '''Recompute the cld of the gates driving a gate in staleCins (called by step)'''
+        drivers = {self.driver[net] for name in self.staleCins for net in self.gateIns[name] if net in self.driver}
+        self.staleCins.clear()
+        self.calcLoads(drivers)
+
+    def setVdd(self, vdd):
+        '''Change the Vdd of every gate in place\n
+        Args:
+            vdd [float]: Vdd (V)
+                [np.array]: per die Vdd in batch mode'''
+        for dut in self.gates.values():
+            gate.setVdd(dut, vdd)
+        self.evalIn = None
+
+    def reset(self):
+        '''Return every gate and net to 0 V, the state of a newly built circuit'''
+        for dut in self.gates.values():
+            gate.reset(dut)
+        if self.netV is not None:
+            self.netV = [0]*len(self.netV)
+        self.evalIn = None
+
+    def step(self, vins):
+        '''Step every gate once in schedule order \n
+        Args:
+            vins [list of float]: primary input voltages, in self.inputs order
+        Return:
+            propTime [float]: critical (longest) path propagation time (s) to any output'''
+        if self.staleCins:
+            self.updateLoads()
+        netV = self.netV
+        netV[:len(vins)] = vins
+        if self.eventDelta is not None:
+            return self.stepEvents()
+        maximum = np.maximum if self.dut[0].batched else max
+        arrival = []
+        for dut, inIdx, outIdx, drvIdx in self.schedule:
+            dut.chgInputs(*[netV[idx] for idx in inIdx])
+            dut.step()
+            netV[outIdx] = dut.voutFinal
+            if not drvIdx:
+                arrival.append(dut.stepTime)
+            elif len(drvIdx) == 1:
+                arrival.append(arrival[drvIdx[0]] + dut.stepTime)
+            else:
+                start = arrival[drvIdx[0]]
+                for idx in drvIdx[1:]:
+                    start = maximum(start, arrival[idx])
+                arrival.append(start + dut.stepTime)
+        propTime = arrival[self.sinkIdx[0]]
+        for idx in self.sinkIdx[1:]:
+            propTime = maximum(propTime, arrival[idx])
+        return propTime
+
+    def stepEvents(self):
+        '''Event-driven step, called by step() when eventDelta is set (primary inputs already in netV)\n
+        Return:
+            propTime [float]: critical path propagation time (s) to any output that switched, 0 if none did
+        Notes:
+            a gate steps when an input net moved more than eventDelta since it last stepped (every gate steps
+                on the first step after compile/reset/setVdd/reseed/setProcVar), in batch mode on any die
+            a quiet gate keeps its output, adds no delay and only draws its steady state current/power 
+                (ssCurr/ssPwr) during the step, the work saved follows the activity factor of the circuit'''
+        netV = self.netV
+        delta = self.eventDelta
+        batched = self.dut[0].batched
+        maximum = np.maximum if batched else max
+        if self.evalIn is None:
+            self.evalIn = [None]*len(self.schedule)
+        evalIn = self.evalIn
+        arrival = []
+        quiet = []
+        for gateIdx, (dut, inIdx, outIdx, drvIdx) in enumerate(self.schedule):
+            vins = [netV[idx] for idx in inIdx]
+            lastVins = evalIn[gateIdx]
+            if lastVins is not None:
+                if batched:
+                    moved = any(np.any(np.abs(vin - lastVin) > delta) for vin, lastVin in zip(vins, lastVins))
+                else:
+                    moved = any(abs(vin - lastVin) > delta for vin, lastVin in zip(vins, lastVins))
+                if not moved:
+                    dut.initVout = dut.vout
+                    dut.stepTime = 0
+                    arrival.append(0)
+                    quiet.append(dut)
+                    continue
+            evalIn[gateIdx] = vins
+            dut.chgInputs(*vins)
+            dut.step()
+            netV[outIdx] = dut.voutFinal
+            if not drvIdx:
+                arrival.append(dut.stepTime)
+            else:
+                start = arrival[drvIdx[0]]
+                for idx in drvIdx[1:]:
+                    start = maximum(start, arrival[idx])
+                arrival.append(start + dut.stepTime)
+        propTime = arrival[self.sinkIdx[0]]
+        for idx in self.sinkIdx[1:]:
+            propTime = maximum(propTime, arrival[idx])
+        if batched and not isinstance(propTime, np.ndarray):
+            propTime = np.zeros(np.shape(netV[-1])) #no output switched on any die
+        for dut in quiet:
+            dut.stepChg = dut.ssCurr*propTime
+            dut.stepEnergy = dut.ssPwr*propTime
+        self.evalCount += len(self.schedule) - len(quiet)
+        self.skipCount += len(quiet)
+        return propTime
+
+
 class MultiDutManager:
     '''Multi DUT manager class'''
 
-    def __init__(self, tb=None, dut=None):
-        '''*ONLY WORKS FOR FULL ADDER FOR NOW*\n
-        Dut manager steps entire devices\n
+    def __init__(self, tb=None, netlist=None):
+        '''Dut manager steps entire devices described by a netlist\n
         Args:
             tb [TestBench class]: test bench object \n
-            dut [list of INV, NAND, NOR or XOR (from gate.py) class]: 
+            netlist [Netlist class]: device, compiled on the first step if needed
+                inputs must match the stimulus keys, outputs the expected result keys
         Notes:
-            input [dict of gate.py class]: input gate
-                str keys
-            output [dict of gate.py class]: output gate
+            dut [list of gate.py class]: gates in evaluation order
+            output [dict of gate.py class]: output gates
                 str keys'''
         self.tb = tb
-        self.dut = dut
-        self.input = None
+        self.netlist = netlist
+        self.dut = None
         self.output = None
-        self.tb.resArr = {}
-        self.tb.resVoltArr = {}
+        self.stimCols = None
+
+    def reset(self, vdd=None):
+        '''Run the same device and stimulus again from power up\n
+        Args:
+            vdd [float or np.array]: new Vdd for the test bench and every gate, None to keep it'''
+        if vdd is not None:
+            self.netlist.setVdd(vdd)
+        self.netlist.reset()
+        self.tb.reset(vdd)
+        self.stimCols = None
 
     def step(self, i, quiet=True):
-        assert isinstance(self.dut, list) and len(self.dut)==8 #only works for a full adder for now
-        
-        xor1 = self.dut[0]
-        nand2 = self.dut[1]
-        xor2 = self.dut[2]
-        nand1 = self.dut[3]
-        invNand1 = self.dut[4]
-        invNand2 = self.dut[5]
-        nor = self.dut[6]
-        invNor = self.dut[7]
-        
-        xor1.chgInputs(self.tb.stimV['a'][i], self.tb.stimV['b'][i])
-        nand2.vinA = self.tb.stimV['a'][i]
-        nand2.vinB = self.tb.stimV['b'][i]
-        xor1.step()
-        nand2.step()
-
-        xor2.chgInputs(xor1.voutFinal, self.tb.stimV['cin'][i])
-        nand1.vinA = self.tb.stimV['cin'][i]
-        nand1.vinB = xor1.voutFinal
-        xor2.step()
-        nand1.step()
-
-        invNand1.vin = nand1.voutFinal
-        invNand2.vin = nand2.voutFinal
-        invNand1.step()
-        invNand2.step()
-
-        nor.vinA = invNand1.voutFinal
-        nor.vinB = invNand2.voutFinal
-        nor.step()
-        invNor.vin = nor.voutFinal
-        invNor.step()
-
-        sumPropTime1 = xor1.stepTime + xor2.stepTime
-        sumPropTime2 = xor1.stepTime + nand1.stepTime + invNand1.stepTime + nor.stepTime + invNor.stepTime
-        sumPropTime3 = nand2.stepTime + invNand2.stepTime + nor.stepTime + invNor.stepTime
-        maxSumPropTime = max(sumPropTime1, sumPropTime2, sumPropTime3)
+        nl = self.netlist
+        if nl.schedule is None:
+            nl.compile()
+        if self.stimCols is None:
+            self.stimCols = [self.tb.stimV[key] for key in nl.inputs]
+            if self.stimCols[0].ndim == 1: #scalar mode, step with python floats
+                self.stimCols = [stimCol.tolist() for stimCol in self.stimCols]
+            self.dut = nl.dut
+            self.output = nl.outGates
+            if self.tb.fastPath is not None:
+                for dut in self.dut:
+                    gate.setTrusted(dut, self.tb.fastPath)
+
+        maxSumPropTime = nl.step([stimCol[i] for stimCol in self.stimCols])
         self.tb.propTimeList.append(maxSumPropTime)
-        if maxSumPropTime >= self.tb.period:
+        if self.dut[0].batched:
+            self.tb.batched = True
+            self.tb.timingFailure = self.tb.timingFailure | (maxSumPropTime >= self.tb.period)
+        elif maxSumPropTime >= self.tb.period:
             self.tb.timingFailure = True
 
+        vout = {key: nl.netV[idx] for key, idx in nl.outIdx.items()}
         if quiet:
-            self.tb.saveStepMulti(i, {'s':xor2.voutFinal, 'cout':invNor.voutFinal})
+            self.tb.saveStepMulti(i, vout)
         else:
-            self.tb.prStepMulti(i, {'s':xor2.voutFinal, 'cout':invNor.voutFinal})
+            self.tb.prStepMulti(i, vout)
         
-        self.tb.resScopeDataMulti(i, self.dut, maxSumPropTime)
\ No newline at end of file
+        self.tb.resScopeDataMulti(i, self.dut, maxSumPropTime, self.output)
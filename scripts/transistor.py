@@ -1,18 +1,192 @@
 '''transistor.py generates transistor models'''
 
 # Author: Luke Henderson
-__version__ = '1.0'
+__version__ = '1.8'
 
 import math
+import types
+import numpy as np
 
+import config as cfg
 import colors as cl
 import debugTools as dt
 
-class FET:
-    '''FET class'''
+#default of .trusted for new FET, FETArray and gate objects, see setFastPath
+fastPath = getattr(cfg, 'fastPath', False)
+
+def setFastPath(en):
+    '''Select the validated-once fast path globally, for objects built afterwards\n
+    Args:
+        en [bool]: True to validate only when built or reconfigured (gate.setTrusted), 
+            False to validate on every step (default)'''
+    global fastPath
+    fastPath = en
+
+#model parameters in evaluation order, each one depends on procVar and the parameters before it
+MODEL_PARAMS = ('epox', 'tox', 'w', 'l', 'cgate', 'na', 'cox', 'vth', 'un', 'ronCoef')
+ALL_PARAMS = frozenset(MODEL_PARAMS)
+#procVar key → model parameters that depend on it, the only ones setProcVar() recomputes
+PARAM_DEPS = {'epox': frozenset(('epox', 'cgate', 'cox', 'vth', 'ronCoef')),
+              'tox':  frozenset(('tox', 'cgate', 'cox', 'vth', 'ronCoef')),
+              'w':    frozenset(('w', 'cgate', 'ronCoef')),
+              'l':    frozenset(('l', 'cgate', 'ronCoef')),
+              'na':   frozenset(('na', 'vth', 'un', 'ronCoef'))}
+
+def calcParams(p, procVar, params=ALL_PARAMS):
+    '''Evaluate MOSFET model equations into the attributes of p, in MODEL_PARAMS order\n
+    Args:
+        p [FET, FETArray or namespace]: reads and writes the model parameters as attributes\n
+        procVar [dict]: process variation randomization parameters, see FET
+            only the keys the evaluated parameters depend on are read\n
+        params [set of str]: parameters to evaluate, the others are used as they are'''
+    if 'epox' in params:
+        p.epox = 1.2396e-10 * (1+procVar['epox']/100) #[F/m]
+    if 'tox' in params:
+        p.tox = 5 + procVar['tox'] #[nm]
+    if 'w' in params:
+        p.w = 240 + procVar['w'] #[nm]
+    if 'l' in params:
+        p.l = 30 + procVar['l'] #[nm]
+    if 'cgate' in params:
+        p.cgate = p.epox * p.w*1e-9 * p.l*1e-9 / (p.tox*1e-9)  #Cgate, gate capacitance [F]
+        # p.cgate = p.cox*p.w*1e-9*p.l*1e-9 #Cgate, gate capacitance [F]
+    if 'na' in params:
+        p.na = 9e23 * (1+procVar['na']/100) #doping concentration
+    if 'cox' in params:
+        p.cox = p.epox / (p.tox*1e-9) #gate oxide capacitance per unit area
+    if 'vth' in params:
+        p.vth = GateFET.vth0 - (GateFET.ELECTRON_Q*p.na * GateFET.xd*1e-9)/p.cox #threshold voltage [V]
+    if 'un' in params:
+        p.un = 0.85 * (1-0.25*(procVar['na']/100)) #mu-n, [m^2/(Volt-seconds)]
+    if 'ronCoef' in params:
+        p.ronCoef = p.un * p.cox * (p.w/p.l) #R-on coeficient, on-resistance of transistor [Ohms]
+
+def validateParams(p):
+    '''Validates the device parameters of a MOSFET model (see MODEL_PARAMS)\n
+    Args:
+        p [FET or namespace]: model parameters as attributes'''
+    assert p.epox>0 and p.epox<1 #[F/m]
+    assert p.tox>0 #[nm]
+    assert p.w>0 #[nm]
+    assert p.l>0 #[nm]
+    assert p.cgate>=0  #load capacitance [F]
+    assert GateFET.vth0>0 #V
+    assert p.na>1e10 #doping concentration
+    assert GateFET.xd>0 #depletion layer width [nm]
+    assert p.cox>=0 #gate oxide capacitance per unit area
+    assert p.vth>0 #threshold voltage [V]
+    assert p.un>0 #mu-n, [m^2/(Volt-seconds)]
+    assert p.ronCoef>0 #R-on coeficient, on-resistance of transistor [Ohms]
+    # assert p.cgate>0 #Cgate, gate capacitance [F]
+
+def updateParams(p, procVar):
+    '''Change some procVar keys of a model in place, only their dependents are recomputed (see PARAM_DEPS)\n
+    Args:
+        p [FET or FETArray]: model keeping every parameter\n
+        procVar [dict]: procVar keys to change → new value, see FET
+    Return:
+        [frozenset of str]: recomputed model parameters'''
+    stale = frozenset()
+    for key in procVar:
+        if key not in PARAM_DEPS:
+            cl.red(f'Error: "{key}" is not a procVar key')
+            exit()
+        stale = stale | PARAM_DEPS[key] if stale else PARAM_DEPS[key]
+    calcParams(p, procVar, stale)
+    return stale
+
+class GateFET:
+    '''Gate FET class'''
 
     ELECTRON_Q = 1.6e-19 #elementary charge [C]
     ROFF = 100e3 #Roff = 100kOhms
+    vth0 = 0.75 #V
+    xd = 10 #depletion layer width [nm]
+
+    __slots__ = ('chanType', 'cgate', 'vth', 'ronCoef', 'inGate', 'vrail', 'trusted')
+
+    def __init__(self, chanType, procVar):
+        '''Compact MOSFET model for use inside logic gates, only keeps what rds() needs\n
+        Args:
+            chanType [str]: 'n' or 'p' for nmos or pmos\n
+            procVar [dict]: process variation randomization parameters, see FET
+        Notes:
+            results match FET, use FET for the stand-alone transistor (step()) and every device parameter'''
+        if chanType!='n' and chanType!='p':
+            cl.red('Error: chanType not valid')
+            exit()
+        self.chanType = chanType
+        self.reseed(procVar)
+        self.inGate = True #part of a logic gate [bool]
+        self.vrail = None #rail voltage [V]
+        self.trusted = fastPath #skip validation in rds(), parameters were validated once [bool]
+
+    @classmethod
+    def model(cls, procVar):
+        '''Device parameters of the MOSFET model\n
+        Args:
+            procVar [dict]: process variation randomization parameters, see FET
+        Return:
+            [tuple of float]: epox, tox, w, l, cgate, na, cox, vth, un, ronCoef (see FET)'''
+        p = types.SimpleNamespace()
+        calcParams(p, procVar)
+        return p.epox, p.tox, p.w, p.l, p.cgate, p.na, p.cox, p.vth, p.un, p.ronCoef
+
+    def reseed(self, procVar):
+        '''Replace the process variation in place (same parameters as a new object built with procVar)\n
+        Args:
+            procVar [dict]: process variation randomization parameters, see FET
+        Notes:
+            every device parameter is validated here, only cgate/vth/ronCoef are kept'''
+        p = types.SimpleNamespace()
+        calcParams(p, procVar)
+        validateParams(p)
+        self.cgate, self.vth, self.ronCoef = p.cgate, p.vth, p.ronCoef
+
+    def setProcVar(self, **procVar):
+        '''Not available, the compact model does not keep the device parameters the update starts from\n
+        Notes:
+            build gates with fet=FET for sensitivity sweeps, e.g. sweep.buildFullAdder(vdd, wc, fet=tr.FET)'''
+        cl.red('Error: GateFET cannot update single procVar keys, build the gates with fet=tr.FET')
+        exit()
+
+    def validateModel(self):
+        '''Validates whether model is set up correctly'''
+        assert self.chanType=='n' or self.chanType=='p'
+        assert self.cgate>=0  #load capacitance [F]
+        assert self.vth>0 #threshold voltage [V]
+        assert self.ronCoef>0 #R-on coeficient, on-resistance of transistor [Ohms]
+        if self.chanType == 'p':
+            assert isinstance(self.vrail, (int, float)) and self.vrail>=0 #rail voltage 
+
+    def rds(self, vgate):
+        '''Calculate Rds based on Vgate\n
+        Args:
+            vgate [float]: gate voltage, always positive (Vg-Vss)
+        Return:
+            Rds [float]: drain-to-source resistance (Ohms)'''
+        if not self.trusted:
+            assert vgate >= 0
+            assert self.chanType == 'n' or isinstance(self.vrail, (int, float))
+        # assert eqVgs != self.vth #avoid div by zero
+        if self.chanType == 'p':
+            eqVgs = -1*(vgate - self.vrail) #equation Vgs, which for pmos is in reference to vrail
+        else: #'n'
+            eqVgs = vgate
+        if not self.trusted:
+            assert eqVgs >= 0
+
+        if eqVgs <= self.vth: #avoid div by zero, and negative case
+            return self.ROFF
+        return min(self.ROFF, 1/(self.ronCoef * (eqVgs-self.vth)))
+
+
+class FET(GateFET):
+    '''FET class'''
+
+    __slots__ = ('epox', 'tox', 'w', 'l', 'na', 'cox', 'un', 
+                 'vgate', 'cld', 'dConf', 'sConf', 'voutConf', 'vout', 
+                 'stepRds', 'tau', 'stepTime', 'stepChg', 'stepEnergy')
 
     def __init__(self, chanType, procVar):
         '''MOSFET model\n
@@ -23,24 +197,14 @@ class FET:
                 'tox': oxide thickness [+/- nm]\n
                 'w': transistor width [+/- nm]\n
                 'l': transistor length [+/- nm]\n
-                'na': doping concentration [+/- percentage]'''
+                'na': doping concentration [+/- percentage]
+        Notes:
+            logic gates use the compact GateFET (same rds())'''
         if chanType!='n' and chanType!='p':
             cl.red('Error: chanType not valid')
             exit()
         self.chanType = chanType
-        self.epox = 1.2396e-10 * (1+procVar['epox']/100) #[F/m]
-        self.tox  = 5 + procVar['tox'] #[nm]
-        self.w = 240 + procVar['w'] #[nm]
-        self.l = 30 + procVar['l'] #[nm]
-        self.cgate = self.epox * self.w*1e-9 * self.l*1e-9 / (self.tox*1e-9)  #Cgate, gate capacitance [F]
-        self.vth0 = 0.75 #V
-        self.na = 9e23 * (1+procVar['na']/100) #doping concentration
-        self.xd = 10 #depletion layer width [nm]
-        self.cox = self.epox / (self.tox*1e-9) #gate oxide capacitance per unit area
-        self.vth = self.vth0 - (self.ELECTRON_Q*self.na * self.xd*1e-9)/self.cox #threshold voltage [V]
-        self.un = 0.85 * (1-0.25*(procVar['na']/100)) #mu-n, [m^2/(Volt-seconds)]
-        self.ronCoef = self.un * self.cox * (self.w/self.l) #R-on coeficient, on-resistance of transistor [Ohms]
-        # self.cgate = self.cox*self.w*1e-9*self.l*1e-9 #Cgate, gate capacitance [F]
+        self.reseed(procVar)
 
         #simulation variables, to be loaded in during mapping
         self.inGate = None #Transistor is stand-alone (False), or part of a logic gate (True) [bool]
@@ -57,23 +221,24 @@ class FET:
         self.stepTime = None #time [s] to complete last operation
         self.stepChg = None #charge [A-s, or coulombs] transferred during last operation
         self.stepEnergy = None #energy [W-s, or joules] consumed during last operation
+        self.trusted = fastPath #skip validation in rds()/step(), parameters were validated once [bool]
+
+    def reseed(self, procVar):
+        '''Replace the process variation in place, see GateFET'''
+        calcParams(self, procVar)
+
+    def setProcVar(self, **procVar):
+        '''Change single procVar keys in place, a fraction of reseed() (see PARAM_DEPS)\n
+        Args:
+            procVar [float]: new values by key, e.g. fet.setProcVar(na=5)
+        Return:
+            [frozenset of str]: recomputed model parameters, e.g. {'na', 'vth', 'un', 'ronCoef'}'''
+        return updateParams(self, procVar)
         
     def validateModel(self):
         '''Validates whether model is set up correctly'''
         assert self.chanType=='n' or self.chanType=='p'
-        assert self.epox>0 and self.epox<1 #[F/m]
-        assert self.tox>0 #[nm]
-        assert self.w>0 #[nm]
-        assert self.l>0 #[nm]
-        assert self.cgate>=0  #load capacitance [F]
-        assert self.vth0>0 #V
-        assert self.na>1e10 #doping concentration
-        assert self.xd>0 #depletion layer width [nm]
-        assert self.cox>=0 #gate oxide capacitance per unit area
-        assert self.vth>0 #threshold voltage [V]
-        assert self.un>0 #mu-n, [m^2/(Volt-seconds)]
-        assert self.ronCoef>0 #R-on coeficient, on-resistance of transistor [Ohms]
-        # assert self.cgate>0 #Cgate, gate capacitance [F]
+        validateParams(self)
 
         #simulation variables
         if not self.inGate:
@@ -87,26 +252,6 @@ class FET:
         if self.chanType == 'p':
             assert isinstance(self.vrail, (int, float)) and self.vrail>=0 #rail voltage 
 
-    def rds(self, vgate):
-        '''Calculate Rds based on Vgate\n
-        Args:
-            vgate [float]: gate voltage, always positive (Vg-Vss)
-        Return:
-            Rds [float]: drain-to-source resistance (Ohms)'''
-        assert vgate >= 0
-        # assert eqVgs != self.vth #avoid div by zero
-        if self.chanType == 'p':
-            assert isinstance(self.vrail, (int, float))
-            eqVgs = -1*(vgate - self.vrail) #equation Vgs, which for pmos is in reference to vrail
-        else: #'n'
-            eqVgs = vgate
-        assert eqVgs >= 0
-
-        if eqVgs <= self.vth: #avoid div by zero, and negative case
-            return self.ROFF
-        return min(self.ROFF, 1/(self.ronCoef * (eqVgs-self.vth)))
-
-
     def step(self):
         '''Step the transistor model forward one time chunk\n
         Notes:
@@ -115,7 +260,8 @@ class FET:
         Args:
         Return: '''
         TAUS_PER_OPERATION = 3
-        self.validateModel()
+        if not self.trusted:
+            self.validateModel()
         self.stepRds = self.rds(self.vgate)
         if self.chanType == 'n':
             if self.dConf=='vdd': #will assume that source is load
@@ -132,8 +278,173 @@ class FET:
                 cl.red("drain configuration 'ld' not implemented")
         else: #self.chanType == 'p'
             cl.red('p channel not implemented')
+
+
+class FETArray:
+    '''FET array class'''
+
+    PROC_VAR_KEYS = ('epox', 'tox', 'w', 'l', 'na')
+
+    def __init__(self, chanType, procVarArr):
+        '''Population of MOSFET models stored as numpy columns (struct-of-arrays)\n
+        Args:
+            chanType [str]: 'n' or 'p' for nmos or pmos\n
+            procVarArr [list of procVar dicts]: one procVar per device (see FET), e.g. ds.genWafer()\n
+                [dict of np.array]: columnar procVar, one array per key
+        Notes:
+            every column is a contiguous float64 np.array of length self.count
+            results match FET element by element'''
+        if chanType!='n' and chanType!='p':
+            cl.red('Error: chanType not valid')
+            exit()
+        self.chanType = chanType
+        self.vth0 = FET.vth0 #V
+        self.xd = FET.xd #depletion layer width [nm]
+        self.reseed(procVarArr)
+
+        #simulation variables
+        self.inGate = None #devices are stand-alone (False), or part of a logic gate (True) [bool]
+        self.vrail = None #rail voltage [V], float or np.array (per device)
+        self.trusted = fastPath #skip validation in rds(), see FET [bool]
+
+    def reseed(self, procVarArr):
+        '''Replace the process variation of every device in place, the number of devices may change\n
+        Args:
+            procVarArr [list of procVar dicts or dict of np.array]: see __init__'''
+        if isinstance(procVarArr, dict):
+            cols = {key: np.ascontiguousarray(procVarArr[key], dtype=np.float64) for key in self.PROC_VAR_KEYS}
+        else:
+            cols = {key: np.fromiter((procVar[key] for procVar in procVarArr), dtype=np.float64, count=len(procVarArr)) 
+                    for key in self.PROC_VAR_KEYS}
+        self.count = len(cols['epox'])
+        calcParams(self, cols) #same equations as FET, element by element
+
+    def setProcVar(self, **procVar):
+        '''Change single procVar keys of every device in place, see FET\n
+        Args:
+            procVar [float or np.array]: new values by key, a float applies to every device
+        Return:
+            [frozenset of str]: recomputed model parameters'''
+        cols = {key: np.array(np.broadcast_to(np.asarray(val, dtype=np.float64), (self.count,))) 
+                for key, val in procVar.items()}
+        return updateParams(self, cols)
+
+    def __len__(self):
+        return self.count
+
+    def validateModel(self):
+        '''Validates whether every device in the array is set up correctly'''
+        assert self.chanType=='n' or self.chanType=='p'
+        assert np.all((self.epox>0) & (self.epox<1)) #[F/m]
+        assert np.all(self.tox>0) #[nm]
+        assert np.all(self.w>0) #[nm]
+        assert np.all(self.l>0) #[nm]
+        assert np.all(self.cgate>=0)  #load capacitance [F]
+        assert np.all(self.na>1e10) #doping concentration
+        assert np.all(self.cox>=0) #gate oxide capacitance per unit area
+        assert np.all(self.vth>0) #threshold voltage [V]
+        assert np.all(self.un>0) #mu-n, [m^2/(Volt-seconds)]
+        assert np.all(self.ronCoef>0) #R-on coeficient, on-resistance of transistor [Ohms]
+        if self.chanType == 'p':
+            assert self.vrail is not None and np.all(np.asarray(self.vrail)>=0) #rail voltage 
+
+    def rds(self, vgate):
+        '''Calculate Rds of every device based on Vgate\n
+        Args:
+            vgate [float or np.array]: gate voltage, always positive (Vg-Vss)
+                scalar is broadcast to every device
+        Return:
+            Rds [np.array]: drain-to-source resistance (Ohms), one per device'''
+        vgate = np.asarray(vgate, dtype=np.float64)
+        if not self.trusted:
+            assert np.all(vgate >= 0)
+            assert self.chanType == 'n' or self.vrail is not None
+        if self.chanType == 'p':
+            eqVgs = -1*(vgate - self.vrail) #equation Vgs, which for pmos is in reference to vrail
+        else: #'n'
+            eqVgs = vgate
+        if not self.trusted:
+            assert np.all(eqVgs >= 0)
+
+        overdrive = eqVgs - self.vth
+        on = overdrive > 0 #avoid div by zero, and negative case
+        rdsArr = np.full(overdrive.shape, FET.ROFF)
+        np.divide(1, self.ronCoef * overdrive, out=rdsArr, where=on)
+        return np.minimum(FET.ROFF, rdsArr)
+
+
+class RdsTable:
+    '''Rds lookup table class'''
+
+    def __init__(self, fet, vMax=3.0, errBound=1e-9, numPoints=257, maxPoints=2**20, numChecks=100_000):
+        '''Tabulated Rds of one device (or process corner) with linear interpolation\n
+        Args:
+            fet [FET class]: device to tabulate, e.g. FET('n', ds.genCornerRon(3))\n
+            vMax [float]: largest equation Vgs (V) in the table\n
+            errBound [float]: max relative error against fet.rds(), verified on construction\n
+            numPoints [int]: initial table size, doubled until errBound is met\n
+            maxPoints [int]: largest table size allowed\n
+            numChecks [int]: number of check points for the error verification
+        Notes:
+            Rds only depends on the equation Vgs (Vgate for nmos, Vrail-Vgate for pmos),
+                so one table over eqVgs covers the whole Vgate x Vrail plane \n
+            the table holds conductance (1/Rds), which is piecewise linear in eqVgs with
+                a knee where 1/(ronCoef*(eqVgs-vth)) reaches ROFF, the knee is a table point'''
+        self.chanType = fet.chanType
+        self.vrail = fet.vrail
+        self.vMax = vMax
+        self.errBound = errBound
+        self.maxErr = None #verified max relative error
+        vKnee = fet.vth + 1/(fet.ronCoef*FET.ROFF)
+        checkVgs = np.linspace(0, vMax, numChecks)
+        checkRds = self.analyticRds(fet, checkVgs)
+        while True:
+            self.eqVgs = np.union1d(np.linspace(0, vMax, numPoints), [vKnee] if vKnee < vMax else [])
+            self.cond = 1/self.analyticRds(fet, self.eqVgs)
+            self.maxErr = np.max(np.abs(self.lookup(checkVgs)/checkRds - 1))
+            if self.maxErr <= errBound:
+                break
+            if numPoints*2 > maxPoints:
+                cl.red(f'Error: Rds table error {self.maxErr} above bound {errBound} at {numPoints} points')
+                exit()
+            numPoints *= 2
+
+    @staticmethod
+    def analyticRds(fet, eqVgs):
+        '''Rds from the FET model (same equation as FET.rds) over an array of equation Vgs'''
+        overdrive = eqVgs - fet.vth
+        rdsArr = np.full(overdrive.shape, FET.ROFF)
+        np.divide(1, fet.ronCoef * overdrive, out=rdsArr, where=overdrive > 0)
+        return np.minimum(FET.ROFF, rdsArr)
+
+    def lookup(self, eqVgs):
+        '''Interpolated Rds over equation Vgs\n
+        Args:
+            eqVgs [float or np.array]: equation Vgs (V), 0 to self.vMax
+        Return:
+            Rds [float or np.array]: drain-to-source resistance (Ohms)'''
+        return 1/np.interp(eqVgs, self.eqVgs, self.cond)
+
+    def rds(self, vgate, vrail=None):
+        '''Calculate Rds based on Vgate (and Vrail for pmos), vectorized\n
+        Args:
+            vgate [float or np.array]: gate voltage, always positive (Vg-Vss)\n
+            vrail [float or np.array]: rail voltage (V), pmos only, defaults to fet.vrail
+                broadcast against vgate, e.g. vrail[:, np.newaxis] for a Vdd x Vin grid
+        Return:
+            Rds [float or np.array]: drain-to-source resistance (Ohms)'''
+        vgate = np.asarray(vgate)
+        if self.chanType == 'p':
+            if vrail is None:
+                vrail = self.vrail
+            assert vrail is not None
+            eqVgs = np.asarray(vrail) - vgate
+        else: #'n'
+            eqVgs = vgate
+        assert np.all(eqVgs >= 0) and np.all(eqVgs <= self.vMax)
+        return self.lookup(eqVgs)
         
-            
+
 
 
 if __name__ == '__main__':
@@ -404,41 +715,17 @@ if __name__ == '__main__':
     
     vddArr = [3.0, 2.4, 1.8, 1.4, 1.2, 1.1, 1.0, 0.9, 0.8] #[1.0, 1.4, 1.8, 2.4, 3.0]
     vinPercentageArr = np.linspace(0, 100, 10000)
-    sumRdsArrArr = []
-    leakIdArrArr = []
-    voutArrArr = []
-    for vdd in vddArr:
-        pTr.vrail = vdd
-        pTr3s.vrail = vdd
-        pTrNeg3s.vrail = vdd
-
-        vgArr = np.array([])
-        for perc in vinPercentageArr:
-            vgArr = np.append(vgArr, perc/100*vdd)
-
-        #nmos
-        nRdsArr = np.array([])
-        for vg in vgArr:
-            nRdsArr = np.append(nRdsArr, tr.rds(vg))
-        #pmos
-        pRdsArr = np.array([])
-        for vg in vgArr:
-            pRdsArr = np.append(pRdsArr, pTr.rds(vg))
-        #sum
-        sumRdsArr = np.array([])
-        for i in range(len(vgArr)):
-            sumRdsArr = np.append(sumRdsArr, nRdsArr[i]+pRdsArr[i])
-        sumRdsArrArr.append(sumRdsArr)
-        #leakage I
-        leakIdArr = np.array([])
-        for i in range(len(sumRdsArr)):
-            leakIdArr = np.append(leakIdArr, vdd/sumRdsArr[i])
-        leakIdArrArr.append(leakIdArr)
-        #voltage div
-        voutArr = np.array([])
-        for i in range(len(vgArr)):
-            voutArr = np.append(voutArr, vdd*(nRdsArr[i]/sumRdsArr[i]))
-        voutArrArr.append(voutArr)
+    #tabulated Rds, whole Vdd x Vin grid in one lookup per device
+    nTable = RdsTable(tr)
+    pTable = RdsTable(pTr)
+    vddGrid = np.array(vddArr)[:, np.newaxis]
+    vgGrid = vinPercentageArr/100*vddGrid
+    nRdsGrid = nTable.rds(vgGrid)
+    pRdsGrid = pTable.rds(vgGrid, vrail=vddGrid)
+    sumRdsGrid = nRdsGrid + pRdsGrid
+    sumRdsArrArr = list(sumRdsGrid)
+    leakIdArrArr = list(vddGrid/sumRdsGrid) #leakage I
+    voutArrArr = list(vddGrid*(nRdsGrid/sumRdsGrid)) #voltage div
     
     multiLabels = []
     for vdd in vddArr:
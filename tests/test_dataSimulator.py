@@ -0,0 +1,93 @@
+'''Wafer store backend of WaferConsumer against the pickle backend, run with pytest from the repo root'''
+
+import os
+import pickle
+import statistics
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import dataSimulator as ds
+
+NUM_WAFERS = 8
+TR_COUNT = 30
+
+
+@pytest.fixture(scope='module')
+def consumers(tmp_path_factory):
+    '''Pickle consumer and the consumers of the stores converted from it and saved from its columns'''
+    cols = ds.genLots(NUM_WAFERS, trCount=TR_COUNT, seed=4)
+    waferArr = [[{key: float(cols[key][waferNum, trNum]) for key in ds.noVar} for trNum in range(TR_COUNT)] 
+                for waferNum in range(NUM_WAFERS)]
+    tmp = tmp_path_factory.mktemp('wafers')
+    pklPath = str(tmp / 'wafers.pkl')
+    with open(pklPath, 'wb') as f:
+        pickle.dump(waferArr, f)
+    ds.convertWaferPickle(pklPath, str(tmp / 'converted'))
+    ds.saveWaferStore(ds.waferListToCols(waferArr), str(tmp / 'saved'))
+    return ds.WaferConsumer(pklPath), [ds.WaferConsumer(str(tmp / 'converted')), ds.WaferConsumer(str(tmp / 'saved'))]
+
+def assertBatchEqual(batch, ref):
+    assert len(batch) == len(ref)
+    for procVar, refProcVar in zip(batch, ref):
+        for key in ds.noVar:
+            np.testing.assert_array_equal(procVar[key], refProcVar[key])
+
+def test_consume(consumers):
+    pkl, stores = consumers
+    for store in stores:
+        assert store.numWafers == pkl.numWafers
+        for waferNum in (0, 3, NUM_WAFERS-1):
+            pkl.waferNum = store.waferNum = waferNum
+            pkl.resetIter()
+            store.resetIter()
+            for num in (2, 4, 12):
+                assert store.consume(num) == pkl.consume(num)
+            #from the first transistor again
+            pkl.resetIter()
+            store.resetIter()
+            assert store.consume(5) == pkl.consume(5)
+
+@pytest.mark.parametrize('waferNums', [range(NUM_WAFERS), range(2, 6), range(0, NUM_WAFERS, 3), [5, 1, 6]])
+def test_consumeBatch(consumers, waferNums):
+    pkl, stores = consumers
+    for store in stores:
+        pkl.waferNums = store.waferNums = waferNums
+        pkl.resetIter()
+        store.resetIter()
+        for num in (2, 4, 12):
+            assertBatchEqual(store.consumeBatch(num), pkl.consumeBatch(num))
+        assert [store.waferIter[waferNum] for waferNum in waferNums] == [18]*len(waferNums)
+        #from the first transistor again
+        pkl.resetIter()
+        store.resetIter()
+        assert [store.waferIter[waferNum] for waferNum in waferNums] == [0]*len(waferNums)
+        assertBatchEqual(store.consume(6), pkl.consume(6))
+        pkl.waferNums = store.waferNums = None
+
+def test_normInv():
+    rng = np.random.default_rng(3)
+    u = np.concatenate([rng.random(2000), 10**-rng.uniform(2, 300, 200), 1 - 10**-rng.uniform(2, 15, 200), 
+                        [np.nextafter(0, 1), np.nextafter(1, 0), 0.5, 0.075, 0.925]])
+    ref = [statistics.NormalDist().inv_cdf(p) for p in u]
+    np.testing.assert_allclose(ds.normInv(u), ref, rtol=1e-14, atol=0)
+    assert ds.normInv(u.reshape(-1, 5)).shape == (len(u)//5, 5)
+
+class ZeroRng:
+    '''Generator drawing 0.0 every time, the edge rng.random() can return'''
+
+    def random(self, shape):
+        return np.zeros(shape)
+
+def test_latinHypercube():
+    n, dims = 50, 6
+    points = ds.latinHypercube(n, dims, np.random.default_rng(6))
+    assert points.shape == (n, dims)
+    for dim in range(dims):
+        assert sorted(np.floor(points[:, dim]*n).astype(int)) == list(range(n)) #one point per stratum
+
+def test_latinHypercubeInsideUnitCube():
+    points = ds.latinHypercube(50, 6, ZeroRng()) #lowest stratum at exactly 0.0 before clipping
+    assert np.all((points > 0) & (points < 1))
+    assert np.all(np.isfinite(ds.normInv(points)))
@@ -0,0 +1,69 @@
+'''Batch mode gates against single die gates, run with pytest from the repo root'''
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import dataSimulator as ds
+import gate
+
+VDD = 1.2
+NUM_DIES = 7
+STEP_ATTRS = ('voutFinal', 'stepTime', 'stepChg', 'stepEnergy')
+#input voltages stepped in order, every input combination rising and falling
+INPUT_SEQ = [(0, 0), (VDD, 0), (VDD, VDD), (0, VDD), (0, 0), (VDD, VDD), (0, 0)]
+
+
+def procVars(numProcVar):
+    '''Scalar procVars per die and the matching columnar procVars of a batch'''
+    cols = ds.genLots(NUM_DIES, trCount=numProcVar, seed=5)
+    batch = [{key: cols[key][:, tr] for key in ds.noVar} for tr in range(numProcVar)]
+    dies = [[{key: float(cols[key][die, tr]) for key in ds.noVar} for tr in range(numProcVar)]
+            for die in range(NUM_DIES)]
+    return dies, batch
+
+@pytest.mark.parametrize('gateClass, numProcVar', [(gate.INV, 2), (gate.NAND, 4), (gate.NOR, 4), (gate.XOR, 12)])
+def test_batchMatchesSingleDie(gateClass, numProcVar):
+    dies, batch = procVars(numProcVar)
+    singles = [gateClass(VDD, procVarArr=procVarArr) for procVarArr in dies]
+    batched = gateClass(VDD, procVarArr=batch)
+    assert batched.batched and not singles[0].batched
+    #a per die load, like a fan-out of one more gate
+    clds = np.array([2*g.cin if gateClass is gate.INV else 2*g.cinA for g in singles])
+    for g, cld in zip(singles, clds):
+        g.cld = float(cld)
+    batched.cld = clds
+    #charging on some dies and discharging on others in the first step
+    vouts = np.linspace(0, VDD, NUM_DIES)
+    for g, vout in zip(singles, vouts):
+        g.vout = float(vout)
+    batched.vout = vouts
+    for vins in INPUT_SEQ:
+        for g in singles + [batched]:
+            g.chgInputs(*vins[:len(g.INPUTS)])
+            g.step()
+        for attr in STEP_ATTRS:
+            single = np.array([getattr(g, attr) for g in singles])
+            np.testing.assert_allclose(getattr(batched, attr), single, rtol=1e-12, atol=0, err_msg=f'{attr} at {vins}')
+
+def test_stepCacheKeyCollision():
+    #hash(-1.0) == hash(-2.0), so procVars that only differ there have the same hash
+    procVarA = dict(ds.noVar, na=-1.0)
+    procVarB = dict(ds.noVar, na=-2.0)
+    assert hash(tuple(procVarA.values())) == hash(tuple(procVarB.values()))
+    cache = gate.StepCache()
+    gates = {}
+    for name, procVar, useCache in [('a', procVarA, True), ('b', procVarB, True), ('ref', procVarB, False)]:
+        g = gate.INV(VDD, procVarArr=[procVar, procVar])
+        g.cld = 2*g.cin
+        if useCache:
+            g.cache = cache
+        g.chgInputs(0)
+        g.step()
+        gates[name] = g
+    assert cache.hits == 0 and cache.misses == 2
+    assert gates['b'].stepTime != gates['a'].stepTime
+    for attr in STEP_ATTRS:
+        assert getattr(gates['b'], attr) == getattr(gates['ref'], attr)
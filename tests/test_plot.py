@@ -0,0 +1,80 @@
+'''Regression tests of the OSCOPE resampling, run with pytest from the repo root'''
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import plot
+
+#trace times stepping back, as resScopeDataMulti writes them on a timing failure (propTime > period)
+T_STEP_BACK = [0, 1.5, 1, 2.5, 2, 3.5]
+
+
+class ScopeCapture:
+    '''Stands in for PLOTTER, keeps the resampled data instead of plotting it'''
+
+    def scopePlot(self, t=None, y=None, multiY=None, **kwargs):
+        self.t = t
+        self.multiY = [y] if multiY is None else multiY
+
+
+def resample(traces, envelope=False):
+    scope = plot.OSCOPE.__new__(plot.OSCOPE) #no PLOTTER, it needs a plotting backend
+    scope.dataList = []
+    scope.tSamples = None
+    scope.vSamplesList = []
+    scope.plotter = ScopeCapture()
+    for t, v, intp in traces:
+        scope.dataList.append({'t': np.asarray(t, dtype=float), 'v': np.asarray(v, dtype=float), 'intp': intp})
+    scope.plot(envelope=envelope)
+    return scope.plotter.t, scope.plotter.multiY
+
+def argmaxHold(tSamples, t, v):
+    '''Step-hold resampling of plot.py before searchsorted (one argmax per data point)'''
+    vSamples = np.zeros_like(tSamples)
+    tPositions = [np.argmax(tSamples >= timeVal) for timeVal in t] + [len(tSamples)]
+    for i in range(len(t)):
+        vSamples[tPositions[i]:tPositions[i+1]] = v[i]
+    return vSamples
+
+@pytest.mark.parametrize('t', [T_STEP_BACK, [0, 1, 2, 3, 4, 5], [0, 2, 1, 1.2, 3, 2.9]])
+def test_hold_matches_argmax(t):
+    v = np.arange(1, len(t)+1, dtype=float)
+    tSamples, (vSamples,) = resample([(t, v, False)])
+    assert np.array_equal(vSamples, argmaxHold(tSamples, np.asarray(t, dtype=float), v))
+
+def test_hold_random_step_back():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        t = np.cumsum(rng.uniform(-0.5, 1, 40))
+        t = np.concatenate(([0], t - t.min() + 0.1))
+        t[-1] = t.max() + 0.1
+        v = rng.normal(size=len(t))
+        tSamples, (vSamples,) = resample([(t, v, False)])
+        assert np.array_equal(vSamples, argmaxHold(tSamples, t, v))
+
+def test_envelope_hold_step_back():
+    t = np.array(T_STEP_BACK)
+    v = np.arange(1, len(t)+1, dtype=float)
+    edges = np.linspace(0, 4, 9)
+    vMin, vMax = plot.minMaxEnvelope(t, v, edges, intp=False)
+    #dense step-hold samples of every bucket bound the envelope
+    dense = np.linspace(0, 4, 80001)[:-1]
+    denseV = argmaxHold(dense, t, v)
+    bucket = np.searchsorted(edges, dense, side='right') - 1
+    for idx in range(len(edges)-1):
+        assert vMin[idx] == denseV[bucket == idx].min()
+        assert vMax[idx] == denseV[bucket == idx].max()
+
+def test_envelope_intp_step_back():
+    t = np.array(T_STEP_BACK)
+    v = np.arange(1, len(t)+1, dtype=float)
+    edges = np.linspace(0, 4, 9)
+    vMin, vMax = plot.minMaxEnvelope(t, v, edges, intp=True)
+    for idx in range(len(edges)-1):
+        inside = (t >= edges[idx]) & (t < edges[idx+1])
+        edgeV = np.interp(edges[idx:idx+2], t, v)
+        assert vMin[idx] == min(edgeV.min(), v[inside].min(initial=np.inf))
+        assert vMax[idx] == max(edgeV.max(), v[inside].max(initial=-np.inf))
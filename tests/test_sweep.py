@@ -0,0 +1,76 @@
+'''Sharded Vdd-min sweeps, run with pytest from the repo root'''
+
+import os
+import pickle
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import dataSimulator as ds
+import stats
+import sweep
+
+NUM_WAFERS = 6
+SEARCH = {'tol': 0.01} #coarse bisection, the sweep machinery is under test
+SHARD_SIZE = 2
+
+
+class Interrupted(Exception):
+    '''Stands in for Ctrl-C or a crash in the middle of a sweep'''
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('sweep') / 'store')
+    ds.genLotStore(path, NUM_WAFERS, seed=2)
+    return path
+
+def test_resultsIndependentOfSharding(store):
+    ref = sweep.runSweep(store, NUM_WAFERS, workers=1, shardSize=4, search=SEARCH)
+    assert len(ref[0]) == NUM_WAFERS and None not in ref[0]
+    for workers, shardSize in [(1, 1), (2, 1), (2, 4), (2, 50)]:
+        assert sweep.runSweep(store, NUM_WAFERS, workers=workers, shardSize=shardSize, search=SEARCH) == ref
+
+def test_linearVddMinBracket():
+    factory = lambda vdd, wafer: (vdd >= 0.9, None)
+    vddMin, tb, evalCount = sweep.linearVddMin(factory, 0, start=0.7, step=0.05, stop=1.0)
+    assert vddMin == pytest.approx(0.9) and evalCount == 4
+    with pytest.raises(AssertionError):
+        sweep.linearVddMin(factory, 0, start=1.0, stop=1.0) #no Vdd to try
+
+def loadCheckpoint(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def assertHistsEqual(hists, ref):
+    assert hists.keys() == ref.keys()
+    for key in ref:
+        for attr in ('counts', 'count', 'numNan', 'min', 'max'):
+            assert np.array_equal(getattr(hists[key], attr), getattr(ref[key], attr)), (key, attr)
+        assert hists[key].total == pytest.approx(ref[key].total, rel=1e-12)
+
+def test_resumeAfterInterrupt(store, tmp_path, monkeypatch):
+    refHists = stats.sweepHists()
+    ref = sweep.runSweep(store, NUM_WAFERS, workers=1, shardSize=SHARD_SIZE, search=SEARCH, hists=refHists)
+    #fail on the first wafer of the second shard
+    checkpoint = str(tmp_path / 'sweep.ckpt')
+    findVddMin = sweep.findVddMin
+    def failingSearch(circuitFactory, wafer, **kwargs):
+        if wafer == SHARD_SIZE:
+            raise Interrupted()
+        return findVddMin(circuitFactory, wafer, **kwargs)
+    monkeypatch.setattr(sweep, 'findVddMin', failingSearch)
+    with pytest.raises(Interrupted):
+        sweep.runSweep(store, NUM_WAFERS, workers=1, shardSize=SHARD_SIZE, search=SEARCH, 
+                       hists=stats.sweepHists(), checkpoint=checkpoint)
+    monkeypatch.undo()
+    state = loadCheckpoint(checkpoint)
+    assert state['done'] == {0} and not state['complete']
+    #resume, in a process pool this time
+    hists = stats.sweepHists()
+    res = sweep.runSweep(store, NUM_WAFERS, workers=2, shardSize=SHARD_SIZE, search=SEARCH, 
+                         hists=hists, checkpoint=checkpoint)
+    assert res == ref
+    assertHistsEqual(hists, refHists)
+    assert loadCheckpoint(checkpoint)['complete']
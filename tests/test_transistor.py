@@ -0,0 +1,52 @@
+'''FETArray against FET, run with pytest from the repo root'''
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import dataSimulator as ds
+import transistor as tr
+
+VRAIL = 1.2
+#off, around threshold (vth ~0.68 V) and fully on, for nmos and pmos (Vgs of pmos is VRAIL - vgate)
+VGATES = [0, 0.1, 0.3, 0.52, 0.6, 0.68, 0.9, 1.2]
+
+
+def procVars(count=50):
+    cols = ds.genLots(1, trCount=count, seed=11)
+    return [{key: float(cols[key][0, tr]) for key in ds.noVar} for tr in range(count)]
+
+def fetPair(chanType, procVarArr):
+    fets = [tr.FET(chanType, procVar) for procVar in procVarArr]
+    arr = tr.FETArray(chanType, procVarArr)
+    for fet in fets:
+        fet.vrail = VRAIL
+    arr.vrail = VRAIL
+    return fets, arr
+
+@pytest.mark.parametrize('chanType', ['n', 'p'])
+@pytest.mark.parametrize('vgate', VGATES)
+def test_rdsMatchesFET(chanType, vgate):
+    fets, arr = fetPair(chanType, procVars())
+    single = np.array([fet.rds(vgate) for fet in fets])
+    np.testing.assert_allclose(arr.rds(vgate), single, rtol=1e-12, atol=0)
+
+@pytest.mark.parametrize('chanType', ['n', 'p'])
+def test_rdsPerDeviceVgate(chanType):
+    fets, arr = fetPair(chanType, procVars(len(VGATES)))
+    single = np.array([fet.rds(vgate) for fet, vgate in zip(fets, VGATES)])
+    np.testing.assert_allclose(arr.rds(np.array(VGATES, dtype=float)), single, rtol=1e-12, atol=0)
+
+@pytest.mark.parametrize('chanType', ['n', 'p'])
+def test_rdsMatchesGateFET(chanType):
+    procVarArr = procVars()
+    _, arr = fetPair(chanType, procVarArr)
+    for vgate in VGATES:
+        single = []
+        for procVar in procVarArr:
+            fet = tr.GateFET(chanType, procVar)
+            fet.vrail = VRAIL
+            single.append(fet.rds(vgate))
+        np.testing.assert_allclose(arr.rds(vgate), single, rtol=1e-12, atol=0)